@@ -1,262 +1,160 @@
 # os_app/decorators.py
-from django.shortcuts import redirect
+from django.conf import settings
+from django.shortcuts import redirect, render
 from django.contrib import messages
+from django.urls import reverse
 from functools import wraps
 
-
-# ============================================================================
-# DECORATORS PARA PROFESSORES
-# ============================================================================
-
-def permissao_criar_professor(view_func):
-    """Decorator para verificar permissão de criar professor"""
-    @wraps(view_func)
-    def wrapper(request, *args, **kwargs):
-        # Superusuário sempre pode
-        if request.user.is_superuser:
+from .utils.permissoes import BITS, mascara
+from .utils.limite_consultas import ConsultaInterrompida, limitar_consultas
+from .utils.replica import aderente_ao_principal, iterar_na_replica, usar_replica
+
+
+def permissao_requerida(permissao, mensagem, destino):
+    """
+    Decorator para verificar uma permissão do perfil (nome sem 'pode_').
+    Usa a máscara de bits de utils/permissoes.py: superusuário sempre pode
+    e, com a máscara já no cache, a verificação não consulta o banco.
+    """
+    bit = BITS[permissao]
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not mascara(request) & bit:
+                messages.error(request, mensagem)
+                return redirect(destino)
             return view_func(request, *args, **kwargs)
-        
-        # Verifica se tem perfil
-        if not hasattr(request.user, 'perfil'):
-            messages.error(request, "Você não tem permissão para criar professores.")
-            return redirect('os_app:lista_professores')
-        
-        # Verifica permissão
-        if not request.user.perfil.pode_criar_professor:
-            messages.error(request, "Você não tem permissão para criar professores.")
-            return redirect('os_app:lista_professores')
-        
-        return view_func(request, *args, **kwargs)
-    return wrapper
+        return wrapper
+    return decorator
 
 
-def permissao_editar_professor(view_func):
-    """Decorator para verificar permissão de editar professor"""
+def leitura_na_replica(view_func):
+    """
+    Decorator para views só de leitura (relatórios, logs, painel): em GET as
+    consultas vão para a réplica (utils/replica.py), exceto logo depois de
+    um POST do usuário. Em respostas streaming vale também durante o envio.
+    """
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        # Superusuário sempre pode
-        if request.user.is_superuser:
+        if request.method not in ('GET', 'HEAD') or aderente_ao_principal(request):
             return view_func(request, *args, **kwargs)
-        
-        # Verifica se tem perfil
-        if not hasattr(request.user, 'perfil'):
-            messages.error(request, "Você não tem permissão para editar professores.")
-            return redirect('os_app:lista_professores')
-        
-        # Verifica permissão
-        if not request.user.perfil.pode_editar_professor:
-            messages.error(request, "Você não tem permissão para editar professores.")
-            return redirect('os_app:lista_professores')
-        
-        return view_func(request, *args, **kwargs)
+        with usar_replica():
+            response = view_func(request, *args, **kwargs)
+        if response.streaming:
+            response.streaming_content = iterar_na_replica(response.streaming_content)
+        return response
     return wrapper
 
 
-def permissao_excluir_professor(view_func):
-    """Decorator para verificar permissão de excluir professor"""
-    @wraps(view_func)
-    def wrapper(request, *args, **kwargs):
-        # Superusuário sempre pode
-        if request.user.is_superuser:
-            return view_func(request, *args, **kwargs)
-        
-        # Verifica se tem perfil
-        if not hasattr(request.user, 'perfil'):
-            messages.error(request, "Você não tem permissão para excluir professores.")
-            return redirect('os_app:lista_professores')
-        
-        # Verifica permissão
-        if not request.user.perfil.pode_excluir_professor:
-            messages.error(request, "Você não tem permissão para excluir professores.")
-            return redirect('os_app:lista_professores')
-        
-        return view_func(request, *args, **kwargs)
-    return wrapper
+def limite_de_consulta(destino):
+    """
+    Decorator para views com filtros livres: cada consulta SQL tem até
+    settings.LIMITE_CONSULTA_SEGUNDOS (utils/limite_consultas.py). Se uma
+    passar disso, responde com uma página pedindo filtros mais restritos e
+    um link para `destino` com os filtros atuais.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            segundos = settings.LIMITE_CONSULTA_SEGUNDOS
+            if not segundos:
+                return view_func(request, *args, **kwargs)
+            try:
+                with limitar_consultas(segundos):
+                    return view_func(request, *args, **kwargs)
+            except ConsultaInterrompida:
+                voltar = reverse(destino)
+                if request.GET:
+                    voltar += '?' + request.GET.urlencode()
+                return render(request, 'os_app/consulta_demorada.html', {
+                    'segundos': segundos, 'voltar': voltar,
+                }, status=503)
+        return wrapper
+    return decorator
 
 
 # ============================================================================
-# DECORATORS PARA ESCOLAS NÚCLEO
+# DECORATORS PARA PROFESSORES
 # ============================================================================
 
-def permissao_criar_escola_nucleo(view_func):
-    """Decorator para verificar permissão de criar escola núcleo"""
-    @wraps(view_func)
-    def wrapper(request, *args, **kwargs):
-        # Superusuário sempre pode
-        if request.user.is_superuser:
-            return view_func(request, *args, **kwargs)
-        
-        # Verifica se tem perfil
-        if not hasattr(request.user, 'perfil'):
-            messages.error(request, "Você não tem permissão para criar escolas núcleo.")
-            return redirect('os_app:lista_escolas_nucleo')
-        
-        # Verifica permissão
-        if not request.user.perfil.pode_criar_escola_nucleo:
-            messages.error(request, "Você não tem permissão para criar escolas núcleo.")
-            return redirect('os_app:lista_escolas_nucleo')
-        
-        return view_func(request, *args, **kwargs)
-    return wrapper
+permissao_criar_professor = permissao_requerida(
+    'criar_professor',
+    "Você não tem permissão para criar professores.",
+    'os_app:lista_professores',
+)
 
+permissao_editar_professor = permissao_requerida(
+    'editar_professor',
+    "Você não tem permissão para editar professores.",
+    'os_app:lista_professores',
+)
 
-def permissao_editar_escola_nucleo(view_func):
-    """Decorator para verificar permissão de editar escola núcleo"""
-    @wraps(view_func)
-    def wrapper(request, *args, **kwargs):
-        # Superusuário sempre pode
-        if request.user.is_superuser:
-            return view_func(request, *args, **kwargs)
-        
-        # Verifica se tem perfil
-        if not hasattr(request.user, 'perfil'):
-            messages.error(request, "Você não tem permissão para editar escolas núcleo.")
-            return redirect('os_app:lista_escolas_nucleo')
-        
-        # Verifica permissão
-        if not request.user.perfil.pode_editar_escola_nucleo:
-            messages.error(request, "Você não tem permissão para editar escolas núcleo.")
-            return redirect('os_app:lista_escolas_nucleo')
-        
-        return view_func(request, *args, **kwargs)
-    return wrapper
+permissao_excluir_professor = permissao_requerida(
+    'excluir_professor',
+    "Você não tem permissão para excluir professores.",
+    'os_app:lista_professores',
+)
 
 
-def permissao_excluir_escola_nucleo(view_func):
-    """Decorator para verificar permissão de excluir escola núcleo"""
-    @wraps(view_func)
-    def wrapper(request, *args, **kwargs):
-        # Superusuário sempre pode
-        if request.user.is_superuser:
-            return view_func(request, *args, **kwargs)
-        
-        # Verifica se tem perfil
-        if not hasattr(request.user, 'perfil'):
-            messages.error(request, "Você não tem permissão para excluir escolas núcleo.")
-            return redirect('os_app:lista_escolas_nucleo')
-        
-        # Verifica permissão
-        if not request.user.perfil.pode_excluir_escola_nucleo:
-            messages.error(request, "Você não tem permissão para excluir escolas núcleo.")
-            return redirect('os_app:lista_escolas_nucleo')
-        
-        return view_func(request, *args, **kwargs)
-    return wrapper
+# ============================================================================
+# DECORATORS PARA ESCOLAS NÚCLEO
+# ============================================================================
+
+permissao_criar_escola_nucleo = permissao_requerida(
+    'criar_escola_nucleo',
+    "Você não tem permissão para criar escolas núcleo.",
+    'os_app:lista_escolas_nucleo',
+)
+
+permissao_editar_escola_nucleo = permissao_requerida(
+    'editar_escola_nucleo',
+    "Você não tem permissão para editar escolas núcleo.",
+    'os_app:lista_escolas_nucleo',
+)
+
+permissao_excluir_escola_nucleo = permissao_requerida(
+    'excluir_escola_nucleo',
+    "Você não tem permissão para excluir escolas núcleo.",
+    'os_app:lista_escolas_nucleo',
+)
 
 
 # ============================================================================
 # DECORATORS PARA ESCOLAS DEPENDENTES
 # ============================================================================
 
-def permissao_criar_escola_dependente(view_func):
-    """Decorator para verificar permissão de criar escola dependente"""
-    @wraps(view_func)
-    def wrapper(request, *args, **kwargs):
-        # Superusuário sempre pode
-        if request.user.is_superuser:
-            return view_func(request, *args, **kwargs)
-        
-        # Verifica se tem perfil
-        if not hasattr(request.user, 'perfil'):
-            messages.error(request, "Você não tem permissão para criar escolas dependentes.")
-            return redirect('os_app:lista_escolas_dependentes')
-        
-        # Verifica permissão
-        if not request.user.perfil.pode_criar_escola_dependente:
-            messages.error(request, "Você não tem permissão para criar escolas dependentes.")
-            return redirect('os_app:lista_escolas_dependentes')
-        
-        return view_func(request, *args, **kwargs)
-    return wrapper
+permissao_criar_escola_dependente = permissao_requerida(
+    'criar_escola_dependente',
+    "Você não tem permissão para criar escolas dependentes.",
+    'os_app:lista_escolas_dependentes',
+)
 
+permissao_editar_escola_dependente = permissao_requerida(
+    'editar_escola_dependente',
+    "Você não tem permissão para editar escolas dependentes.",
+    'os_app:lista_escolas_dependentes',
+)
 
-def permissao_editar_escola_dependente(view_func):
-    """Decorator para verificar permissão de editar escola dependente"""
-    @wraps(view_func)
-    def wrapper(request, *args, **kwargs):
-        # Superusuário sempre pode
-        if request.user.is_superuser:
-            return view_func(request, *args, **kwargs)
-        
-        # Verifica se tem perfil
-        if not hasattr(request.user, 'perfil'):
-            messages.error(request, "Você não tem permissão para editar escolas dependentes.")
-            return redirect('os_app:lista_escolas_dependentes')
-        
-        # Verifica permissão
-        if not request.user.perfil.pode_editar_escola_dependente:
-            messages.error(request, "Você não tem permissão para editar escolas dependentes.")
-            return redirect('os_app:lista_escolas_dependentes')
-        
-        return view_func(request, *args, **kwargs)
-    return wrapper
-
-
-def permissao_excluir_escola_dependente(view_func):
-    """Decorator para verificar permissão de excluir escola dependente"""
-    @wraps(view_func)
-    def wrapper(request, *args, **kwargs):
-        # Superusuário sempre pode
-        if request.user.is_superuser:
-            return view_func(request, *args, **kwargs)
-        
-        # Verifica se tem perfil
-        if not hasattr(request.user, 'perfil'):
-            messages.error(request, "Você não tem permissão para excluir escolas dependentes.")
-            return redirect('os_app:lista_escolas_dependentes')
-        
-        # Verifica permissão
-        if not request.user.perfil.pode_excluir_escola_dependente:
-            messages.error(request, "Você não tem permissão para excluir escolas dependentes.")
-            return redirect('os_app:lista_escolas_dependentes')
-        
-        return view_func(request, *args, **kwargs)
-    return wrapper
+permissao_excluir_escola_dependente = permissao_requerida(
+    'excluir_escola_dependente',
+    "Você não tem permissão para excluir escolas dependentes.",
+    'os_app:lista_escolas_dependentes',
+)
 
 
 # ============================================================================
 # DECORATORS GERAIS
 # ============================================================================
 
-def permissao_gerar_relatorios(view_func):
-    """Decorator para verificar permissão de gerar relatórios"""
-    @wraps(view_func)
-    def wrapper(request, *args, **kwargs):
-        # Superusuário sempre pode
-        if request.user.is_superuser:
-            return view_func(request, *args, **kwargs)
-        
-        # Verifica se tem perfil
-        if not hasattr(request.user, 'perfil'):
-            messages.error(request, "Você não tem permissão para gerar relatórios.")
-            return redirect('os_app:index')
-        
-        # Verifica permissão
-        if not request.user.perfil.pode_gerar_relatorios:
-            messages.error(request, "Você não tem permissão para gerar relatórios.")
-            return redirect('os_app:index')
-        
-        return view_func(request, *args, **kwargs)
-    return wrapper
-
-
-def permissao_exportar_dados(view_func):
-    """Decorator para verificar permissão de exportar dados"""
-    @wraps(view_func)
-    def wrapper(request, *args, **kwargs):
-        # Superusuário sempre pode
-        if request.user.is_superuser:
-            return view_func(request, *args, **kwargs)
-        
-        # Verifica se tem perfil
-        if not hasattr(request.user, 'perfil'):
-            messages.error(request, "Você não tem permissão para exportar dados.")
-            return redirect('os_app:index')
-        
-        # Verifica permissão
-        if not request.user.perfil.pode_exportar_dados:
-            messages.error(request, "Você não tem permissão para exportar dados.")
-            return redirect('os_app:index')
-        
-        return view_func(request, *args, **kwargs)
-    return wrapper
\ No newline at end of file
+permissao_gerar_relatorios = permissao_requerida(
+    'gerar_relatorios',
+    "Você não tem permissão para gerar relatórios.",
+    'os_app:index',
+)
+
+permissao_exportar_dados = permissao_requerida(
+    'exportar_dados',
+    "Você não tem permissão para exportar dados.",
+    'os_app:index',
+)
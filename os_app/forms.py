@@ -4,6 +4,55 @@ from .models import (Professor, EscolaNucleo, Escola, Cargo, Bairro, Serie, Moti
                     TURNO_CHOICES, MATERIAS_CHOICES)
 import re
 from django.contrib.auth.forms import AuthenticationForm
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+
+from .utils.banco import repetir_se_bloqueado
+
+
+class SelectLazy(forms.Select):
+    """
+    Select de ModelChoiceField que renderiza só a opção vazia e a selecionada.
+    Com `fonte`, o navegador busca as demais paginadas em api/opcoes/<fonte>/
+    ao abrir o select; sem fonte, quem preenche é o JavaScript da página.
+    A validação continua sendo um get(pk=...) no queryset do campo.
+    """
+
+    def __init__(self, fonte=None, attrs=None):
+        super().__init__(attrs)
+        self.fonte = fonte
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        if self.fonte:
+            context['widget']['attrs']['data-opcoes-url'] = reverse(
+                'os_app:opcoes_select_ajax', args=[self.fonte]
+            )
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        iterador = self.choices
+        escolhas = []
+        if iterador.field.empty_label is not None:
+            escolhas.append(('', iterador.field.empty_label))
+        selecionados = []
+        for valor in value:
+            # POST adulterado ou desatualizado: sem opção, o campo mostra o erro
+            try:
+                pk = iterador.queryset.model._meta.pk.to_python(valor)
+            except (ValueError, ValidationError):
+                continue
+            if pk not in ('', None):
+                selecionados.append(pk)
+        if selecionados:
+            for obj in iterador.queryset.filter(pk__in=selecionados):
+                escolhas.append((obj.pk, iterador.field.label_from_instance(obj)))
+        self.choices = escolhas
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = iterador
 
 
 class ProfessorForm(forms.ModelForm):
@@ -13,7 +62,7 @@ class ProfessorForm(forms.ModelForm):
         queryset=EscolaNucleo.objects.all(),
         required=False,
         empty_label="Selecione um núcleo",
-        widget=forms.Select(attrs={'class': 'form-control', 'id': 'id_nucleo'}),
+        widget=SelectLazy('nucleos', attrs={'class': 'form-control', 'id': 'id_nucleo'}),
         label='Escola Núcleo'
     )
 
@@ -81,7 +130,8 @@ class ProfessorForm(forms.ModelForm):
             'area_atuacao': forms.Select(attrs={
                 'class': 'form-control'
             }),
-            'escola_lotacao': forms.Select(attrs={
+            # Opções vêm da árvore de escolas (api/escolas/arvore/) ao escolher o núcleo
+            'escola_lotacao': SelectLazy(attrs={
                 'class': 'form-control', 
                 'id': 'id_escola_lotacao'
             }),
@@ -99,8 +149,8 @@ class ProfessorForm(forms.ModelForm):
                 'placeholder': 'Rua, Avenida, etc.',
                 'id': 'id_endereco'
             }),
-            'bairro': forms.Select(attrs={
-                'class': 'form-control',
+            # Escolhido pelo autocomplete (api/bairro/buscar/)
+            'bairro': forms.HiddenInput(attrs={
                 'id': 'id_bairro'
             }),
             'cidade': forms.TextInput(attrs={
@@ -125,7 +175,7 @@ class ProfessorForm(forms.ModelForm):
             'modalidade': forms.Select(attrs={
                 'class': 'form-control'
             }),
-            'serie': forms.Select(attrs={
+            'serie': SelectLazy('series', attrs={
                 'class': 'form-control',
                 'id': 'id_serie'
             }),
@@ -140,7 +190,7 @@ class ProfessorForm(forms.ModelForm):
             'em_sala': forms.CheckboxInput(attrs={
                 'class': 'form-check-input'
             }),
-            'motivo_fora_sala': forms.Select(attrs={
+            'motivo_fora_sala': SelectLazy('motivos', attrs={
                 'class': 'form-control',
                 'id': 'id_motivo_fora_sala'
             }),
@@ -151,20 +201,22 @@ class ProfessorForm(forms.ModelForm):
             }),
         }
     
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, escopo=None, **kwargs):
         super().__init__(*args, **kwargs)
+        self.escopo = escopo
         
-        self.fields['escola_lotacao'].queryset = Escola.objects.select_related('nucleo').order_by('nucleo__nome', 'nome')
-        
-        # Configurar bairro
-        self.fields['bairro'].queryset = Bairro.objects.all().order_by('nome')
-        self.fields['bairro'].empty_label = "Selecione o bairro"
+        # Selects sob demanda: o queryset só é usado para validar o pk
+        # escolhido e rotular a opção selecionada, restrito ao escopo do
+        # usuário (utils/escopo.py)
+        self.fields['escola_lotacao'].queryset = Escola.objects.select_related('nucleo').do_escopo(escopo)
+        self.fields['nucleo'].queryset = EscolaNucleo.objects.do_escopo(escopo)
+        self.fields['escola_nucleo'].queryset = EscolaNucleo.objects.do_escopo(escopo)
         
-        if self.instance.pk and self.instance.escola_lotacao:
-            self.fields['nucleo'].initial = self.instance.escola_lotacao.nucleo
+        if self.instance.pk and self.instance.escola_lotacao_id:
+            self.fields['nucleo'].initial = self.instance.escola_lotacao.nucleo_id
         
-        if self.instance.pk and self.instance.escola_nucleo:
-            self.fields['nucleo'].initial = self.instance.escola_nucleo
+        if self.instance.pk and self.instance.escola_nucleo_id:
+            self.fields['nucleo'].initial = self.instance.escola_nucleo_id
 
         if self.instance and self.instance.pk and self.instance.disciplinas:
             materias_list = [m.strip() for m in self.instance.disciplinas.split(',') if m.strip()]
@@ -196,6 +248,17 @@ class ProfessorForm(forms.ModelForm):
             cleaned_data['escola_nucleo'] = nucleo
             cleaned_data['escola_lotacao'] = None
         
+        # Campo não editável: o filtro por núcleo usa só ele
+        escola_lotacao = cleaned_data.get('escola_lotacao')
+        if self.escopo is not None and self.escopo.escola_id and not escola_lotacao:
+            # Sem a escola o professor sairia do escopo de quem o cadastrou
+            self.add_error('escola_lotacao', 'Informe a escola de lotação.')
+        if escola_lotacao and escola_lotacao.nucleo_id:
+            self.instance.nucleo_efetivo_id = escola_lotacao.nucleo_id
+        else:
+            escola_nucleo = cleaned_data.get('escola_nucleo')
+            self.instance.nucleo_efetivo_id = escola_nucleo.pk if escola_nucleo else None
+        
         return cleaned_data
 
     def clean_cpf(self):
@@ -205,13 +268,33 @@ class ProfessorForm(forms.ModelForm):
         if len(cpf_numeros) != 11:
             raise forms.ValidationError("CPF deve ter 11 dígitos.")
 
-        qs = Professor.objects.filter(cpf=cpf_numeros)
-        if self.instance.pk:
-            qs = qs.exclude(pk=self.instance.pk)
-        if qs.exists():
-            raise forms.ValidationError("Este CPF já está cadastrado.")
-
+        # Duplicidade: verificada pelo índice único de cpf_digitos em salvar()
         return cpf_numeros
+
+    def validate_unique(self):
+        exclude = self._get_validation_exclusions()
+        exclude.add('cpf')
+        try:
+            self.instance.validate_unique(exclude=exclude)
+        except ValidationError as e:
+            self._update_errors(e)
+
+    @repetir_se_bloqueado
+    def salvar(self):
+        """
+        Salva o professor confiando na constraint única do banco para o CPF.
+        Devolve o professor, ou None (com erro no campo cpf) se já existir.
+        """
+        try:
+            with transaction.atomic():
+                return self.save()
+        except IntegrityError:
+            cpf = self.cleaned_data.get('cpf')
+            duplicado = Professor.objects.filter(cpf_digitos=cpf).exclude(pk=self.instance.pk)
+            if not duplicado.exists():
+                raise
+            self.add_error('cpf', 'Este CPF já está cadastrado.')
+            return None
     
     def clean_foto(self):
         foto = self.cleaned_data.get('foto')
@@ -227,6 +310,96 @@ class ProfessorForm(forms.ModelForm):
         return foto
 
 
+class OperacaoLoteProfessorForm(forms.Form):
+    """Operação aplicada de uma vez aos professores selecionados na lista"""
+
+    OPERACAO_CHOICES = [
+        ('', 'Ação em lote...'),
+        ('transferir_lotacao', 'Transferir lotação'),
+        ('alterar_turno', 'Alterar turno'),
+        ('alterar_situacao', 'Alterar situação funcional'),
+        ('definir_em_sala', 'Em sala / fora de sala'),
+    ]
+
+    operacao = forms.ChoiceField(
+        choices=OPERACAO_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm', 'id': 'id_operacao_lote'})
+    )
+    ids = forms.CharField(required=False, widget=forms.HiddenInput)
+    escola = forms.ModelChoiceField(
+        queryset=Escola.objects.select_related('nucleo').order_by('nome'),
+        required=False,
+        empty_label='Escola de destino',
+        # Opções vêm da árvore de escolas (api/escolas/arvore/) ao abrir o select
+        widget=SelectLazy(attrs={
+            'class': 'form-select form-select-sm campo-lote', 'id': 'id_escola_lote',
+            'data-operacao': 'transferir_lotacao',
+        })
+    )
+    turno = forms.ChoiceField(
+        choices=TURNO_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm campo-lote', 'data-operacao': 'alterar_turno'})
+    )
+    situacao_funcional = forms.ChoiceField(
+        choices=SITUACAO_FUNCIONAL_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm campo-lote', 'data-operacao': 'alterar_situacao'})
+    )
+    em_sala = forms.TypedChoiceField(
+        choices=[('1', 'Em sala'), ('0', 'Fora de sala')],
+        coerce=lambda valor: valor == '1',
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm campo-lote', 'data-operacao': 'definir_em_sala'})
+    )
+    motivo = forms.ModelChoiceField(
+        queryset=Motivo.objects.filter(ativo=True).order_by('descricao'),
+        required=False,
+        empty_label='Motivo (fora de sala)',
+        widget=SelectLazy('motivos', attrs={
+            'class': 'form-select form-select-sm campo-lote', 'data-operacao': 'definir_em_sala',
+        })
+    )
+
+    def __init__(self, data=None, *args, escopo=None, **kwargs):
+        # Os checkboxes da lista enviam um "ids" por professor
+        if data is not None and hasattr(data, 'getlist'):
+            data = data.copy()
+            data['ids'] = ','.join(data.getlist('ids'))
+        super().__init__(data, *args, **kwargs)
+        # Escola de destino restrita ao escopo do usuário (utils/escopo.py);
+        # a árvore de escolas é a mesma para todos, o navegador filtra por ela
+        self.fields['escola'].queryset = self.fields['escola'].queryset.do_escopo(escopo)
+        if escopo is not None and not escopo.irrestrito:
+            attrs = self.fields['escola'].widget.attrs
+            if escopo.escola_id:
+                attrs['data-escopo-escola'] = escopo.escola_id
+            else:
+                attrs['data-escopo-nucleo'] = escopo.nucleo_id
+
+    def clean_ids(self):
+        ids = [parte for parte in self.cleaned_data.get('ids', '').split(',') if parte.strip()]
+        if not ids:
+            raise forms.ValidationError('Selecione ao menos um professor.')
+        if not all(parte.strip().isdigit() for parte in ids):
+            raise forms.ValidationError('Seleção inválida.')
+        return sorted({int(parte) for parte in ids})
+
+    def clean(self):
+        cleaned_data = super().clean()
+        operacao = cleaned_data.get('operacao')
+        obrigatorio = {
+            'transferir_lotacao': 'escola',
+            'alterar_turno': 'turno',
+            'alterar_situacao': 'situacao_funcional',
+        }.get(operacao)
+        if obrigatorio and not cleaned_data.get(obrigatorio):
+            self.add_error(obrigatorio, 'Campo obrigatório para esta operação.')
+        if operacao == 'definir_em_sala' and self.data.get('em_sala') not in ('0', '1'):
+            self.add_error('em_sala', 'Informe se o professor está em sala.')
+        return cleaned_data
+
+
 class EscolaNucleoForm(forms.ModelForm):
     """Formulário para cadastro de Escola Núcleo"""
     class Meta:
@@ -184,7 +184,9 @@ class UsuarioCreateForm(UserCreationForm):
         if commit:
             user.save()
             
-            perfil, created = PerfilUsuario.objects.get_or_create(usuario=user)
+            # Criado pelo signal criar_perfil_usuario e já em cache no usuário;
+            # perfil.save() grava só os campos que diferem do padrão
+            perfil = user.perfil
             perfil.tipo_usuario = self.cleaned_data['tipo_usuario']
             perfil.cargo_funcao = self.cleaned_data.get('cargo_funcao', '')
             perfil.departamento = self.cleaned_data.get('departamento', '')
@@ -0,0 +1,102 @@
+"""
+Latência de lista_professores no PostgreSQL: sem pool x conexões persistentes x pool
+
+Uso:
+    python manage.py benchmark_pool --workers 4 8 --segundos 10
+    python manage.py benchmark_pool --perfis sem_pool pool
+
+Perfis (aplicados à conexão 'default' antes de criar os workers):
+    sem_pool     CONN_MAX_AGE=0: uma conexão nova por requisição
+    persistente  CONN_MAX_AGE do settings (mín. 60) com health checks
+    pool         OPTIONS['pool'] do settings (ou min 2 / max 4) do psycopg 3
+
+Cada worker (os_app/utils/carga.py) lista os professores de uma escola
+sorteada, autenticado como o primeiro superusuário ativo. Só lê do banco
+(além da sessão de cada worker).
+"""
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from os_app.models import Escola
+from os_app.utils.carga import medir
+
+
+POOL_PADRAO = {'min_size': 2, 'max_size': 4, 'timeout': 10}
+
+
+class Command(BaseCommand):
+    help = 'Compara p50/p99 de lista_professores sem pool, com conexões persistentes e com pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8],
+                            help='Quantidades de workers a medir (padrão: 1 4 8)')
+        parser.add_argument('--segundos', type=float, default=10,
+                            help='Duração de cada medição (padrão: 10)')
+        parser.add_argument('--perfis', nargs='+', choices=['sem_pool', 'persistente', 'pool'],
+                            default=['sem_pool', 'persistente', 'pool'])
+
+    def handle(self, *args, **options):
+        conexao = connections['default']
+        if conexao.vendor != 'postgresql':
+            raise CommandError('Este benchmark é só para PostgreSQL (defina DB_USER etc. no .env).')
+        if 'pool' in options['perfis'] and not getattr(conexao, 'is_psycopg3', False):
+            raise CommandError('O pool exige psycopg 3 (pip install "psycopg[binary,pool]").')
+
+        usuario = User.objects.filter(is_superuser=True, is_active=True).order_by('pk').first()
+        if usuario is None:
+            raise CommandError('Nenhum superusuário ativo (python manage.py createsuperuser).')
+        escolas = list(Escola.objects.filter(professores__isnull=False)
+                       .values_list('id', flat=True).distinct()[:200])
+        if not escolas:
+            raise CommandError('Nenhuma escola com professores (use gerar_dados_sinteticos).')
+        url = reverse('os_app:lista_professores')
+
+        def lista(cliente, rnd):
+            return cliente.get(url, {'escola': rnd.choice(escolas)})
+
+        operacoes = [('lista_professores', 1, lista)]
+        dados = conexao.settings_dict
+        originais = (dados['CONN_MAX_AGE'], dados['CONN_HEALTH_CHECKS'], dict(dados['OPTIONS']))
+        pool = dados['OPTIONS'].get('pool') or POOL_PADRAO
+        if pool is True:
+            pool = {}
+
+        self.stdout.write(f"{'perfil':<12} {'workers':>8} {'req':>7} {'req/s':>8} "
+                          f"{'p50 ms':>8} {'p99 ms':>8} {'erros':>6}")
+        try:
+            for perfil in options['perfis']:
+                self._configurar(conexao, perfil, pool, max(originais[0] or 0, 60))
+                with override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False):
+                    for workers in options['workers']:
+                        geral = medir(usuario, operacoes, workers, options['segundos'])['geral']
+                        self.stdout.write(
+                            f"{perfil:<12} {workers:>8} {geral['requisicoes']:>7} {geral['req_s']:>8.1f} "
+                            f"{geral['p50_ms']:>8.1f} {geral['p99_ms']:>8.1f} {geral['erros']:>6}"
+                        )
+        finally:
+            self._fechar(conexao)
+            dados['CONN_MAX_AGE'], dados['CONN_HEALTH_CHECKS'], dados['OPTIONS'] = originais
+
+    def _fechar(self, conexao):
+        # O pool é criado por processo: o pai não pode repassar o seu aos workers
+        conexao.close()
+        if hasattr(conexao, 'close_pool'):
+            conexao.close_pool()
+
+    def _configurar(self, conexao, perfil, pool, max_age):
+        self._fechar(conexao)
+        dados = conexao.settings_dict
+        opcoes = {chave: valor for chave, valor in dados['OPTIONS'].items() if chave != 'pool'}
+        if perfil == 'pool':
+            opcoes['pool'] = pool
+            dados['CONN_MAX_AGE'], dados['CONN_HEALTH_CHECKS'] = 0, False
+        elif perfil == 'persistente':
+            dados['CONN_MAX_AGE'] = max_age
+            dados['CONN_HEALTH_CHECKS'] = True
+        else:
+            dados['CONN_MAX_AGE'], dados['CONN_HEALTH_CHECKS'] = 0, False
+        dados['OPTIONS'] = opcoes
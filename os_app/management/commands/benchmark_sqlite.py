@@ -0,0 +1,127 @@
+"""
+Vazão do SQLite com N workers concorrentes: configuração padrão x produção
+
+Uso:
+    python manage.py benchmark_sqlite --workers 1 2 4 8 --segundos 10
+    python manage.py benchmark_sqlite --perfis producao --banco /caminho/copia.sqlite3
+
+Cada perfil roda numa cópia temporária do banco (o original não é alterado):
+    padrao    journal DELETE, BEGIN deferido, sem novas tentativas
+    producao  settings.SQLITE_OPCOES_PRODUCAO (WAL, pragmas, BEGIN IMMEDIATE)
+              e SQLITE_RETENTATIVAS
+
+Mistura de operações por worker (os_app/utils/carga.py): detalhe de
+professor (leitura), tela de relatórios (leitura + INSERT de auditoria) e
+operação em lote de um professor (UPDATE + INSERT de auditoria na mesma
+transação).
+"""
+
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from os_app.models import Professor, TURNO_CHOICES
+from os_app.utils.carga import medir
+
+
+USUARIO_BENCHMARK = 'benchmark_concorrencia'
+
+
+def _operacoes(ids):
+    turnos = [valor for valor, _ in TURNO_CHOICES if valor]
+    url_lote = reverse('os_app:professores_lote')
+    url_relatorios = reverse('os_app:relatorios_filtros')
+
+    def detalhe(cliente, rnd):
+        return cliente.get(reverse('os_app:detalhe_professor', args=[rnd.choice(ids)]))
+
+    def relatorios(cliente, rnd):
+        return cliente.get(url_relatorios)
+
+    def lote(cliente, rnd):
+        return cliente.post(url_lote, {
+            'operacao': 'alterar_turno', 'turno': rnd.choice(turnos), 'ids': rnd.choice(ids),
+        })
+
+    return [('detalhe', 6, detalhe), ('relatorios', 2, relatorios), ('lote', 2, lote)]
+
+
+class Command(BaseCommand):
+    help = 'Compara a vazão do SQLite (padrão x produção) com N workers concorrentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8],
+                            help='Quantidades de workers a medir (padrão: 1 2 4 8)')
+        parser.add_argument('--segundos', type=float, default=10,
+                            help='Duração de cada medição (padrão: 10)')
+        parser.add_argument('--perfis', nargs='+', choices=['padrao', 'producao'],
+                            default=['padrao', 'producao'])
+        parser.add_argument('--banco', help='Arquivo SQLite de origem (padrão: o do settings)')
+
+    def handle(self, *args, **options):
+        conexao = connections['default']
+        if conexao.vendor != 'sqlite':
+            raise CommandError('Este benchmark é só para SQLite.')
+        origem = Path(options['banco'] or conexao.settings_dict['NAME'])
+        if not origem.exists():
+            raise CommandError(f'Banco não encontrado: {origem}')
+
+        nome_original = conexao.settings_dict['NAME']
+        opcoes_originais = conexao.settings_dict['OPTIONS']
+        pasta = Path(tempfile.mkdtemp(prefix='sisprof_bench_'))
+        try:
+            for perfil in options['perfis']:
+                self._medir_perfil(conexao, origem, pasta, perfil, options)
+        finally:
+            conexao.close()
+            conexao.settings_dict['NAME'] = nome_original
+            conexao.settings_dict['OPTIONS'] = opcoes_originais
+            shutil.rmtree(pasta, ignore_errors=True)
+
+    def _medir_perfil(self, conexao, origem, pasta, perfil, options):
+        copia = pasta / f'{perfil}.sqlite3'
+        self.stdout.write(f'Copiando {origem} para o perfil {perfil}...')
+        with sqlite3.connect(origem) as fonte, sqlite3.connect(copia) as destino:
+            fonte.backup(destino)
+            destino.execute('PRAGMA journal_mode=WAL' if perfil == 'producao' else 'PRAGMA journal_mode=DELETE')
+
+        conexao.close()
+        conexao.settings_dict['NAME'] = str(copia)
+        conexao.settings_dict['OPTIONS'] = (
+            dict(settings.SQLITE_OPCOES_PRODUCAO) if perfil == 'producao' else {}
+        )
+        retentativas = settings.SQLITE_RETENTATIVAS if perfil == 'producao' else 0
+
+        usuario, _ = User.objects.get_or_create(
+            username=USUARIO_BENCHMARK, defaults={'is_superuser': True, 'is_staff': True}
+        )
+        ids = list(Professor.objects.order_by('?').values_list('id', flat=True)[:1000])
+        if not ids:
+            raise CommandError('O banco não tem professores (use gerar_dados_sinteticos).')
+        operacoes = _operacoes(ids)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Perfil {perfil}'))
+        self.stdout.write(f"{'workers':>8} {'req':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'erros':>6}   "
+                          + '  '.join(f'{nome} p50/p99' for nome, _, _ in operacoes))
+        with override_settings(SQLITE_RETENTATIVAS=retentativas, ALLOWED_HOSTS=['testserver'],
+                               SECURE_SSL_REDIRECT=False):
+            for workers in options['workers']:
+                resultado = medir(usuario, operacoes, workers, options['segundos'])
+                geral = resultado['geral']
+                por_operacao = '  '.join(
+                    f"{resultado[nome]['p50_ms']:.0f}/{resultado[nome]['p99_ms']:.0f}"
+                    + (f" ({resultado[nome]['erros']} erros)" if resultado[nome]['erros'] else '')
+                    for nome, _, _ in operacoes
+                )
+                self.stdout.write(
+                    f"{workers:>8} {geral['requisicoes']:>7} {geral['req_s']:>8.1f} "
+                    f"{geral['p50_ms']:>8.1f} {geral['p99_ms']:>8.1f} {geral['erros']:>6}   {por_operacao}"
+                )
@@ -0,0 +1,64 @@
+"""
+Gera dados sintéticos para testes de carga
+
+Uso:
+    python manage.py gerar_dados_sinteticos --professores 50000 --logs 1000000
+    python manage.py gerar_dados_sinteticos --seed 7 --limpar
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from os_app.utils.dados_sinteticos import gerar_dados, limpar_dados, TAMANHO_LOTE_PADRAO
+
+
+class Command(BaseCommand):
+    help = 'Gera núcleos, escolas, professores, usuários e logs sintéticos (determinístico pela semente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--nucleos', type=int, default=10, help='Escolas núcleo (padrão: 10)')
+        parser.add_argument('--escolas', type=int, default=60, help='Escolas de lotação (padrão: 60)')
+        parser.add_argument('--professores', type=int, default=2000, help='Professores (padrão: 2000)')
+        parser.add_argument('--usuarios', type=int, default=20, help='Usuários com perfil (padrão: 20)')
+        parser.add_argument('--logs', type=int, default=20000, help='Logs de auditoria (padrão: 20000)')
+        parser.add_argument('--dias-logs', type=int, default=365,
+                            help='Período (dias) em que os logs são distribuídos (padrão: 365)')
+        parser.add_argument('--seed', type=int, default=42, help='Semente do gerador (padrão: 42)')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE_PADRAO,
+                            help=f'Registros por bulk_create/transação (padrão: {TAMANHO_LOTE_PADRAO})')
+        parser.add_argument('--limpar', action='store_true',
+                            help='Apaga professores, escolas, logs e usuários comuns antes de gerar')
+
+    def handle(self, *args, **options):
+        if options['escolas'] and not options['nucleos']:
+            raise CommandError('É preciso ao menos um núcleo para gerar escolas.')
+        if options['lote'] < 1:
+            raise CommandError('--lote deve ser maior que zero.')
+
+        if options['limpar']:
+            self.stdout.write('Apagando dados existentes...')
+            limpar_dados()
+
+        inicio = time.perf_counter()
+
+        def progresso(modelo, quantidade):
+            self.stdout.write(f'  {modelo}: {quantidade} ({time.perf_counter() - inicio:.1f}s)')
+
+        totais = gerar_dados(
+            nucleos=options['nucleos'],
+            escolas=options['escolas'],
+            professores=options['professores'],
+            usuarios=options['usuarios'],
+            logs=options['logs'],
+            seed=options['seed'],
+            lote=options['lote'],
+            dias_logs=options['dias_logs'],
+            progresso=progresso,
+        )
+
+        total = sum(totais.values())
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} registros gerados em {duracao:.1f}s ({total / max(duracao, 0.001):.0f} registros/s)'
+        ))
@@ -0,0 +1,66 @@
+"""
+Importa professores de um arquivo CSV ou XLSX
+
+Uso:
+    python manage.py importar_professores contratados_2026.xlsx --usuario admin
+    python manage.py importar_professores lista.csv --relatorio erros.csv
+"""
+
+import csv
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from os_app.utils.importacao_professores import (
+    importar_professores, linhas_relatorio, TAMANHO_LOTE_IMPORTACAO, EXTENSOES_ACEITAS
+)
+
+
+class Command(BaseCommand):
+    help = 'Importa professores em massa (CSV ou XLSX), com relatório de erros por linha'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho do arquivo .csv ou .xlsx')
+        parser.add_argument('--usuario', help='Username registrado no log de auditoria')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE_IMPORTACAO,
+                            help=f'Linhas validadas/gravadas por vez (padrão: {TAMANHO_LOTE_IMPORTACAO})')
+        parser.add_argument('--relatorio', help='Grava o relatório de erros neste arquivo CSV')
+
+    def handle(self, *args, **options):
+        caminho = Path(options['arquivo'])
+        if not caminho.is_file():
+            raise CommandError(f'Arquivo não encontrado: {caminho}')
+        if caminho.suffix.lower() not in EXTENSOES_ACEITAS:
+            raise CommandError('Formato não suportado. Use um arquivo .csv ou .xlsx.')
+        if options['lote'] < 1:
+            raise CommandError('--lote deve ser maior que zero.')
+
+        usuario = None
+        if options['usuario']:
+            usuario = User.objects.filter(username=options['usuario']).first()
+            if usuario is None:
+                raise CommandError(f"Usuário não encontrado: {options['usuario']}")
+
+        try:
+            with caminho.open('rb') as arquivo:
+                resultado = importar_professores(
+                    arquivo, caminho.name, usuario=usuario, lote=options['lote']
+                )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for erro in resultado.erros:
+            self.stdout.write(self.style.WARNING(
+                f"  Linha {erro['linha']} ({erro['cpf'] or 'sem CPF'}): {'; '.join(erro['mensagens'])}"
+            ))
+
+        if options['relatorio'] and resultado.erros:
+            with open(options['relatorio'], 'w', newline='', encoding='utf-8-sig') as f:
+                csv.writer(f, delimiter=';').writerows(linhas_relatorio(resultado.erros))
+            self.stdout.write(f"Relatório de erros gravado em {options['relatorio']}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado.importados} de {resultado.total} professor(es) importado(s), '
+            f'{len(resultado.erros)} linha(s) com erro.'
+        ))
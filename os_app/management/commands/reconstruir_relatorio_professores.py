@@ -0,0 +1,35 @@
+"""
+Reconstrói a tabela dos relatórios (ProfessorRelatorio) a partir de Professor
+
+Uso:
+    python manage.py reconstruir_relatorio_professores
+    python manage.py reconstruir_relatorio_professores --lote 10000
+
+No dia a dia a tabela é mantida pelos signals; a reconstrução serve depois
+de cargas que não passam por eles (loaddata, UPDATE/SQL direto no banco)
+ou para conferir divergências.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from os_app.models import ProfessorRelatorio
+
+
+class Command(BaseCommand):
+    help = 'Apaga e regrava a tabela desnormalizada dos relatórios de professores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000,
+                            help='Professores lidos e gravados por vez (padrão: 5000)')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote deve ser maior que zero.')
+
+        inicio = time.perf_counter()
+        total = ProfessorRelatorio.objects.reconstruir(lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} linhas gravadas em {time.perf_counter() - inicio:.1f}s'
+        ))
@@ -0,0 +1,144 @@
+"""
+Repete pelo EXPLAIN as combinações de filtros dos relatórios e aponta as
+que varrem a tabela dos relatórios (ProfessorRelatorio) inteira
+
+Uso:
+    python manage.py sugerir_indices                   # últimos 30 dias da auditoria
+    python manage.py sugerir_indices --dias 90 --max 50 --medir
+    python manage.py sugerir_indices --filtros "area=filosofia&turno=noturno" -v 2
+
+As combinações vêm dos logs REPORT (o AuditoriaMiddleware grava os filtros
+usados em relatorios_resultado em dados_novos['filtros']). Cada uma é
+montada com utils/relatorios.filtrar_professores sobre ProfessorRelatorio,
+ordenada por nome como na view, e passa por QuerySet.explain(). Para as que fazem varredura completa
+ou ordenação em memória, sugere um índice composto com as colunas de
+igualdade seguidas de nome.
+"""
+
+import re
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import QueryDict
+from django.utils import timezone
+
+from os_app.models import LogAuditoria, ProfessorRelatorio
+from os_app.utils.relatorios import filtrar_professores
+
+
+# Filtro da tela -> coluna comparada por igualdade
+COLUNAS_IGUALDADE = {
+    'nucleo': 'nucleo_efetivo_id', 'escola': 'escola_lotacao_id', 'area': 'area_atuacao',
+    'situacao': 'situacao_funcional', 'cargo': 'cargo_id', 'serie': 'serie_id',
+    'modalidade': 'modalidade', 'turno': 'turno', 'bairro': 'bairro_id',
+}
+# Booleano: vira índice parcial (condition) em vez de coluna
+VALORES_EM_SALA = {'sim': True, 'nao': False}
+# Filtros icontains: LIKE '%...%' não usa índice B-tree
+FILTROS_TEXTO = ('ref_global', 'cidade', 'materia')
+
+
+def analisar_plano(plano, vendor):
+    """(varredura completa, ordenação em memória, índices usados) da tabela dos relatórios"""
+    tabela = ProfessorRelatorio._meta.db_table
+    if vendor == 'postgresql':
+        varredura = f'Seq Scan on {tabela}' in plano
+        ordena = bool(re.search(r'\bSort\b', plano))
+        indices = re.findall(r'(?:Index (?:Only )?Scan(?: Backward)? using|Bitmap Index Scan on) (\w+)', plano)
+    else:
+        # "SCAN tabela USING INDEX" percorre só o índice (pode ser parcial)
+        varredura = bool(re.search(rf'\bSCAN {tabela}\s*$', plano, re.MULTILINE))
+        ordena = 'TEMP B-TREE FOR ORDER BY' in plano
+        indices = re.findall(rf'{tabela} USING (?:COVERING )?INDEX (\w+)', plano)
+    return varredura, ordena, sorted(set(indices))
+
+
+def combinacoes_registradas(dias):
+    """Counter {chaves dos filtros: quantidade} e o exemplo mais recente de cada uma"""
+    desde = timezone.now() - timedelta(days=dias)
+    registros = LogAuditoria.objects.filter(
+        acao='REPORT', data_hora__gte=desde, dados_novos__has_key='filtros'
+    ).order_by('data_hora').values_list('dados_novos', flat=True)
+    contagem, exemplos = Counter(), {}
+    for dados in registros.iterator(chunk_size=2000):
+        filtros = dados.get('filtros') or {}
+        chave = tuple(sorted(filtros))
+        contagem[chave] += 1
+        exemplos[chave] = filtros
+    return contagem, exemplos
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN das combinações de filtros dos relatórios e sugestão de índices para ProfessorRelatorio'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=30,
+                            help='Período da auditoria considerado (padrão: 30 dias)')
+        parser.add_argument('--max', type=int, default=20,
+                            help='Combinações mais frequentes analisadas (padrão: 20)')
+        parser.add_argument('--filtros', action='append', default=[],
+                            help='Combinação avulsa como query string (pode repetir)')
+        parser.add_argument('--medir', action='store_true',
+                            help='Também executa o COUNT(*) de cada combinação e mede o tempo')
+
+    def handle(self, *args, **options):
+        if options['filtros']:
+            combinacoes = [(None, QueryDict(texto)) for texto in options['filtros']]
+        else:
+            contagem, exemplos = combinacoes_registradas(options['dias'])
+            sem_filtro = contagem.pop((), 0)
+            if sem_filtro:
+                self.stdout.write(f'{sem_filtro} relatório(s) sem filtro: varredura completa inevitável.')
+            if not contagem:
+                self.stdout.write(self.style.WARNING(
+                    f"Nenhuma combinação de filtros registrada nos últimos {options['dias']} dias "
+                    '(gere relatórios ou use --filtros).'
+                ))
+                return
+            combinacoes = [(n, exemplos[chave]) for chave, n in contagem.most_common(options['max'])]
+
+        sugestoes = Counter()
+        varreduras = 0
+        for vezes, params in combinacoes:
+            professores, _ = filtrar_professores(ProfessorRelatorio.objects.all(), params)
+            professores = professores.order_by('nome')
+            plano = professores.explain()
+            varredura, ordena, indices = analisar_plano(plano, connection.vendor)
+
+            filtros = '&'.join(f'{nome}={params.get(nome)}' for nome in sorted(params))
+            prefixo = f'{vezes:>5}x ' if vezes is not None else ''
+            situacao = []
+            if varredura:
+                situacao.append(self.style.ERROR('VARREDURA'))
+                varreduras += 1
+            if ordena:
+                situacao.append(self.style.WARNING('ORDENA EM MEMÓRIA'))
+            if indices:
+                situacao.append('índice ' + ', '.join(indices))
+            if options['medir']:
+                inicio = time.perf_counter()
+                total = professores.count()
+                situacao.append(f'{total} linhas em {(time.perf_counter() - inicio) * 1000:.1f} ms')
+            self.stdout.write(f"{prefixo}{filtros}: {' | '.join(situacao) or 'ok'}")
+            if options['verbosity'] >= 2:
+                self.stdout.write('        ' + plano.replace('\n', '\n        '))
+
+            if varredura or ordena:
+                colunas = [coluna for nome, coluna in COLUNAS_IGUALDADE.items() if params.get(nome)]
+                em_sala = VALORES_EM_SALA.get(params.get('em_sala'))
+                if colunas or em_sala is not None:
+                    sugestoes[(tuple(colunas + ['nome']), em_sala)] += vezes or 1
+                elif any(params.get(nome) for nome in FILTROS_TEXTO):
+                    self.stdout.write('        só filtros icontains: um índice B-tree não ajuda '
+                                      '(considere busca textual, ver utils/busca.py)')
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{varreduras} de {len(combinacoes)} combinações com varredura completa'
+        ))
+        for (colunas, em_sala), peso in sugestoes.most_common():
+            campos = ', '.join(f"'{coluna}'" for coluna in colunas)
+            condicao = f', condition=Q(em_sala={em_sala})' if em_sala is not None else ''
+            self.stdout.write(f'  models.Index(fields=[{campos}]{condicao})   # {peso} relatório(s)')
@@ -0,0 +1,46 @@
+"""
+Lista professores cujo CPF repete o de outro depois da normalização
+
+Uso:
+    python manage.py verificar_cpfs_duplicados
+
+A migração 0016 deixou cpf_digitos NULL nos professores cujo CPF, só com
+dígitos, já pertencia a outro (ex.: um salvo com pontuação e outro sem).
+Esses cadastros escapam do índice único e precisam ser corrigidos ou
+mesclados à mão. Sai com erro enquanto houver algum, para uso em scripts.
+"""
+
+import re
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from os_app.models import Professor
+
+
+class Command(BaseCommand):
+    help = 'Lista os professores com CPF repetido após a normalização (cpf_digitos vazio)'
+
+    def handle(self, *args, **options):
+        sem_digitos = defaultdict(list)
+        for pk, cpf in Professor.objects.filter(cpf_digitos__isnull=True).values_list('id', 'cpf'):
+            digitos = re.sub(r'\D', '', cpf or '')
+            if digitos:
+                sem_digitos[digitos].append(pk)
+
+        donos = dict(
+            Professor.objects.filter(cpf_digitos__in=sem_digitos).values_list('cpf_digitos', 'id')
+        )
+        conflitos = 0
+        for digitos, ids in sorted(sem_digitos.items()):
+            if digitos not in donos and len(ids) == 1:
+                continue
+            conflitos += 1
+            dono = f'professor {donos[digitos]}' if digitos in donos else 'nenhum com o CPF indexado'
+            self.stdout.write(
+                f"CPF {digitos}: {dono}; sem cpf_digitos: {', '.join(map(str, ids))}"
+            )
+
+        if conflitos:
+            raise CommandError(f'{conflitos} CPF(s) repetido(s) após a normalização.')
+        self.stdout.write(self.style.SUCCESS('Nenhum CPF repetido.'))
@@ -3,8 +3,17 @@
 # Arquivo: os_app/middleware.py (CRIAR ESTE ARQUIVO)
 # ============================================================================
 
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
 from .models import LogAuditoria
+from .utils.perfilamento import MetricasRequisicao, coletor, requisicao_atual
+from .utils.escopo import escopo_do_usuario
+from .utils.replica import alias_replica, marcar_escrita
 
 
 class AuditoriaMiddleware(MiddlewareMixin):
@@ -51,6 +60,9 @@ class AuditoriaMiddleware(MiddlewareMixin):
                 # Cria descrição
                 descricao = self._criar_descricao(request, acao)
                 
+                # Filtros do relatório (lidos pelo comando sugerir_indices)
+                filtros = getattr(request, 'filtros_relatorio', None)
+                
                 # Registra log
                 LogAuditoria.registrar(
                     usuario=request.user,
@@ -58,6 +70,7 @@ class AuditoriaMiddleware(MiddlewareMixin):
                     modelo=modelo,
                     objeto_id=objeto_id,
                     descricao=descricao,
+                    dados_novos={'filtros': filtros} if filtros is not None else None,
                     request=request,
                     sucesso=True
                 )
@@ -158,4 +171,87 @@ class AuditoriaMiddleware(MiddlewareMixin):
         elif acao == 'SEARCH':
             return "Busca/filtro de registros"
         
-        return f"Ação: {acao}"
\ No newline at end of file
+        return f"Ação: {acao}"
+
+
+# ============================================================================
+# MIDDLEWARE DE PERFILAMENTO (DESEMPENHO POR VIEW)
+# ============================================================================
+
+class PerfilamentoMiddleware:
+    """
+    Mede, por url_name, queries, tempo de SQL, tempo de template e latência
+    total de cada requisição, agregando em os_app.utils.perfilamento.coletor.
+
+    Desligado com PERFILAMENTO_ATIVO = False no settings.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.ativo = getattr(settings, 'PERFILAMENTO_ATIVO', True)
+    
+    def __call__(self, request):
+        if not self.ativo or request.path.startswith(('/static/', '/media/')):
+            return self.get_response(request)
+        
+        metricas = MetricasRequisicao()
+        token = requisicao_atual.set(metricas)
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conexao in connections.all():
+                    stack.enter_context(conexao.execute_wrapper(metricas))
+                response = self.get_response(request)
+        finally:
+            requisicao_atual.reset(token)
+        
+        tempo_total = time.perf_counter() - inicio
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.view_name if match else '(sem rota)'
+        coletor.registrar(url_name, metricas, tempo_total)
+        
+        return response
+
+
+# ============================================================================
+# MIDDLEWARE DE ESCOPO (ESCOLA/NÚCLEO VINCULADO)
+# ============================================================================
+
+class EscopoMiddleware:
+    """
+    Disponibiliza request.escopo (os_app.utils.escopo) para as views
+    filtrarem professores, escolas e relatórios com do_escopo().
+    Preguiçoso: só consulta (ou lê do cache) quando uma view o usa.
+    Deve vir depois do AuthenticationMiddleware.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        request.escopo = SimpleLazyObject(lambda: escopo_do_usuario(request.user))
+        return self.get_response(request)
+
+
+# ============================================================================
+# MIDDLEWARE DA RÉPLICA DE LEITURA (LER O QUE ESCREVEU)
+# ============================================================================
+
+class ReplicaMiddleware:
+    """
+    Depois de um POST bem-sucedido de um usuário autenticado, marca na sessão
+    que as próximas leituras (por REPLICA_ADERENCIA_SEGUNDOS) vão para o
+    banco principal, mesmo nas views @leitura_na_replica.
+    Sem réplica configurada não faz nada. Deve vir depois do
+    AuthenticationMiddleware.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (request.method == 'POST' and response.status_code < 400
+                and alias_replica() and request.user.is_authenticated):
+            marcar_escrita(request)
+        return response
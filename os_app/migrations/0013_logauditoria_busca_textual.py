@@ -0,0 +1,88 @@
+"""
+Índice de busca textual para LogAuditoria.
+
+- PostgreSQL: índice GIN sobre o SearchVector(descricao, objeto_repr)
+- SQLite: tabela FTS5 (external content) sincronizada por triggers
+"""
+
+from django.db import migrations
+
+from os_app.utils.busca import TABELA_FTS_LOGS
+
+
+NOME_INDICE_GIN = 'logauditoria_busca_gin'
+
+SQLITE_CRIAR = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS_LOGS} USING fts5(
+        descricao, objeto_repr,
+        content='os_app_logauditoria', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABELA_FTS_LOGS}_ai AFTER INSERT ON os_app_logauditoria BEGIN
+        INSERT INTO {TABELA_FTS_LOGS}(rowid, descricao, objeto_repr)
+        VALUES (new.id, new.descricao, new.objeto_repr);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABELA_FTS_LOGS}_ad AFTER DELETE ON os_app_logauditoria BEGIN
+        INSERT INTO {TABELA_FTS_LOGS}({TABELA_FTS_LOGS}, rowid, descricao, objeto_repr)
+        VALUES ('delete', old.id, old.descricao, old.objeto_repr);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABELA_FTS_LOGS}_au AFTER UPDATE ON os_app_logauditoria BEGIN
+        INSERT INTO {TABELA_FTS_LOGS}({TABELA_FTS_LOGS}, rowid, descricao, objeto_repr)
+        VALUES ('delete', old.id, old.descricao, old.objeto_repr);
+        INSERT INTO {TABELA_FTS_LOGS}(rowid, descricao, objeto_repr)
+        VALUES (new.id, new.descricao, new.objeto_repr);
+    END
+    """,
+    # Indexa os logs já existentes
+    f"INSERT INTO {TABELA_FTS_LOGS}({TABELA_FTS_LOGS}) VALUES ('rebuild')",
+]
+
+SQLITE_REMOVER = [
+    f"DROP TRIGGER IF EXISTS {TABELA_FTS_LOGS}_ai",
+    f"DROP TRIGGER IF EXISTS {TABELA_FTS_LOGS}_ad",
+    f"DROP TRIGGER IF EXISTS {TABELA_FTS_LOGS}_au",
+    f"DROP TABLE IF EXISTS {TABELA_FTS_LOGS}",
+]
+
+
+def _indice_gin():
+    from django.contrib.postgres.indexes import GinIndex
+    from os_app.utils.busca import vetor_busca_logs
+    return GinIndex(vetor_busca_logs(), name=NOME_INDICE_GIN)
+
+
+def criar_indice_busca(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        LogAuditoria = apps.get_model('os_app', 'LogAuditoria')
+        schema_editor.add_index(LogAuditoria, _indice_gin())
+    elif vendor == 'sqlite':
+        for sql in SQLITE_CRIAR:
+            schema_editor.execute(sql)
+
+
+def remover_indice_busca(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        LogAuditoria = apps.get_model('os_app', 'LogAuditoria')
+        schema_editor.remove_index(LogAuditoria, _indice_gin())
+    elif vendor == 'sqlite':
+        for sql in SQLITE_REMOVER:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("os_app", "0012_professor_endereco_campos"),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice_busca, remover_indice_busca),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-19 06:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+def preencher_nucleo_efetivo(apps, schema_editor):
+    """Núcleo da escola de lotação; sem ele, o escola_nucleo (dois UPDATEs)"""
+    Professor = apps.get_model('os_app', 'Professor')
+    Escola = apps.get_model('os_app', 'Escola')
+    Professor.objects.update(nucleo_efetivo=F('escola_nucleo'))
+    Professor.objects.filter(escola_lotacao__nucleo__isnull=False).update(
+        nucleo_efetivo_id=Subquery(
+            Escola.objects.filter(pk=OuterRef('escola_lotacao_id')).values('nucleo_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('os_app', '0013_logauditoria_busca_textual'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='professor',
+            name='nucleo_efetivo',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='professores_efetivos', to='os_app.escolanucleo', verbose_name='Núcleo Efetivo'),
+        ),
+        migrations.RunPython(preencher_nucleo_efetivo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+"""
+Coluna busca_normalizada de Professor e seu índice.
+
+- PostgreSQL: extensão pg_trgm e índice GIN gin_trgm_ops
+- SQLite: tabela FTS5 (tokenizer trigram, external content) com triggers
+"""
+
+from django.db import migrations, models
+
+from os_app.utils.busca import (
+    TABELA_FTS_PROFESSORES, texto_busca_professor, recriar_triggers_busca_professores
+)
+
+
+NOME_INDICE_TRGM = 'professor_busca_trgm'
+
+TAMANHO_LOTE = 2000
+
+
+def preencher_busca_normalizada(apps, schema_editor):
+    Professor = apps.get_model('os_app', 'Professor')
+    lote = []
+    for professor in Professor.objects.only('id', 'nome', 'email', 'cpf', 'matricula').iterator(chunk_size=TAMANHO_LOTE):
+        professor.busca_normalizada = texto_busca_professor(
+            professor.nome, professor.email, professor.cpf, professor.matricula
+        )
+        lote.append(professor)
+        if len(lote) >= TAMANHO_LOTE:
+            Professor.objects.bulk_update(lote, ['busca_normalizada'])
+            lote = []
+    if lote:
+        Professor.objects.bulk_update(lote, ['busca_normalizada'])
+
+
+def _indice_trgm():
+    from django.contrib.postgres.indexes import GinIndex
+    return GinIndex(fields=['busca_normalizada'], opclasses=['gin_trgm_ops'], name=NOME_INDICE_TRGM)
+
+
+def criar_indice_busca(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        Professor = apps.get_model('os_app', 'Professor')
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.add_index(Professor, _indice_trgm())
+    elif vendor == 'sqlite':
+        schema_editor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS_PROFESSORES} USING fts5(
+                busca_normalizada,
+                content='os_app_professor', content_rowid='id',
+                tokenize='trigram'
+            )
+        """)
+        recriar_triggers_busca_professores(schema_editor)
+
+
+def remover_indice_busca(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        Professor = apps.get_model('os_app', 'Professor')
+        schema_editor.remove_index(Professor, _indice_trgm())
+    elif vendor == 'sqlite':
+        for sufixo in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {TABELA_FTS_PROFESSORES}_{sufixo}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABELA_FTS_PROFESSORES}')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("os_app", "0014_professor_nucleo_efetivo"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="professor",
+            name="busca_normalizada",
+            field=models.TextField(blank=True, editable=False, verbose_name="Texto de Busca"),
+        ),
+        migrations.RunPython(preencher_busca_normalizada, migrations.RunPython.noop),
+        migrations.RunPython(criar_indice_busca, remover_indice_busca),
+    ]
@@ -0,0 +1,74 @@
+"""
+Coluna cpf_digitos de Professor (CPF só com dígitos) com índice único.
+
+A coluna é criada sem unicidade, preenchida a partir de cpf e só então
+recebe o índice único. CPFs repetidos após a normalização (ex.: um salvo com
+pontuação e outro sem) ficam com NULL para não bloquear a migração; os ids
+em conflito saem na saída do migrate e o comando verificar_cpfs_duplicados
+os lista de novo a qualquer momento.
+
+No SQLite, alterar a coluna recria a tabela os_app_professor e descarta os
+triggers da busca FTS5, que são reinstalados ao final.
+"""
+
+import re
+
+from django.db import migrations, models
+
+from os_app.utils.busca import recriar_triggers_busca_professores
+
+
+TAMANHO_LOTE = 2000
+
+
+def preencher_cpf_digitos(apps, schema_editor):
+    Professor = apps.get_model('os_app', 'Professor')
+    vistos = {}
+    repetidos = []
+    lote = []
+    for professor in Professor.objects.only('id', 'cpf').order_by('id').iterator(chunk_size=TAMANHO_LOTE):
+        digitos = re.sub(r'\D', '', professor.cpf or '')
+        if not digitos:
+            continue
+        if digitos in vistos:
+            repetidos.append((digitos, vistos[digitos], professor.id))
+            continue
+        vistos[digitos] = professor.id
+        professor.cpf_digitos = digitos
+        lote.append(professor)
+        if len(lote) >= TAMANHO_LOTE:
+            Professor.objects.bulk_update(lote, ['cpf_digitos'])
+            lote = []
+    if lote:
+        Professor.objects.bulk_update(lote, ['cpf_digitos'])
+    if repetidos:
+        print(f'\n  {len(repetidos)} professor(es) com CPF repetido ficaram sem cpf_digitos:')
+        for digitos, dono, pk in repetidos:
+            print(f'    CPF {digitos}: professor {pk} repete o professor {dono}')
+
+
+def reinstalar_triggers_busca(apps, schema_editor):
+    recriar_triggers_busca_professores(schema_editor)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("os_app", "0015_professor_busca_normalizada"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="professor",
+            name="cpf_digitos",
+            field=models.CharField(blank=True, editable=False, max_length=11, null=True,
+                                   verbose_name="CPF (dígitos)"),
+        ),
+        migrations.RunPython(preencher_cpf_digitos, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="professor",
+            name="cpf_digitos",
+            field=models.CharField(blank=True, editable=False, max_length=11, null=True,
+                                   unique=True, verbose_name="CPF (dígitos)"),
+        ),
+        migrations.RunPython(reinstalar_triggers_busca, migrations.RunPython.noop),
+    ]
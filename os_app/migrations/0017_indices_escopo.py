@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-19 06:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('os_app', '0016_professor_cpf_digitos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='escola',
+            index=models.Index(fields=['nucleo', 'nome'], name='escola_nucleo_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='professor',
+            index=models.Index(fields=['nucleo_efetivo', 'nome'], name='prof_nucleo_ef_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='professor',
+            index=models.Index(fields=['escola_lotacao', 'nome'], name='prof_lotacao_nome_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-19 07:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('os_app', '0017_indices_escopo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='professor',
+            index=models.Index(fields=['area_atuacao', 'nome'], name='prof_area_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='professor',
+            index=models.Index(fields=['situacao_funcional', 'nome'], name='prof_situacao_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='professor',
+            index=models.Index(fields=['turno', 'nome'], name='prof_turno_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='professor',
+            index=models.Index(fields=['modalidade', 'nome'], name='prof_modalidade_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='professor',
+            index=models.Index(condition=models.Q(('em_sala', False)), fields=['nome'], name='prof_fora_sala_nome_idx'),
+        ),
+    ]
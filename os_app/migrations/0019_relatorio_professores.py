@@ -0,0 +1,62 @@
+# Generated by Django 5.2.9 on 2026-10-19 07:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('os_app', '0018_indices_relatorios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfessorRelatorio',
+            fields=[
+                ('professor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='linha_relatorio', serialize=False, to='os_app.professor')),
+                ('nome', models.CharField(max_length=100, verbose_name='Nome Completo')),
+                ('cpf', models.CharField(max_length=14, verbose_name='CPF')),
+                ('email', models.EmailField(blank=True, max_length=254, verbose_name='E-mail')),
+                ('telefone', models.CharField(blank=True, max_length=15, verbose_name='Telefone')),
+                ('matricula', models.CharField(blank=True, max_length=20, verbose_name='Matrícula')),
+                ('ref_global', models.CharField(blank=True, max_length=5, verbose_name='Ref. Global')),
+                ('situacao_funcional', models.CharField(blank=True, max_length=20, verbose_name='Situação Funcional')),
+                ('area_atuacao', models.CharField(blank=True, max_length=100, verbose_name='Área de Atuação')),
+                ('modalidade', models.CharField(blank=True, max_length=20, verbose_name='Modalidade')),
+                ('turno', models.CharField(blank=True, max_length=20, verbose_name='Turno')),
+                ('materias', models.CharField(blank=True, max_length=200, verbose_name='Disciplinas')),
+                ('em_sala', models.BooleanField(default=True, verbose_name='Em Sala')),
+                ('carga_horaria', models.IntegerField(blank=True, null=True, verbose_name='Carga Horária')),
+                ('endereco', models.CharField(blank=True, max_length=200, verbose_name='Endereço')),
+                ('cidade', models.CharField(blank=True, max_length=100, verbose_name='Cidade')),
+                ('estado', models.CharField(blank=True, max_length=2, verbose_name='UF')),
+                ('cep', models.CharField(blank=True, max_length=9, verbose_name='CEP')),
+                ('data_cadastro', models.DateTimeField(blank=True, null=True, verbose_name='Data de Cadastro')),
+                ('cargo_id', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('serie_id', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('bairro_id', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('escola_lotacao_id', models.IntegerField(blank=True, null=True)),
+                ('escola_nucleo_id', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('nucleo_efetivo_id', models.IntegerField(blank=True, null=True)),
+                ('cargo_nome', models.CharField(blank=True, max_length=100, verbose_name='Cargo')),
+                ('serie_nome', models.CharField(blank=True, max_length=100, verbose_name='Série')),
+                ('bairro_nome', models.CharField(blank=True, max_length=100, verbose_name='Bairro')),
+                ('situacao_funcional_rotulo', models.CharField(blank=True, max_length=50, verbose_name='Situação')),
+                ('area_atuacao_rotulo', models.CharField(blank=True, max_length=100, verbose_name='Área')),
+                ('modalidade_rotulo', models.CharField(blank=True, max_length=50, verbose_name='Modalidade')),
+                ('turno_rotulo', models.CharField(blank=True, max_length=50, verbose_name='Turno')),
+                ('materias_rotulos', models.CharField(blank=True, max_length=300, verbose_name='Matérias')),
+                ('escola_nome', models.CharField(blank=True, max_length=200, verbose_name='Escola')),
+                ('nucleo_nome', models.CharField(blank=True, max_length=200, verbose_name='Núcleo')),
+                ('escola_endereco', models.CharField(blank=True, max_length=230, verbose_name='End. Escola')),
+                ('escola_zona_rotulo', models.CharField(blank=True, max_length=20, verbose_name='Zona')),
+            ],
+            options={
+                'verbose_name': 'Linha do Relatório de Professores',
+                'verbose_name_plural': 'Relatório de Professores',
+                'ordering': ['nome'],
+                'indexes': [models.Index(fields=['nome'], name='profrel_nome_idx'), models.Index(fields=['nucleo_efetivo_id', 'nome'], name='profrel_nucleo_ef_nome_idx'), models.Index(fields=['escola_lotacao_id', 'nome'], name='profrel_lotacao_nome_idx'), models.Index(fields=['area_atuacao', 'nome'], name='profrel_area_nome_idx'), models.Index(fields=['situacao_funcional', 'nome'], name='profrel_situacao_nome_idx'), models.Index(fields=['turno', 'nome'], name='profrel_turno_nome_idx'), models.Index(fields=['modalidade', 'nome'], name='profrel_modalidade_nome_idx'), models.Index(condition=models.Q(('em_sala', False)), fields=['nome'], name='profrel_fora_sala_nome_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+"""
+Remove de Professor os índices de filtros dos relatórios criados na 0018.
+
+Desde a 0019 os relatórios leem ProfessorRelatorio (índices profrel_*).
+Fica só prof_area_nome_idx, usado pelo filtro por área da lista de professores.
+"""
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('os_app', '0019_relatorio_professores'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='professor',
+            name='prof_situacao_nome_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='professor',
+            name='prof_turno_nome_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='professor',
+            name='prof_modalidade_nome_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='professor',
+            name='prof_fora_sala_nome_idx',
+        ),
+    ]
@@ -0,0 +1,30 @@
+"""
+Preenche ProfessorRelatorio (criada vazia na 0019) a partir de Professor.
+
+Sem isso as instalações existentes ficariam com os relatórios vazios até
+alguém rodar `manage.py reconstruir_relatorio_professores`. Usa a mesma
+regravação do comando (linha_relatorio() dos signals) com os modelos
+históricos.
+"""
+
+from django.db import migrations
+
+from os_app.models import regravar_relatorio
+
+
+def preencher_relatorio(apps, schema_editor):
+    regravar_relatorio(
+        apps.get_model('os_app', 'ProfessorRelatorio'),
+        apps.get_model('os_app', 'Professor'),
+        schema_editor.connection.alias,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("os_app", "0020_remover_indices_relatorio_professor"),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_relatorio, migrations.RunPython.noop),
+    ]
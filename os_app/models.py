@@ -1,8 +1,16 @@
-from django.db import models
+from django.db import connections, models, transaction
 import re
+from itertools import islice
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from django.utils import timezone
+
+from .utils.busca import texto_busca_professor
+from .utils.autocomplete import indice_professores, indice_bairros
+from .utils.tabela_cruzada import retrato_professores
+from .utils import versoes, permissoes
+from .utils.banco import repetir_se_bloqueado
 
 
 
@@ -89,6 +97,38 @@ TIPO_USUARIO_CHOICES = [
     ]
 
 
+# ============================================================================
+# QUERYSETS - Escopo do usuário (utils/escopo.py)
+# ============================================================================
+
+class EscolaNucleoQuerySet(models.QuerySet):
+    def do_escopo(self, escopo):
+        """Núcleos visíveis no escopo (o da escola vinculada ou o vinculado)"""
+        if escopo is None or escopo.irrestrito:
+            return self
+        return self.filter(pk=escopo.nucleo_id)
+
+
+class EscolaQuerySet(models.QuerySet):
+    def do_escopo(self, escopo):
+        """Escolas visíveis no escopo (a vinculada ou as do núcleo vinculado)"""
+        if escopo is None or escopo.irrestrito:
+            return self
+        if escopo.escola_id:
+            return self.filter(pk=escopo.escola_id)
+        return self.filter(nucleo_id=escopo.nucleo_id)
+
+
+class ProfessorQuerySet(models.QuerySet):
+    def do_escopo(self, escopo):
+        """Professores lotados na escola vinculada ou no núcleo vinculado"""
+        if escopo is None or escopo.irrestrito:
+            return self
+        if escopo.escola_id:
+            return self.filter(escola_lotacao_id=escopo.escola_id)
+        return self.filter(nucleo_efetivo_id=escopo.nucleo_id)
+
+
 class EscolaNucleo(models.Model):
     """Escola Principal/Núcleo - Nível superior na hierarquia"""
     nome = models.CharField('Nome do Núcleo', max_length=200)
@@ -106,6 +146,8 @@ class EscolaNucleo(models.Model):
     email = models.EmailField('E-mail', blank=True)
     data_cadastro = models.DateTimeField('Data de Cadastro', auto_now_add=True)
 
+    objects = EscolaNucleoQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Escola Núcleo'
         verbose_name_plural = 'Escolas Núcleo'
@@ -139,10 +181,16 @@ class Escola(models.Model):
     email = models.EmailField('E-mail', blank=True)
     data_cadastro = models.DateTimeField('Data de Cadastro', auto_now_add=True)
 
+    objects = EscolaQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Escola de Lotação'
         verbose_name_plural = 'Escolas de Lotação'
         ordering = ['nome']
+        indexes = [
+            # Escolas do núcleo vinculado, já em ordem de nome
+            models.Index(fields=['nucleo', 'nome'], name='escola_nucleo_nome_idx'),
+        ]
 
     def __str__(self):
         if self.nucleo:
@@ -229,6 +277,9 @@ class Professor(models.Model):
     # Dados Pessoais
     nome = models.CharField('Nome Completo', max_length=100)
     cpf = models.CharField('CPF', max_length=14, unique=True)
+    # Chave canônica (só dígitos): unicidade garantida pelo banco e busca exata por índice
+    cpf_digitos = models.CharField('CPF (dígitos)', max_length=11, unique=True,
+                                   null=True, blank=True, editable=False)
     ref_global = models.CharField('Ref. Global', max_length=5, blank=True, null=True)
     foto = models.ImageField('Foto', upload_to='professores/fotos/', null=True, blank=True, 
                              help_text='Foto do professor (opcional)')
@@ -264,6 +315,17 @@ class Professor(models.Model):
         verbose_name='Escola de Lotação',
         related_name='professores'
     )
+    # Núcleo da escola de lotação ou, sem ela, o escola_nucleo. Mantido em
+    # save() e pelo signal de Escola: filtro por núcleo vira igualdade indexada
+    nucleo_efetivo = models.ForeignKey(
+        EscolaNucleo,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Núcleo Efetivo',
+        related_name='professores_efetivos'
+    )
     
     # Endereço Residencial
     cep = models.CharField('CEP', max_length=9, blank=True)
@@ -320,10 +382,23 @@ class Professor(models.Model):
     data_cadastro = models.DateTimeField('Data de Cadastro', auto_now_add=True)
     data_atualizacao = models.DateTimeField('Última Atualização', auto_now=True)
     
+    # Nome, e-mail, CPF e matrícula normalizados (ver utils/busca.py)
+    busca_normalizada = models.TextField('Texto de Busca', blank=True, editable=False)
+    
+    objects = ProfessorQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Professor'
         verbose_name_plural = 'Professores'
         ordering = ['nome']
+        indexes = [
+            # Escopo do usuário (utils/escopo.py) já na ordem da listagem
+            models.Index(fields=['nucleo_efetivo', 'nome'], name='prof_nucleo_ef_nome_idx'),
+            models.Index(fields=['escola_lotacao', 'nome'], name='prof_lotacao_nome_idx'),
+            # Filtro por área da lista de professores (?area=), na ordem por nome.
+            # Os demais filtros dos relatórios leem ProfessorRelatorio (índices profrel_*)
+            models.Index(fields=['area_atuacao', 'nome'], name='prof_area_nome_idx'),
+        ]
     
     def __str__(self):
         return self.nome
@@ -344,20 +419,280 @@ class Professor(models.Model):
             self.cpf = re.sub(r'\D', '', self.cpf)
             if len(self.cpf) == 11:
                 self.cpf = f"{self.cpf[:3]}.{self.cpf[3:6]}.{self.cpf[6:9]}-{self.cpf[9:]}"
+        self.cpf_digitos = re.sub(r'\D', '', self.cpf or '') or None
+        
+        self.nucleo_efetivo_id = self.calcular_nucleo_efetivo()
+        self.busca_normalizada = self.texto_busca()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if {'escola_lotacao', 'escola_nucleo'} & update_fields:
+                update_fields.add('nucleo_efetivo')
+            if {'nome', 'email', 'cpf', 'matricula'} & update_fields:
+                update_fields.add('busca_normalizada')
+            if 'cpf' in update_fields:
+                update_fields.add('cpf_digitos')
+            kwargs['update_fields'] = update_fields
         
         super().save(*args, **kwargs)
     
+    def texto_busca(self):
+        """Valor de busca_normalizada (também usado nos bulk_create)"""
+        return texto_busca_professor(self.nome, self.email, self.cpf, self.matricula)
+    
+    def calcular_nucleo_efetivo(self):
+        """Núcleo da escola de lotação; sem ela (ou sem núcleo), o escola_nucleo"""
+        if self.escola_lotacao_id and self.escola_lotacao.nucleo_id:
+            return self.escola_lotacao.nucleo_id
+        return self.escola_nucleo_id
+    
     @property
     def escola_atual(self):
         """Retorna a escola de lotação ou núcleo"""
         return self.escola_lotacao or self.escola_nucleo
     
+    def get_materias_display(self):
+        """Rótulos das matérias gravadas em disciplinas"""
+        rotulos = dict(MATERIAS_CHOICES)
+        return [rotulos.get(m.strip(), m.strip()) for m in self.disciplinas.split(',') if m.strip()]
+    
     @property
     def cpf_formatado(self):
         """Retorna CPF formatado"""
         return self.cpf
 
 
+# ============================================================================
+# TABELA DE RELATÓRIOS - Professores com escola, núcleo e rótulos já resolvidos
+# ============================================================================
+
+# IN (...) por comando ao sincronizar
+LOTE_SINCRONIZACAO = 1000
+
+# Colunas de Professor (com os JOINs) de onde saem as linhas de ProfessorRelatorio
+CAMPOS_ORIGEM_RELATORIO = (
+    'pk', 'nome', 'cpf', 'email', 'telefone', 'matricula', 'ref_global',
+    'situacao_funcional', 'area_atuacao', 'modalidade', 'turno', 'disciplinas',
+    'em_sala', 'carga_horaria', 'endereco', 'cidade', 'estado', 'cep', 'data_cadastro',
+    'cargo_id', 'serie_id', 'bairro_id', 'escola_lotacao_id', 'escola_nucleo_id',
+    'nucleo_efetivo_id', 'cargo__nome', 'serie__nome', 'bairro__nome',
+    'escola_lotacao__nome', 'escola_lotacao__endereco', 'escola_lotacao__numero',
+    'escola_lotacao__zona', 'escola_lotacao__nucleo__nome',
+    'escola_nucleo__nome', 'escola_nucleo__endereco', 'escola_nucleo__numero',
+    'escola_nucleo__zona',
+)
+
+_ROTULOS = {
+    'situacao_funcional': dict(SITUACAO_FUNCIONAL_CHOICES),
+    'area_atuacao': dict(AREA_ATUACAO_CHOICES),
+    'modalidade': dict(MODALIDADE_CHOICES),
+    'turno': dict(TURNO_CHOICES),
+    'zona': dict(ZONA_CHOICES),
+    'materias': dict(MATERIAS_CHOICES),
+}
+
+
+def _rotulo(campo, valor):
+    return _ROTULOS[campo].get(valor, valor) if valor else ''
+
+
+def linha_relatorio(origem):
+    """Valores de ProfessorRelatorio a partir de um dict com CAMPOS_ORIGEM_RELATORIO"""
+    # Escola exibida: a de lotação ou, sem ela, o escola_nucleo
+    escola = 'escola_lotacao' if origem['escola_lotacao_id'] else 'escola_nucleo'
+    tem_escola = bool(origem['escola_lotacao_id'] or origem['escola_nucleo_id'])
+    materias = [m.strip() for m in (origem['disciplinas'] or '').split(',') if m.strip()]
+    return {
+        'professor_id': origem['pk'],
+        'nome': origem['nome'],
+        'cpf': origem['cpf'],
+        'email': origem['email'] or '',
+        'telefone': origem['telefone'] or '',
+        'matricula': origem['matricula'] or '',
+        'ref_global': origem['ref_global'] or '',
+        'situacao_funcional': origem['situacao_funcional'],
+        'area_atuacao': origem['area_atuacao'],
+        'modalidade': origem['modalidade'],
+        'turno': origem['turno'],
+        'materias': origem['disciplinas'],
+        'em_sala': origem['em_sala'],
+        'carga_horaria': origem['carga_horaria'],
+        'endereco': origem['endereco'],
+        'cidade': origem['cidade'],
+        'estado': origem['estado'],
+        'cep': origem['cep'],
+        'data_cadastro': origem['data_cadastro'],
+        'cargo_id': origem['cargo_id'],
+        'serie_id': origem['serie_id'],
+        'bairro_id': origem['bairro_id'],
+        'escola_lotacao_id': origem['escola_lotacao_id'],
+        'escola_nucleo_id': origem['escola_nucleo_id'],
+        'nucleo_efetivo_id': origem['nucleo_efetivo_id'],
+        'cargo_nome': origem['cargo__nome'] or '',
+        'serie_nome': origem['serie__nome'] or '',
+        'bairro_nome': origem['bairro__nome'] or '',
+        'situacao_funcional_rotulo': _rotulo('situacao_funcional', origem['situacao_funcional']),
+        'area_atuacao_rotulo': _rotulo('area_atuacao', origem['area_atuacao']),
+        'modalidade_rotulo': _rotulo('modalidade', origem['modalidade']),
+        'turno_rotulo': _rotulo('turno', origem['turno']),
+        'materias_rotulos': ', '.join(_rotulo('materias', m) for m in materias)[:300],
+        'escola_nome': origem['escola_lotacao__nome'] or '',
+        'nucleo_nome': origem['escola_nucleo__nome'] or origem['escola_lotacao__nucleo__nome'] or '',
+        'escola_endereco': ', '.join(
+            v for v in (origem[f'{escola}__endereco'], origem[f'{escola}__numero']) if v
+        ) if tem_escola else '',
+        'escola_zona_rotulo': _rotulo('zona', origem[f'{escola}__zona']) if tem_escola else '',
+    }
+
+
+class ProfessorRelatorioQuerySet(ProfessorQuerySet):
+    def sincronizar(self, ids):
+        """Refaz as linhas dos professores de `ids` (e apaga as de quem não existe mais)"""
+        ids = sorted(set(ids))
+        colunas = [campo.name for campo in self.model._meta.concrete_fields if not campo.primary_key]
+        gravadas = 0
+        for inicio in range(0, len(ids), LOTE_SINCRONIZACAO):
+            bloco = ids[inicio:inicio + LOTE_SINCRONIZACAO]
+            linhas = [
+                ProfessorRelatorio(**linha_relatorio(origem))
+                for origem in Professor.objects.filter(pk__in=bloco).order_by()
+                .values(*CAMPOS_ORIGEM_RELATORIO)
+            ]
+            if linhas:
+                self.bulk_create(linhas, update_conflicts=True,
+                                 unique_fields=['professor'], update_fields=colunas)
+            removidos = set(bloco) - {linha.pk for linha in linhas}
+            if removidos:
+                self.filter(pk__in=removidos).delete()
+            gravadas += len(linhas)
+        return gravadas
+
+    def reconstruir(self, lote=5000):
+        """Apaga e regrava a tabela inteira numa transação (ver regravar_relatorio)"""
+        return regravar_relatorio(self.model, Professor, self.db, lote)
+
+
+def regravar_relatorio(relatorio, professor, banco, lote=5000):
+    """
+    Apaga e regrava a tabela dos relatórios numa transação. Uma única leitura
+    de Professor e INSERT preparado com executemany (como em
+    utils/dados_sinteticos.py): o bulk_create compilaria o SQL campo a campo
+    de cada linha. Recebe os modelos para a migração 0021 usar os históricos
+    """
+    conexao = connections[banco]
+    campos = relatorio._meta.concrete_fields
+    quote = conexao.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(relatorio._meta.db_table),
+        ', '.join(quote(campo.column) for campo in campos),
+        ', '.join(['%s'] * len(campos)),
+    )
+    adaptar_data = conexao.ops.adapt_datetimefield_value
+
+    def tupla(origem):
+        linha = linha_relatorio(origem)
+        linha['data_cadastro'] = adaptar_data(linha['data_cadastro'])
+        return tuple(linha[campo.attname] for campo in campos)
+
+    origens = professor.objects.using(banco).order_by('pk').values(
+        *CAMPOS_ORIGEM_RELATORIO
+    ).iterator(chunk_size=lote)
+    total = 0
+    with transaction.atomic(using=banco):
+        relatorio.objects.using(banco).all().delete()
+        with conexao.cursor() as cursor:
+            while True:
+                bloco = [tupla(origem) for origem in islice(origens, lote)]
+                if not bloco:
+                    return total
+                cursor.executemany(sql, bloco)
+                total += len(bloco)
+
+
+class ProfessorRelatorio(models.Model):
+    """
+    Uma linha por professor com tudo o que os relatórios exibem: nomes de
+    escola, núcleo, cargo, série e bairro e os rótulos dos choices. Os
+    relatórios leem só esta tabela, sem JOIN. Mantida pelos signals de
+    Professor e dos cadastros auxiliares (e pelas operações em lote e
+    importação, que não disparam signals); reconstrução completa com
+    `manage.py reconstruir_relatorio_professores`.
+
+    Os filtros usam os mesmos nomes de coluna de Professor (cargo_id,
+    nucleo_efetivo_id, area_atuacao...), então utils/relatorios.py e
+    do_escopo() valem para as duas tabelas.
+    """
+    professor = models.OneToOneField(
+        Professor, on_delete=models.CASCADE, primary_key=True, related_name='linha_relatorio'
+    )
+
+    # Copiados de Professor
+    nome = models.CharField('Nome Completo', max_length=100)
+    cpf = models.CharField('CPF', max_length=14)
+    email = models.EmailField('E-mail', blank=True)
+    telefone = models.CharField('Telefone', max_length=15, blank=True)
+    matricula = models.CharField('Matrícula', max_length=20, blank=True)
+    ref_global = models.CharField('Ref. Global', max_length=5, blank=True)
+    situacao_funcional = models.CharField('Situação Funcional', max_length=20, blank=True)
+    area_atuacao = models.CharField('Área de Atuação', max_length=100, blank=True)
+    modalidade = models.CharField('Modalidade', max_length=20, blank=True)
+    turno = models.CharField('Turno', max_length=20, blank=True)
+    materias = models.CharField('Disciplinas', max_length=200, blank=True)
+    em_sala = models.BooleanField('Em Sala', default=True)
+    carga_horaria = models.IntegerField('Carga Horária', null=True, blank=True)
+    endereco = models.CharField('Endereço', max_length=200, blank=True)
+    cidade = models.CharField('Cidade', max_length=100, blank=True)
+    estado = models.CharField('UF', max_length=2, blank=True)
+    cep = models.CharField('CEP', max_length=9, blank=True)
+    data_cadastro = models.DateTimeField('Data de Cadastro', null=True, blank=True)
+
+    # Chaves (sem FK: filtro e escopo, sem JOIN nem restrição)
+    cargo_id = models.IntegerField(null=True, blank=True, db_index=True)
+    serie_id = models.IntegerField(null=True, blank=True, db_index=True)
+    bairro_id = models.IntegerField(null=True, blank=True, db_index=True)
+    escola_lotacao_id = models.IntegerField(null=True, blank=True)
+    escola_nucleo_id = models.IntegerField(null=True, blank=True, db_index=True)
+    nucleo_efetivo_id = models.IntegerField(null=True, blank=True)
+
+    # Já resolvidos
+    cargo_nome = models.CharField('Cargo', max_length=100, blank=True)
+    serie_nome = models.CharField('Série', max_length=100, blank=True)
+    bairro_nome = models.CharField('Bairro', max_length=100, blank=True)
+    situacao_funcional_rotulo = models.CharField('Situação', max_length=50, blank=True)
+    area_atuacao_rotulo = models.CharField('Área', max_length=100, blank=True)
+    modalidade_rotulo = models.CharField('Modalidade', max_length=50, blank=True)
+    turno_rotulo = models.CharField('Turno', max_length=50, blank=True)
+    materias_rotulos = models.CharField('Matérias', max_length=300, blank=True)
+    escola_nome = models.CharField('Escola', max_length=200, blank=True)
+    # escola_nucleo ou, sem ele, o núcleo da escola de lotação
+    nucleo_nome = models.CharField('Núcleo', max_length=200, blank=True)
+    # Da escola de lotação ou, sem ela, do escola_nucleo
+    escola_endereco = models.CharField('End. Escola', max_length=230, blank=True)
+    escola_zona_rotulo = models.CharField('Zona', max_length=20, blank=True)
+
+    objects = ProfessorRelatorioQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Linha do Relatório de Professores'
+        verbose_name_plural = 'Relatório de Professores'
+        ordering = ['nome']
+        indexes = [
+            # Relatório sem filtro: lido já na ordem de nome
+            models.Index(fields=['nome'], name='profrel_nome_idx'),
+            # Os mesmos de Professor (escopo e filtros de igualdade, ver sugerir_indices)
+            models.Index(fields=['nucleo_efetivo_id', 'nome'], name='profrel_nucleo_ef_nome_idx'),
+            models.Index(fields=['escola_lotacao_id', 'nome'], name='profrel_lotacao_nome_idx'),
+            models.Index(fields=['area_atuacao', 'nome'], name='profrel_area_nome_idx'),
+            models.Index(fields=['situacao_funcional', 'nome'], name='profrel_situacao_nome_idx'),
+            models.Index(fields=['turno', 'nome'], name='profrel_turno_nome_idx'),
+            models.Index(fields=['modalidade', 'nome'], name='profrel_modalidade_nome_idx'),
+            models.Index(fields=['nome'], condition=models.Q(em_sala=False), name='profrel_fora_sala_nome_idx'),
+        ]
+
+    def __str__(self):
+        return self.nome
+
+
 # ============================================================================
 # MODELO DE PERFIL DE USUÁRIO
 # ============================================================================
@@ -544,6 +879,63 @@ class PerfilUsuario(models.Model):
     def __str__(self):
         return f"{self.usuario.username} - {self.get_tipo_usuario_display()}"
     
+    # ====================================================================
+    # CAMPOS ALTERADOS - save() grava só o que mudou desde a leitura
+    # ====================================================================
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._guardar_valores_originais()
+        return instance
+    
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._guardar_valores_originais()
+    
+    def _valor_campo(self, campo):
+        valor = self.__dict__[campo.attname]
+        # FieldFile é alterado no lugar por .save(): compara pelo nome
+        return getattr(valor, 'name', valor) if isinstance(campo, models.FileField) else valor
+    
+    def _guardar_valores_originais(self):
+        self._valores_originais = {
+            campo.attname: self._valor_campo(campo)
+            for campo in self._meta.concrete_fields
+            if campo.attname in self.__dict__
+        }
+    
+    def campos_alterados(self):
+        """
+        attnames alterados desde a leitura do banco (ou o último save);
+        None se a instância não veio do banco (não há como comparar)
+        """
+        originais = getattr(self, '_valores_originais', None)
+        if originais is None:
+            return None
+        alterados = set()
+        for campo in self._meta.concrete_fields:
+            nome = campo.attname
+            # Deferidos e nunca atribuídos não entram
+            if campo.primary_key or nome not in self.__dict__:
+                continue
+            if (nome not in originais or self._valor_campo(campo) != originais[nome]
+                    or getattr(self.__dict__[nome], '_committed', True) is False):
+                alterados.add(nome)
+        return alterados
+    
+    def save(self, *args, **kwargs):
+        # Sem update_fields explícito: UPDATE só das colunas alteradas e
+        # nenhuma escrita (nem signals) quando nada mudou
+        if (not self._state.adding and not args and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            alterados = self.campos_alterados()
+            if alterados is not None:
+                if not alterados:
+                    return
+                kwargs['update_fields'] = alterados | {'data_atualizacao'}
+        super().save(*args, **kwargs)
+        self._guardar_valores_originais()
+    
     @property
     def nome_completo(self):
         """Retorna nome completo ou username"""
@@ -554,34 +946,19 @@ class PerfilUsuario(models.Model):
         """Retorna email do usuário"""
         return self.usuario.email
     
+    @property
+    def mascara_permissoes(self):
+        """Campos pode_* compactados em bits (ver utils/permissoes.py)"""
+        return permissoes.mascara_do_perfil(self)
+    
     def tem_permissao(self, permissao):
         """Verifica se usuário tem permissão específica"""
         # Admin sempre tem todas as permissões
         if self.usuario.is_superuser or self.tipo_usuario == 'ADMIN':
             return True
         
-        permissoes_map = {
-            # Professores
-            'criar_professor': self.pode_criar_professor,
-            'editar_professor': self.pode_editar_professor,
-            'excluir_professor': self.pode_excluir_professor,
-            
-            # Escolas Núcleo
-            'criar_escola_nucleo': self.pode_criar_escola_nucleo,
-            'editar_escola_nucleo': self.pode_editar_escola_nucleo,
-            'excluir_escola_nucleo': self.pode_excluir_escola_nucleo,
-            
-            # Escolas Dependentes
-            'criar_escola_dependente': self.pode_criar_escola_dependente,
-            'editar_escola_dependente': self.pode_editar_escola_dependente,
-            'excluir_escola_dependente': self.pode_excluir_escola_dependente,
-            
-            # Gerais
-            'gerar_relatorios': self.pode_gerar_relatorios,
-            'exportar_dados': self.pode_exportar_dados,
-        }
-        
-        return permissoes_map.get(permissao, False)
+        bit = permissoes.BITS.get(permissao)
+        return bool(bit and self.mascara_permissoes & bit)
 
 
 # ============================================================================
@@ -597,10 +974,192 @@ def criar_perfil_usuario(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=User)
 def salvar_perfil_usuario(sender, instance, **kwargs):
-    """Salva perfil quando usuário é salvo"""
-    if hasattr(instance, 'perfil'):
+    """
+    Salva o perfil quando usuário é salvo, se ele já estiver carregado
+    (quem não o leu não o alterou): o login, que grava só last_login, não
+    consulta nem grava o perfil, e save() ignora perfis sem alterações
+    """
+    if User.perfil.is_cached(instance):
         instance.perfil.save()
     
+# ============================================================================
+# SIGNALS - Permissões e escopo em cache (utils/permissoes.py, utils/escopo.py)
+# ============================================================================
+
+@receiver(post_save, sender=PerfilUsuario)
+@receiver(post_delete, sender=PerfilUsuario)
+def invalidar_permissoes_usuario(sender, instance, **kwargs):
+    permissoes.perfil_alterado(instance.usuario_id)
+
+
+# ============================================================================
+# SIGNALS - Núcleo dos professores ao mudar o núcleo da escola
+# ============================================================================
+
+@receiver(post_save, sender=Escola)
+def sincronizar_nucleo_professores(sender, instance, created, raw=False, **kwargs):
+    """Atualiza escola_nucleo/nucleo_efetivo dos lotados (um único UPDATE)"""
+    if created or raw:
+        return
+    professores = Professor.objects.filter(escola_lotacao=instance)
+    # data_atualizacao acompanha a mudança (ETag do detalhe, caches por data)
+    if instance.nucleo_id:
+        alterados = professores.exclude(
+            escola_nucleo_id=instance.nucleo_id, nucleo_efetivo_id=instance.nucleo_id
+        ).update(escola_nucleo_id=instance.nucleo_id, nucleo_efetivo_id=instance.nucleo_id,
+                 data_atualizacao=timezone.now())
+    else:
+        alterados = professores.exclude(
+            nucleo_efetivo=models.F('escola_nucleo')
+        ).exclude(
+            nucleo_efetivo__isnull=True, escola_nucleo__isnull=True
+        ).update(nucleo_efetivo=models.F('escola_nucleo'), data_atualizacao=timezone.now())
+    if alterados:
+        # O autocomplete filtra pelo núcleo efetivo (escopo do usuário)
+        transaction.on_commit(indice_professores.invalidar)
+
+
+# ============================================================================
+# SIGNALS - Índices em memória dos autocompletes (utils/autocomplete.py)
+# ============================================================================
+
+@receiver(post_save, sender=Professor)
+def atualizar_autocomplete_professor(sender, instance, raw=False, **kwargs):
+    if not raw:
+        indice_professores.objeto_salvo(instance)
+
+
+@receiver(post_delete, sender=Professor)
+def remover_autocomplete_professor(sender, instance, **kwargs):
+    indice_professores.objeto_removido(instance)
+
+
+@receiver(post_save, sender=Bairro)
+def atualizar_autocomplete_bairro(sender, instance, raw=False, **kwargs):
+    if not raw:
+        indice_bairros.objeto_salvo(instance)
+
+
+@receiver(post_delete, sender=Bairro)
+def remover_autocomplete_bairro(sender, instance, **kwargs):
+    indice_bairros.objeto_removido(instance)
+
+
+# ============================================================================
+# SIGNALS - Retrato colunar das tabelas cruzadas (utils/tabela_cruzada.py)
+# ============================================================================
+
+@receiver(post_save, sender=Professor)
+def atualizar_retrato_professor(sender, instance, raw=False, **kwargs):
+    if not raw:
+        retrato_professores.objeto_salvo(instance)
+
+
+@receiver(post_delete, sender=Professor)
+def remover_retrato_professor(sender, instance, **kwargs):
+    retrato_professores.objeto_removido(instance)
+
+
+@receiver(post_save, sender=Escola)
+def escola_alterada_retrato(sender, instance, created, raw=False, **kwargs):
+    """Mudança de núcleo vira UPDATE em nucleo_efetivo (sincronizar_nucleo_professores)"""
+    if not created and not raw:
+        retrato_professores.invalidar_apos_commit()
+
+
+@receiver(post_delete, sender=EscolaNucleo)
+@receiver(post_delete, sender=Escola)
+@receiver(post_delete, sender=Cargo)
+@receiver(post_delete, sender=Serie)
+@receiver(post_delete, sender=Bairro)
+@receiver(post_delete, sender=Motivo)
+def cadastro_removido_retrato(sender, **kwargs):
+    """Remoções viram SET_NULL nos professores, sem post_save"""
+    retrato_professores.invalidar_apos_commit()
+
+
+# ============================================================================
+# SIGNALS - Tabela de relatórios (ProfessorRelatorio)
+# A remoção de professor apaga a linha pelo CASCADE. Registrados depois de
+# sincronizar_nucleo_professores: leem os professores já atualizados
+# ============================================================================
+
+@receiver(post_save, sender=Professor)
+def sincronizar_relatorio_professor(sender, instance, raw=False, **kwargs):
+    if not raw:
+        ProfessorRelatorio.objects.sincronizar([instance.pk])
+
+
+@receiver(post_save, sender=Escola)
+@receiver(post_delete, sender=Escola)
+def sincronizar_relatorio_escola(sender, instance, created=False, raw=False, **kwargs):
+    """Professores lotados na escola (nome, endereço, zona e núcleo)"""
+    if created or raw:
+        return
+    ProfessorRelatorio.objects.sincronizar(
+        ProfessorRelatorio.objects.filter(escola_lotacao_id=instance.pk).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=EscolaNucleo)
+@receiver(post_delete, sender=EscolaNucleo)
+def sincronizar_relatorio_nucleo(sender, instance, created=False, raw=False, **kwargs):
+    """Professores do núcleo, diretamente ou pela escola de lotação"""
+    if created or raw:
+        return
+    ProfessorRelatorio.objects.sincronizar(
+        ProfessorRelatorio.objects.filter(
+            models.Q(escola_nucleo_id=instance.pk) | models.Q(nucleo_efetivo_id=instance.pk)
+        ).values_list('pk', flat=True)
+    )
+
+
+# Cadastro auxiliar -> prefixo das colunas <coluna>_id / <coluna>_nome
+_COLUNAS_RELATORIO = {Cargo: 'cargo', Serie: 'serie', Bairro: 'bairro'}
+
+
+@receiver(post_save, sender=Cargo)
+@receiver(post_save, sender=Serie)
+@receiver(post_save, sender=Bairro)
+def renomear_no_relatorio(sender, instance, created, raw=False, **kwargs):
+    """Novo nome do cargo/série/bairro nas linhas que o usam (um único UPDATE)"""
+    if created or raw:
+        return
+    coluna = _COLUNAS_RELATORIO[sender]
+    ProfessorRelatorio.objects.filter(**{f'{coluna}_id': instance.pk}).update(
+        **{f'{coluna}_nome': instance.nome}
+    )
+
+
+@receiver(post_delete, sender=Cargo)
+@receiver(post_delete, sender=Serie)
+@receiver(post_delete, sender=Bairro)
+def remover_do_relatorio(sender, instance, **kwargs):
+    """Espelha o SET_NULL de Professor"""
+    coluna = _COLUNAS_RELATORIO[sender]
+    ProfessorRelatorio.objects.filter(**{f'{coluna}_id': instance.pk}).update(
+        **{f'{coluna}_id': None, f'{coluna}_nome': ''}
+    )
+
+
+# ============================================================================
+# SIGNALS - Carimbos de versão dos JSON de referência (utils/versoes.py)
+# ============================================================================
+
+@receiver(post_save, sender=EscolaNucleo)
+@receiver(post_delete, sender=EscolaNucleo)
+@receiver(post_save, sender=Escola)
+@receiver(post_delete, sender=Escola)
+@receiver(post_save, sender=Serie)
+@receiver(post_delete, sender=Serie)
+@receiver(post_save, sender=Motivo)
+@receiver(post_delete, sender=Motivo)
+@receiver(post_save, sender=Cargo)
+@receiver(post_delete, sender=Cargo)
+def versionar_dados_referencia(sender, **kwargs):
+    versoes.modelo_alterado(sender)
+
+
 # ============================================================================
 # MODELO DE LOG DE AUDITORIA
 
@@ -746,6 +1305,7 @@ class LogAuditoria(models.Model):
         return f"{usuario_nome} - {self.get_acao_display()} - {self.data_hora.strftime('%d/%m/%Y %H:%M')}"
     
     @classmethod
+    @repetir_se_bloqueado
     def registrar(cls, usuario, acao, modelo=None, objeto_id=None, objeto_repr=None,
                   descricao='', dados_anteriores=None, dados_novos=None,
                   request=None, sucesso=True, mensagem_erro=''):
@@ -0,0 +1,27 @@
+"""
+Template tags de permissão
+Arquivo: os_app/templatetags/permissoes.py
+
+Uso:
+    {% load permissoes %}
+    {% pode 'editar_professor' as pode_editar %}
+    {% if pode_editar %}...{% endif %}
+
+Lê a máscara de bits do request (utils/permissoes.py): verificar antes de
+um loop, ou até dentro dele, não consulta o banco.
+"""
+
+from django import template
+
+from ..utils.permissoes import tem_permissao
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def pode(context, permissao):
+    """True se o usuário da requisição tiver a permissão (nome sem 'pode_')"""
+    request = context.get('request')
+    if request is None:
+        return False
+    return tem_permissao(request, permissao)
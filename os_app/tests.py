@@ -1,3 +1,1196 @@
-from django.test import TestCase
+"""
+Testes do os_app
 
-# Create your tests here.
+EscritasPerfilTest: quantidade de INSERT/UPDATE no login e na criação de
+usuário (PerfilUsuario grava só os campos alterados).
+
+BuscaProfessoresTriggersTest: depois do migrate os três triggers que mantêm
+a FTS5 de professores (SQLite) existem e acompanham INSERT/UPDATE/DELETE.
+
+SelectLazyTest: o ProfessorForm inválido com pk adulterado (não numérico
+ou inexistente) nos selects preguiçosos renderiza com o erro de escolha
+inválida, sem opção para o valor.
+
+EscopoProfessoresTest: coordenadores vinculados a uma escola ou a um núcleo
+só enxergam e alteram professores do próprio recorte (detalhe, edição,
+exclusão, lista, relatórios, tabela cruzada, lote, autocomplete, cadastro
+e importação).
+
+RelatorioProfessoresSyncTest: depois de cada caminho de escrita (save,
+delete, renomear cadastros, escola trocando de núcleo, operações em lote,
+importação e a migração 0021) as linhas de ProfessorRelatorio são iguais a
+linha_relatorio() calculada de Professor.
+
+DetalheProfessorEtagTest: a ETag do detalhe do professor muda quando a
+escola do professor troca de núcleo (signal), quando um cadastro exibido é
+renomeado e quando as permissões do usuário mudam; sem mudança, 304.
+
+AutocompleteIndiceTest: a ETag do autocomplete vem do carimbo de versão e
+do log de alterações (a mesma em outro worker); outro worker aplica as
+gravações do log sem consultar o banco, recarrega quando o log tem buraco e
+consulta o cache no máximo uma vez por AUTOCOMPLETE_INTERVALO_SINCRONIA.
+
+TabelaCruzadaTest: contagens e somas de carga horária da tabela cruzada são
+iguais a um GROUP BY (values().annotate()) no banco, com e sem escopo e
+depois de inclusões/exclusões aplicadas ao retrato; dimensões ou medida
+inválidas respondem 400.
+
+FiltrosRelatorioTest: o PDF do relatório lista os mesmos professores da
+tela para os mesmos filtros (intervalos inclusive); filtros com cadastros
+inexistentes não quebram filtrar_professores.
+
+LimiteConsultaTest: com um limite minúsculo a consulta dos relatórios é
+interrompida, vira a página 503 de refinar filtros, é registrada no log e o
+progress handler do SQLite é removido ao final.
+
+ImportacaoProfessoresTest: importação CSV/XLSX grava as linhas válidas,
+rejeita as inválidas (CPF, e-mail, tamanho dos campos, duplicados) com o
+erro por linha e registra um único log IMPORT; CPF em célula numérica do
+XLSX recupera os zeros à esquerda e um conflito na gravação do lote recusa
+só a linha que falhou.
+
+ReplicaLeituraTest: views @leitura_na_replica leem de um segundo SQLite
+(cópia do banco de teste no papel de réplica), exceto logo após um POST do
+usuário; sem réplica configurada tudo vai para o 'default'.
+
+BenchmarkViewsTest: popula um município sintético (utils/dados_sinteticos.py,
+o mesmo do comando gerar_dados_sinteticos), acessa
+todas as rotas GET de os_app/urls.py com um usuário de cada tipo
+(TIPO_USUARIO_CHOICES) e compara número de queries, tempo e pico de memória
+com a linha de base em os_app/benchmark_baseline.json. Queries são sempre
+comparadas; tempo e memória só com SISPROF_BENCH_TEMPO=1 (variam com a
+carga da máquina e deixariam a CI intermitente).
+
+Variáveis de ambiente:
+    SISPROF_BENCH_NUCLEOS / _ESCOLAS / _PROFESSORES / _LOGS  tamanho do município
+    SISPROF_BENCH_ATUALIZAR=1       regrava a linha de base com os valores atuais
+    SISPROF_BENCH_TEMPO=1           também compara tempo e pico de memória
+    SISPROF_BENCH_TOLERANCIA_TEMPO  fator aceito sobre o tempo da linha de base (padrão 5)
+"""
+
+import csv
+import gc
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, connection, connections, router
+from django.db.models import Count, Sum
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from . import urls as os_app_urls
+from .forms import OperacaoLoteProfessorForm, ProfessorForm
+from .forms_usuarios import UsuarioCreateForm
+from .utils.autocomplete import IndicePrefixos, indice_professores
+from .utils.busca import TABELA_FTS_PROFESSORES, buscar_professores
+from .utils.dados_sinteticos import gerar_dados
+from .utils import operacoes_lote
+from .utils.escopo import Escopo
+from .utils.tabela_cruzada import DIMENSOES, retrato_professores
+from .utils.importacao_professores import importar_professores
+from .utils.relatorios import filtrar_professores
+from .utils.replica import CHAVE_SESSAO, usar_replica
+from .models import (
+    CAMPOS_ORIGEM_RELATORIO, linha_relatorio,
+    Professor, ProfessorRelatorio, EscolaNucleo, Escola, Cargo, Bairro, Serie, Motivo,
+    LogAuditoria, PerfilUsuario,
+    AREA_ATUACAO_CHOICES, SITUACAO_FUNCIONAL_CHOICES, TURNO_CHOICES, TIPO_USUARIO_CHOICES
+)
+
+
+ARQUIVO_BASELINE = Path(__file__).resolve().parent / 'benchmark_baseline.json'
+
+ESCALA = {
+    'nucleos': int(os.environ.get('SISPROF_BENCH_NUCLEOS', 4)),
+    'escolas': int(os.environ.get('SISPROF_BENCH_ESCOLAS', 16)),
+    'professores': int(os.environ.get('SISPROF_BENCH_PROFESSORES', 400)),
+    'logs': int(os.environ.get('SISPROF_BENCH_LOGS', 4000)),
+}
+
+# Tempo e memória dependem da máquina: só comparados quando pedido
+COMPARAR_TEMPO = bool(os.environ.get('SISPROF_BENCH_TEMPO'))
+TOLERANCIA_TEMPO = float(os.environ.get('SISPROF_BENCH_TOLERANCIA_TEMPO', 5))
+TOLERANCIA_MEMORIA = 2.0
+
+# Abaixo destes valores a variação é ruído de medição
+PISO_TEMPO_MS = 100
+PISO_MEMORIA_KB = 1024
+
+# Rotas que alteram estado mesmo via GET
+ROTAS_IGNORADAS = {'logout'}
+
+# Permissões de cada tipo de usuário no município sintético
+PERMISSOES_POR_TIPO = {
+    'ADMIN': {
+        'is_staff': True,
+        'pode_criar_professor': True, 'pode_editar_professor': True, 'pode_excluir_professor': True,
+        'pode_criar_escola_nucleo': True, 'pode_editar_escola_nucleo': True,
+        'pode_excluir_escola_nucleo': True,
+        'pode_criar_escola_dependente': True, 'pode_editar_escola_dependente': True,
+        'pode_excluir_escola_dependente': True,
+        'pode_gerar_relatorios': True, 'pode_exportar_dados': True,
+    },
+    'GESTOR': {
+        'pode_criar_professor': True, 'pode_editar_professor': True,
+        'pode_gerar_relatorios': True, 'pode_exportar_dados': True,
+    },
+    'COORDENADOR': {
+        'pode_editar_professor': True, 'pode_gerar_relatorios': True,
+    },
+    'CONSULTA': {},
+}
+
+
+def _valores(choices):
+    return [valor for valor, _ in choices if valor]
+
+
+def criar_usuario_tipo(tipo):
+    """Cria um usuário com perfil do tipo indicado"""
+    permissoes = dict(PERMISSOES_POR_TIPO[tipo])
+    is_staff = permissoes.pop('is_staff', False)
+    usuario = User.objects.create_user(
+        username=f'bench_{tipo.lower()}', password='bench', is_staff=is_staff
+    )
+    perfil = usuario.perfil
+    perfil.tipo_usuario = tipo
+    for campo, valor in permissoes.items():
+        setattr(perfil, campo, valor)
+    perfil.save()
+    return usuario
+
+
+def escritas(queries, tabela):
+    """(INSERTs, UPDATEs) em `tabela` entre as queries capturadas"""
+    comandos = [
+        q['sql'].split(None, 1)[0].upper() for q in queries.captured_queries
+        if f'"{tabela}"' in q['sql'].split(' WHERE ')[0]
+    ]
+    return comandos.count('INSERT'), comandos.count('UPDATE')
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False)
+class EscritasPerfilTest(TestCase):
+    """Signals e save() do PerfilUsuario sem escritas redundantes"""
+
+    def test_login_nao_grava_perfil(self):
+        User.objects.create_user(username='login_teste', password='senha-teste-123')
+        cliente = Client()
+        with CaptureQueriesContext(connection) as queries:
+            response = cliente.post(reverse('os_app:login'), {
+                'username': 'login_teste', 'password': 'senha-teste-123'
+            })
+        self.assertEqual(response.status_code, 302)
+        # Só o last_login; o perfil nem é lido
+        self.assertEqual(escritas(queries, 'auth_user'), (0, 1))
+        self.assertEqual(escritas(queries, 'os_app_perfilusuario'), (0, 0))
+        self.assertFalse(any('os_app_perfilusuario' in q['sql'] for q in queries.captured_queries))
+
+    def test_criacao_usuario(self):
+        with CaptureQueriesContext(connection) as queries:
+            User.objects.create_user(username='padrao', password='x')
+        self.assertEqual(escritas(queries, 'auth_user'), (1, 0))
+        self.assertEqual(escritas(queries, 'os_app_perfilusuario'), (1, 0))
+
+        form = UsuarioCreateForm(data={
+            'username': 'pelo_form', 'email': 'form@escola.test',
+            'first_name': 'Pelo', 'last_name': 'Form',
+            'password1': 'S3nha-Forte-Teste', 'password2': 'S3nha-Forte-Teste',
+            'tipo_usuario': 'GESTOR', 'pode_editar_professor': 'on',
+            'pode_gerar_relatorios': 'on',
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        with CaptureQueriesContext(connection) as queries:
+            usuario = form.save()
+        self.assertEqual(escritas(queries, 'auth_user'), (1, 0))
+        # INSERT pelo signal e um UPDATE só com o que difere do padrão
+        self.assertEqual(escritas(queries, 'os_app_perfilusuario'), (1, 1))
+        update = next(
+            q['sql'] for q in queries.captured_queries
+            if q['sql'].startswith('UPDATE "os_app_perfilusuario"')
+        )
+        self.assertIn('"tipo_usuario"', update)
+        self.assertIn('"pode_editar_professor"', update)
+        self.assertNotIn('"cargo_funcao"', update)
+        perfil = PerfilUsuario.objects.get(usuario=usuario)
+        self.assertEqual(perfil.tipo_usuario, 'GESTOR')
+        self.assertTrue(perfil.pode_editar_professor)
+
+    def test_save_sem_alteracoes_nao_grava(self):
+        usuario = User.objects.create_user(username='sem_alteracao', password='x')
+        perfil = PerfilUsuario.objects.get(usuario=usuario)
+        with CaptureQueriesContext(connection) as queries:
+            perfil.save()
+            usuario.save()
+        self.assertEqual(escritas(queries, 'os_app_perfilusuario'), (0, 0))
+
+        perfil.cargo_funcao = 'Coordenação'
+        with CaptureQueriesContext(connection) as queries:
+            perfil.save()
+        self.assertEqual(escritas(queries, 'os_app_perfilusuario'), (0, 1))
+        self.assertNotIn('"tipo_usuario"', queries.captured_queries[-1]['sql'])
+        perfil.refresh_from_db()
+        self.assertEqual(perfil.cargo_funcao, 'Coordenação')
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False)
+class ReplicaLeituraTest(TestCase):
+    """Roteamento de leituras para a réplica e aderência ao principal após POST"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Réplica: cópia do banco de teste já migrado num segundo arquivo
+        # SQLite. O alias é criado aqui (o runner não o conhece) e só então
+        # entra em `databases`, para a classe também o envolver em transação.
+        cls._pasta = tempfile.TemporaryDirectory(prefix='sisprof_replica_')
+        arquivo = f'{cls._pasta.name}/replica.sqlite3'
+        connection.ensure_connection()
+        with sqlite3.connect(arquivo) as destino:
+            connection.connection.backup(destino)
+        connections.settings['replica'] = connections.configure_settings({
+            **connections.settings,
+            'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': arquivo},
+        })['replica']
+        cls.databases = {'default', 'replica'}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls._pasta.cleanup()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user(
+            username='leitor', password='senha-teste-123', is_staff=True
+        )
+        # Um registro em cada banco, com ids diferentes: mostra de onde a view leu
+        acao = LogAuditoria.ACAO_CHOICES[0][0]
+        cls.log_principal = LogAuditoria.objects.create(acao=acao, descricao='principal')
+        cls.log_replica = LogAuditoria.objects.using('replica').create(
+            acao=acao, descricao='réplica', id=cls.log_principal.id + 1000
+        )
+
+    def setUp(self):
+        self.cliente = Client()
+
+    def _status_detalhe(self, log):
+        return self.cliente.get(reverse('os_app:log_detalhe', args=[log.id])).status_code
+
+    def test_router(self):
+        self.assertEqual(router.db_for_read(LogAuditoria), 'default')
+        with usar_replica():
+            self.assertEqual(router.db_for_read(LogAuditoria), 'replica')
+            self.assertEqual(router.db_for_write(LogAuditoria), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'os_app'))
+
+    def test_leituras_vao_para_replica(self):
+        self.cliente.force_login(self.usuario)
+        self.assertEqual(self._status_detalhe(self.log_replica), 200)
+        self.assertEqual(self._status_detalhe(self.log_principal), 404)
+        # Streaming: o CSV é lido do banco durante o envio
+        csv = b''.join(self.cliente.get(reverse('os_app:logs_exportar')).streaming_content)
+        self.assertIn('réplica', csv.decode('utf-8-sig'))
+        self.assertNotIn('principal', csv.decode('utf-8-sig'))
+        # Views sem o decorator continuam no principal
+        self.assertEqual(
+            self.cliente.get(reverse('os_app:lista_professores')).status_code, 200
+        )
+
+    def test_le_do_principal_apos_post(self):
+        response = self.cliente.post(reverse('os_app:login'), {
+            'username': 'leitor', 'password': 'senha-teste-123'
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(CHAVE_SESSAO, self.cliente.session)
+        self.assertEqual(self._status_detalhe(self.log_principal), 200)
+        self.assertEqual(self._status_detalhe(self.log_replica), 404)
+
+    @override_settings(REPLICA_ADERENCIA_SEGUNDOS=0)
+    def test_aderencia_expira(self):
+        self.cliente.post(reverse('os_app:login'), {
+            'username': 'leitor', 'password': 'senha-teste-123'
+        })
+        self.assertEqual(self._status_detalhe(self.log_replica), 200)
+
+    @override_settings(DB_REPLICA_ALIAS='inexistente')
+    def test_sem_replica_configurada(self):
+        self.cliente.post(reverse('os_app:login'), {
+            'username': 'leitor', 'password': 'senha-teste-123'
+        })
+        self.assertNotIn(CHAVE_SESSAO, self.cliente.session)
+        self.assertEqual(self._status_detalhe(self.log_principal), 200)
+        self.assertEqual(self._status_detalhe(self.log_replica), 404)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'FTS5 por triggers só existe no SQLite')
+class BuscaProfessoresTriggersTest(TestCase):
+    """Migrações que recriam os_app_professor não podem perder os triggers da FTS5"""
+
+    def test_triggers_existem_apos_migrate(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'os_app_professor'"
+            )
+            triggers = {nome for nome, in cursor.fetchall()}
+        self.assertTrue({
+            f'{TABELA_FTS_PROFESSORES}_ai', f'{TABELA_FTS_PROFESSORES}_ad', f'{TABELA_FTS_PROFESSORES}_au',
+        } <= triggers, triggers)
+
+    def test_fts_acompanha_alteracoes(self):
+        def encontrados(texto):
+            return set(buscar_professores(Professor.objects.all(), texto).values_list('id', flat=True))
+
+        professor = Professor.objects.create(
+            nome='Joaquina Trigueiro', cpf='123.456.789-01', telefone='(91) 9999-0000',
+            email='joaquina@escola.test'
+        )
+        self.assertEqual(encontrados('trigueiro'), {professor.id})
+
+        professor.nome = 'Joaquina Macedo'
+        professor.save()
+        self.assertEqual(encontrados('trigueiro'), set())
+        self.assertEqual(encontrados('macedo'), {professor.id})
+
+        professor.delete()
+        self.assertEqual(encontrados('macedo'), set())
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False)
+class SelectLazyTest(TestCase):
+    """SelectLazy renderiza só a opção selecionada, validando o pk enviado"""
+
+    def test_pk_invalido_nao_quebra_o_formulario(self):
+        nucleo = EscolaNucleo.objects.create(nome='Núcleo Válido', cidade='Cidade Teste', estado='PA')
+        for valor in ('abc', '999999', '1.5'):
+            with self.subTest(valor=valor):
+                form = ProfessorForm(data={
+                    'nome': 'x', 'nucleo': valor, 'escola_lotacao': valor, 'cargo': valor,
+                })
+                self.assertFalse(form.is_valid())
+                self.assertIn('escola_lotacao', form.errors)
+                html = str(form)
+                self.assertNotIn(f'value="{valor}"', html)
+        form = ProfessorForm(data={'nome': 'x', 'nucleo': nucleo.pk})
+        self.assertFalse(form.is_valid())
+        self.assertIn('Núcleo Válido', str(form['nucleo']))
+
+
+class EscopoProfessoresTest(TestCase):
+    """Recorte por escola_vinculada / nucleo_vinculado (utils/escopo.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.nucleo_1 = EscolaNucleo.objects.create(nome='Núcleo Um', cidade='Cidade Teste', estado='PA')
+        cls.nucleo_2 = EscolaNucleo.objects.create(nome='Núcleo Dois', cidade='Cidade Teste', estado='PA')
+        cls.escola_1a = Escola.objects.create(nome='Escola 1A', nucleo=cls.nucleo_1, codigo_inep='15000011')
+        cls.escola_1b = Escola.objects.create(nome='Escola 1B', nucleo=cls.nucleo_1, codigo_inep='15000012')
+        cls.escola_2 = Escola.objects.create(nome='Escola 2', nucleo=cls.nucleo_2, codigo_inep='15000021')
+        cls.prof_1a = cls._professor('Escopo Alfa', '00000000011', cls.escola_1a)
+        cls.prof_1b = cls._professor('Escopo Beta', '00000000012', cls.escola_1b)
+        cls.prof_2 = cls._professor('Escopo Gama', '00000000021', cls.escola_2)
+
+        cls.coord_escola = cls._coordenador('coord_escola', escola_vinculada=cls.escola_1a)
+        cls.coord_nucleo = cls._coordenador('coord_nucleo', nucleo_vinculado=cls.nucleo_1)
+        # Professores visíveis para cada um
+        cls.visiveis = {
+            cls.coord_escola: {cls.prof_1a.pk},
+            cls.coord_nucleo: {cls.prof_1a.pk, cls.prof_1b.pk},
+        }
+
+    @staticmethod
+    def _professor(nome, cpf, escola):
+        return Professor.objects.create(
+            nome=nome, cpf=f'{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}', matricula=f'ESC{cpf[-3:]}',
+            telefone='(91) 9999-0000', email=f'{cpf}@escola.test', escola_lotacao=escola,
+            turno='matutino', carga_horaria=20,
+        )
+
+    @staticmethod
+    def _coordenador(username, **vinculo):
+        usuario = User.objects.create_user(username=username, password='x')
+        perfil = usuario.perfil
+        perfil.tipo_usuario = 'COORDENADOR'
+        for campo, valor in {**PERMISSOES_POR_TIPO['ADMIN'], **vinculo}.items():
+            if campo != 'is_staff':
+                setattr(perfil, campo, valor)
+        perfil.save()
+        return usuario
+
+    def setUp(self):
+        # Máscara/escopo no cache, índice e retrato são por processo
+        cache.clear()
+        indice_professores.invalidar()
+        retrato_professores.invalidar()
+
+    def _cliente(self, usuario):
+        cliente = Client()
+        cliente.force_login(usuario)
+        return cliente
+
+    def test_detalhe_edicao_exclusao_fora_do_escopo(self):
+        for usuario, visiveis in self.visiveis.items():
+            cliente = self._cliente(usuario)
+            for professor in (self.prof_1a, self.prof_1b, self.prof_2):
+                esperado = 200 if professor.pk in visiveis else 404
+                for rota in ('detalhe_professor', 'editar_professor', 'deletar_professor'):
+                    with self.subTest(usuario=usuario.username, professor=professor.nome, rota=rota):
+                        url = reverse(f'os_app:{rota}', args=[professor.pk])
+                        self.assertEqual(cliente.get(url).status_code, esperado)
+            response = cliente.post(reverse('os_app:deletar_professor', args=[self.prof_2.pk]))
+            self.assertEqual(response.status_code, 404)
+        self.assertTrue(Professor.objects.filter(pk=self.prof_2.pk).exists())
+
+    def test_lista_relatorios_e_tabela_cruzada(self):
+        for usuario, visiveis in self.visiveis.items():
+            cliente = self._cliente(usuario)
+            with self.subTest(usuario=usuario.username):
+                lista = cliente.get(reverse('os_app:lista_professores'))
+                self.assertEqual({p.pk for p in lista.context['professores']}, visiveis)
+                # Filtro explícito por outro núcleo não fura o escopo
+                lista = cliente.get(reverse('os_app:lista_professores'), {'nucleo': self.nucleo_2.pk})
+                self.assertEqual(lista.context['total_listado'], 0)
+
+                relatorio = cliente.get(reverse('os_app:relatorios_resultado'))
+                self.assertEqual({p.pk for p in relatorio.context['professores']}, visiveis)
+
+                tabela = cliente.get(reverse('os_app:tabela_cruzada'), {'linhas': 'escola'}).json()
+                self.assertEqual(tabela['total'], len(visiveis))
+                self.assertNotIn(['Escola 2'], tabela['linhas'])
+
+    def test_operacoes_em_lote_fora_do_escopo(self):
+        url = reverse('os_app:professores_lote')
+        for usuario in self.visiveis:
+            cliente = self._cliente(usuario)
+            with self.subTest(usuario=usuario.username):
+                cliente.post(url, {
+                    'operacao': 'alterar_turno', 'turno': 'noturno',
+                    'ids': [self.prof_1a.pk, self.prof_2.pk],
+                })
+                self.prof_2.refresh_from_db()
+                self.assertEqual(self.prof_2.turno, 'matutino')
+                self.prof_1a.refresh_from_db()
+                self.assertEqual(self.prof_1a.turno, 'noturno')
+
+                cliente.post(url, {
+                    'operacao': 'transferir_lotacao', 'escola': self.escola_2.pk,
+                    'ids': [self.prof_1a.pk],
+                })
+                self.prof_1a.refresh_from_db()
+                self.assertEqual(self.prof_1a.escola_lotacao, self.escola_1a)
+        form = OperacaoLoteProfessorForm(
+            {'operacao': 'transferir_lotacao', 'escola': self.escola_1b.pk, 'ids': str(self.prof_1a.pk)},
+            escopo=Escopo(escola_id=self.escola_1a.pk, nucleo_id=self.nucleo_1.pk)
+        )
+        self.assertIn('escola', form.errors)
+
+    def test_autocomplete(self):
+        for usuario, visiveis in self.visiveis.items():
+            cliente = self._cliente(usuario)
+            with self.subTest(usuario=usuario.username):
+                busca = cliente.get(reverse('os_app:buscar_professores_ajax'), {'q': 'escopo'}).json()
+                self.assertEqual({p['id'] for p in busca}, visiveis)
+                url = reverse('os_app:obter_professor_ajax', args=[self.prof_2.pk])
+                self.assertEqual(cliente.get(url).status_code, 404)
+
+    def test_cadastro_restrito_ao_escopo(self):
+        dados = {
+            'nome': 'Novo Escopo', 'cpf': '000.000.000-99', 'telefone': '(91) 9999-0000',
+            'email': 'novo@escola.test', 'escola_lotacao': self.escola_2.pk, 'em_sala': 'on',
+        }
+        escopo_nucleo = Escopo(nucleo_id=self.nucleo_1.pk)
+        form = ProfessorForm(data=dados, escopo=escopo_nucleo)
+        self.assertIn('escola_lotacao', form.errors)
+        form = ProfessorForm(data={**dados, 'escola_lotacao': self.escola_1b.pk}, escopo=escopo_nucleo)
+        self.assertNotIn('escola_lotacao', form.errors)
+        form = ProfessorForm(
+            data={**dados, 'escola_lotacao': '', 'nucleo': self.nucleo_1.pk},
+            escopo=Escopo(escola_id=self.escola_1a.pk, nucleo_id=self.nucleo_1.pk)
+        )
+        self.assertIn('escola_lotacao', form.errors)
+
+    def test_importacao_restrita_ao_escopo(self):
+        conteudo = (
+            'Nome;CPF;Telefone;E-mail;INEP\n'
+            'Importado Dentro;00000000101;(91) 9999-0000;dentro@escola.test;15000012\n'
+            'Importado Fora;00000000102;(91) 9999-0000;fora@escola.test;15000021\n'
+            'Importado Sem Escola;00000000103;(91) 9999-0000;sem@escola.test;\n'
+        )
+        arquivo = io.BytesIO(conteudo.encode('utf-8'))
+        arquivo.name = 'professores.csv'
+        cliente = self._cliente(self.coord_nucleo)
+        response = cliente.post(reverse('os_app:importar_professores'), {'arquivo': arquivo})
+        resultado = response.context['resultado']
+        self.assertEqual(resultado.importados, 1)
+        erros = {erro['linha']: ' '.join(erro['mensagens']) for erro in resultado.erros}
+        self.assertIn('fora do seu escopo', erros[3])
+        self.assertIn('escola é obrigatória', erros[4])
+        self.assertEqual(
+            set(Professor.objects.filter(nome__startswith='Importado').values_list('nome', flat=True)),
+            {'Importado Dentro'}
+        )
+
+
+class RelatorioProfessoresSyncTest(TestCase):
+    """ProfessorRelatorio acompanha Professor e os cadastros auxiliares"""
+
+    @classmethod
+    def setUpTestData(cls):
+        gerar_dados(nucleos=2, escolas=4, professores=30, usuarios=0, logs=0, seed=7)
+
+    def assertSincronizado(self):
+        esperado = {
+            origem['pk']: linha_relatorio(origem)
+            for origem in Professor.objects.values(*CAMPOS_ORIGEM_RELATORIO)
+        }
+        colunas = [campo.attname for campo in ProfessorRelatorio._meta.concrete_fields]
+        gravado = {linha['professor_id']: linha for linha in ProfessorRelatorio.objects.values(*colunas)}
+        self.assertEqual(gravado.keys(), esperado.keys())
+        for pk, linha in esperado.items():
+            self.assertEqual(gravado[pk], linha, f'professor {pk}')
+
+    def test_save_e_delete_do_professor(self):
+        escola = Escola.objects.first()
+        professor = Professor.objects.create(
+            nome='Sincronia Nova', cpf='999.000.111-22', telefone='(91) 9999-0000',
+            email='sincronia@escola.test', escola_lotacao=escola, cargo=Cargo.objects.first(),
+            area_atuacao=AREA_ATUACAO_CHOICES[1][0], disciplinas='portugues, matematica',
+        )
+        self.assertSincronizado()
+        professor.nome = 'Sincronia Renomeada'
+        professor.escola_lotacao = Escola.objects.exclude(pk=escola.pk).first()
+        professor.turno = TURNO_CHOICES[1][0]
+        professor.save()
+        self.assertSincronizado()
+        professor.delete()
+        self.assertSincronizado()
+
+    def test_cadastros_auxiliares(self):
+        escola = Escola.objects.filter(professores__isnull=False).first()
+        escola.nome = 'Escola Renomeada'
+        escola.zona = 'rural'
+        escola.save()
+        self.assertSincronizado()
+
+        # Escola muda de núcleo: escola_nucleo/nucleo_efetivo dos lotados
+        antes = dict(escola.professores.values_list('pk', 'data_atualizacao'))
+        escola.nucleo = EscolaNucleo.objects.exclude(pk=escola.nucleo_id).first()
+        escola.save()
+        self.assertSincronizado()
+        for pk, data in escola.professores.values_list('pk', 'data_atualizacao'):
+            self.assertGreater(data, antes[pk])
+
+        nucleo = EscolaNucleo.objects.first()
+        nucleo.nome = 'Núcleo Renomeado'
+        nucleo.save()
+        self.assertSincronizado()
+
+        for modelo in (Cargo, Serie, Bairro):
+            registro = modelo.objects.first()
+            registro.nome = f'{modelo.__name__} Renomeado'
+            registro.save()
+            self.assertSincronizado()
+        Cargo.objects.first().delete()
+        self.assertSincronizado()
+        Escola.objects.last().delete()
+        self.assertSincronizado()
+
+    def test_operacoes_em_lote(self):
+        ids = list(Professor.objects.values_list('id', flat=True)[:10])
+        operacoes_lote.transferir_lotacao(ids, Escola.objects.last())
+        self.assertSincronizado()
+        operacoes_lote.alterar_turno(ids, TURNO_CHOICES[-1][0])
+        operacoes_lote.alterar_situacao_funcional(ids, SITUACAO_FUNCIONAL_CHOICES[-1][0])
+        operacoes_lote.definir_em_sala(ids, False, Motivo.objects.first())
+        self.assertSincronizado()
+
+    def test_importacao(self):
+        escola, cargo = Escola.objects.first(), Cargo.objects.first()
+        conteudo = (
+            'Nome;CPF;Telefone;E-mail;Escola;Cargo;Turno\n'
+            f'Importado Sync;99988877766;(91) 9999-0000;sync@escola.test;{escola.nome};{cargo.nome};Matutino\n'
+        )
+        resultado = importar_professores(io.BytesIO(conteudo.encode('utf-8')), 'sync.csv')
+        self.assertEqual(resultado.importados, 1, resultado.erros)
+        self.assertSincronizado()
+
+    def test_migracao_preenche_tabela(self):
+        from importlib import import_module
+        from types import SimpleNamespace
+        from django.apps import apps
+
+        migracao = import_module('os_app.migrations.0021_preencher_relatorio_professores')
+        ProfessorRelatorio.objects.all().delete()
+        migracao.preencher_relatorio(apps, SimpleNamespace(connection=connection))
+        self.assertSincronizado()
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False)
+class DetalheProfessorEtagTest(TestCase):
+    """GET condicional de detalhe_professor"""
+
+    @classmethod
+    def setUpTestData(cls):
+        gerar_dados(nucleos=2, escolas=2, professores=4, usuarios=0, logs=0, seed=3)
+        cls.professor = Professor.objects.select_related('escola_lotacao').first()
+        cls.usuario = criar_usuario_tipo('COORDENADOR')
+
+    def setUp(self):
+        cache.clear()
+        self.cliente = Client()
+        self.cliente.force_login(self.usuario)
+        self.url = reverse('os_app:detalhe_professor', args=[self.professor.pk])
+
+    def _etag_mudou(self, etag):
+        response = self.cliente.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.cliente.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        return response['ETag']
+
+    def test_etag_acompanha_relacoes_e_permissoes(self):
+        etag = self.cliente.get(self.url)['ETag']
+        self.assertEqual(self.cliente.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Escola muda de núcleo: o signal atualiza os lotados com um UPDATE
+        escola = self.professor.escola_lotacao
+        escola.nucleo = EscolaNucleo.objects.exclude(pk=escola.nucleo_id).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            escola.save()
+        etag = self._etag_mudou(etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Cargo.objects.filter(pk=self.professor.cargo_id).get().save()
+        etag = self._etag_mudou(etag)
+
+        perfil = self.usuario.perfil
+        perfil.pode_excluir_professor = True
+        with self.captureOnCommitCallbacks(execute=True):
+            perfil.save()
+        self._etag_mudou(etag)
+
+
+class AutocompleteIndiceTest(TestCase):
+    """Índice de prefixos de professores entre workers (carimbo e log de alterações no cache)"""
+
+    def setUp(self):
+        cache.clear()
+        indice_professores.invalidar()
+
+    def _outro_worker(self):
+        return IndicePrefixos(
+            indice_professores.modelo, indice_professores.grupo, indice_professores.campos,
+            indice_professores._registro, indice_professores._chaves_de, indice_professores._escopo_de
+        )
+
+    def _professor(self, nome, cpf):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Professor.objects.create(
+                nome=nome, cpf=cpf, telefone='(91) 9999-0000', email=f'{cpf[:3]}{cpf[-2:]}@escola.test'
+            )
+
+    @override_settings(AUTOCOMPLETE_INTERVALO_SINCRONIA=0)
+    def test_outro_worker_aplica_o_log_sem_recarregar(self):
+        self._professor('Aurelina Prado', '111.222.333-44')
+        outro = self._outro_worker()
+        self.assertEqual(outro.etag('aur'), indice_professores.etag('aur'))
+        self.assertEqual([r['nome'] for r in outro.buscar('aur')], ['Aurelina Prado'])
+
+        etag_anterior = outro.etag('aur')
+        with mock.patch.object(outro, 'carregar', wraps=outro.carregar) as carregar:
+            aurora = self._professor('Aurora Pinheiro', '111.222.333-55')
+            # Este processo aplicou a alteração e a publicou; o outro worker
+            # a aplica do log, sem voltar ao banco
+            self.assertNotEqual(indice_professores.etag('aur'), etag_anterior)
+            with self.assertNumQueries(0):
+                self.assertEqual(outro.etag('aur'), indice_professores.etag('aur'))
+                self.assertEqual(
+                    [r['nome'] for r in outro.buscar('aur')], ['Aurelina Prado', 'Aurora Pinheiro']
+                )
+            with self.captureOnCommitCallbacks(execute=True):
+                aurora.delete()
+            self.assertEqual([r['nome'] for r in outro.buscar('aur')], ['Aurelina Prado'])
+            self.assertEqual(outro.etag('aur'), indice_professores.etag('aur'))
+        carregar.assert_not_called()
+
+    @override_settings(AUTOCOMPLETE_INTERVALO_SINCRONIA=0)
+    def test_buraco_no_log_recarrega(self):
+        outro = self._outro_worker()
+        outro.buscar('aur')
+        self._professor('Aurelina Prado', '111.222.333-44')
+        cache.delete(outro._chave(outro._sequencia + 1))
+        with mock.patch.object(outro, 'carregar', wraps=outro.carregar) as carregar:
+            self.assertEqual([r['nome'] for r in outro.buscar('aur')], ['Aurelina Prado'])
+        carregar.assert_called_once()
+
+    @override_settings(AUTOCOMPLETE_INTERVALO_SINCRONIA=60)
+    def test_cache_consultado_no_maximo_uma_vez_por_intervalo(self):
+        outro = self._outro_worker()
+        outro.buscar('aur')
+        self._professor('Aurelina Prado', '111.222.333-44')
+        with mock.patch('os_app.utils.autocomplete.cache') as cache_mock:
+            self.assertEqual(outro.buscar('aur'), [])
+        cache_mock.get.assert_not_called()
+
+
+class TabelaCruzadaTest(TestCase):
+    """Retrato em memória (utils/tabela_cruzada.py) contra GROUP BY no banco"""
+
+
+    @classmethod
+    def setUpTestData(cls):
+        gerar_dados(nucleos=3, escolas=9, professores=300, usuarios=0, logs=0, seed=7)
+
+    def setUp(self):
+        retrato_professores.invalidar()
+
+    @staticmethod
+    def _celulas(tabela):
+        """{(rótulos da linha + rótulos da coluna): valor}, sem células vazias"""
+        return {
+            tuple(linha) + tuple(coluna): valor
+            for linha, valores in zip(tabela['linhas'], tabela['valores'])
+            for coluna, valor in zip(tabela['colunas'], valores) if valor
+        }
+
+    @staticmethod
+    def _group_by(dimensoes, medida, escopo=None):
+        campos = [DIMENSOES[nome].campo for nome in dimensoes]
+        agregado = Count('id') if medida == 'contagem' else Sum('carga_horaria')
+        esperado = {}
+        for linha in (Professor.objects.do_escopo(escopo).order_by()
+                      .values(*campos).annotate(valor=agregado)):
+            chave = tuple(DIMENSOES[nome].rotular([linha[campo]])[0]
+                          for nome, campo in zip(dimensoes, campos))
+            if linha['valor']:
+                esperado[chave] = linha['valor']
+        return esperado
+
+    def _conferir(self, linhas, colunas, escopo=None):
+        for medida in ('contagem', 'carga_horaria'):
+            with self.subTest(linhas=linhas, colunas=colunas, medida=medida, escopo=escopo):
+                tabela = retrato_professores.cruzar(linhas, colunas, medida=medida, escopo=escopo)
+                esperado = self._group_by(linhas + colunas, medida, escopo)
+                self.assertEqual(self._celulas(tabela), esperado)
+                self.assertEqual(tabela['total'], sum(esperado.values()))
+
+    def test_igual_ao_group_by(self):
+        for linhas, colunas in (
+            (['nucleo'], []),
+            (['escola'], ['turno']),
+            (['nucleo', 'area'], ['situacao', 'em_sala']),
+            (['cargo', 'motivo'], ['modalidade']),
+        ):
+            self._conferir(linhas, colunas)
+
+    def test_escopo(self):
+        escola = Escola.objects.order_by('pk').first()
+        for escopo in (Escopo(escola_id=escola.pk, nucleo_id=escola.nucleo_id),
+                       Escopo(nucleo_id=escola.nucleo_id)):
+            self._conferir(['escola'], ['area'], escopo)
+        # Escola sem professores: tabela vazia, não a do município
+        vazia = Escola.objects.create(nome='Escola Vazia', nucleo=escola.nucleo)
+        tabela = retrato_professores.cruzar(['escola'], escopo=Escopo(escola_id=vazia.pk))
+        self.assertEqual(tabela['total'], 0)
+
+    # Bloco mínimo para que cada inclusão passe pelo crescimento das colunas
+    @mock.patch('os_app.utils.tabela_cruzada.BLOCO_CRESCIMENTO', 1)
+    def test_inclusoes_e_exclusoes_incrementais(self):
+        retrato_professores.carregar()
+        escola = Escola.objects.order_by('-pk').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(3):
+                Professor.objects.create(
+                    nome=f'Incremental {i}', cpf=f'900.000.000-0{i}', telefone='(91) 9999-0000',
+                    email=f'incremental{i}@escola.test', escola_lotacao=escola,
+                    turno='noturno', carga_horaria=40, area_atuacao='',
+                )
+            Professor.objects.order_by('pk').first().delete()
+        self._conferir(['nucleo', 'area'], ['turno'])
+        self._conferir(['escola'], [], Escopo(escola_id=escola.pk, nucleo_id=escola.nucleo_id))
+
+    @override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False)
+    def test_pedidos_invalidos(self):
+        cliente = Client()
+        cliente.force_login(User.objects.create_superuser(username='tabela', password='x'))
+        url = reverse('os_app:tabela_cruzada')
+        for parametros in (
+            {'linhas': 'nucleo,inexistente'},
+            {'linhas': 'nucleo', 'medida': 'media'},
+            {'linhas': 'nucleo,escola,cargo', 'colunas': 'turno,area'},
+            {'linhas': 'nucleo', 'colunas': 'nucleo'},
+        ):
+            with self.subTest(**parametros):
+                response = cliente.get(url, parametros)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+        response = cliente.get(url, {'linhas': 'nucleo', 'medida': 'carga_horaria'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total'],
+                         Professor.objects.aggregate(total=Sum('carga_horaria'))['total'])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False)
+class FiltrosRelatorioTest(TestCase):
+    """utils/relatorios.filtrar_professores nas views de relatório"""
+
+    @classmethod
+    def setUpTestData(cls):
+        gerar_dados(nucleos=2, escolas=4, professores=40, usuarios=0, logs=0, seed=11)
+        cls.usuario = User.objects.create_superuser(username='relatorios', password='x')
+
+    def setUp(self):
+        self.cliente = Client()
+        self.cliente.force_login(self.usuario)
+
+    def test_pdf_com_os_mesmos_filtros_da_tela(self):
+        ids = sorted(Professor.objects.values_list('pk', flat=True))
+        for filtros in (
+            {'professor_id_inicio': ids[5], 'professor_id_fim': ids[14]},
+            {'turno_inicio': _valores(TURNO_CHOICES)[1]},
+            {'serie_id_inicio': Serie.objects.order_by('pk')[2].pk, 'area': _valores(AREA_ATUACAO_CHOICES)[0]},
+        ):
+            with self.subTest(**filtros):
+                tela = self.cliente.get(reverse('os_app:relatorios_resultado'), filtros)
+                with mock.patch('os_app.views.get_campo_valor_pdf', return_value='-') as valor:
+                    pdf = self.cliente.get(reverse('os_app:relatorios_pdf'), {**filtros, 'campos': 'nome'})
+                self.assertEqual(pdf.status_code, 200)
+                self.assertEqual(
+                    [chamada.args[0].pk for chamada in valor.call_args_list],
+                    [p.pk for p in tela.context['professores']]
+                )
+
+    def test_cadastros_inexistentes_nos_filtros(self):
+        professores, filtros = filtrar_professores(ProfessorRelatorio.objects.all(), {
+            'nucleo': '999999', 'cargo': '999999', 'serie_id_inicio': '999999',
+            'turno_inicio': 'inexistente', 'materia': 'matematica',
+        })
+        self.assertEqual(professores.count(), 0)
+        self.assertEqual(filtros, ['Série: a partir de ID 999999', 'Matéria: Matemática'])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Interrupção por progress handler só existe no SQLite')
+@override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False)
+class LimiteConsultaTest(TestCase):
+    """@limite_de_consulta e utils/limite_consultas.py"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser(username='limite', password='x')
+
+    # Verifica o relógio a cada instrução: qualquer consulta passa do limite
+    @mock.patch('os_app.utils.limite_consultas.INSTRUCOES_POR_VERIFICACAO', 1)
+    @override_settings(LIMITE_CONSULTA_SEGUNDOS=1e-9)
+    def test_consulta_demorada_interrompida(self):
+        cliente = Client()
+        cliente.force_login(self.usuario)
+        with self.assertLogs('os_app.utils.limite_consultas', 'WARNING') as logs:
+            response = cliente.get(reverse('os_app:relatorios_resultado'), {'nome': 'ana'})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertTemplateUsed(response, 'os_app/consulta_demorada.html')
+        self.assertEqual(
+            response.context['voltar'], reverse('os_app:relatorios_filtros') + '?nome=ana'
+        )
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('Consulta interrompida', logs.records[0].getMessage())
+        self.assertIn('os_app_professorrelatorio', logs.records[0].getMessage())
+
+        # Handler removido: fora do bloco as consultas não são mais interrompidas
+        self.assertEqual(Professor.objects.count(), 0)
+        self.assertEqual(cliente.get(reverse('os_app:index')).status_code, 200)
+
+    @override_settings(LIMITE_CONSULTA_SEGUNDOS=0)
+    def test_sem_limite(self):
+        cliente = Client()
+        cliente.force_login(self.usuario)
+        self.assertEqual(cliente.get(reverse('os_app:relatorios_resultado')).status_code, 200)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False)
+class ImportacaoProfessoresTest(TestCase):
+    """Validação por linha, gravação em lote e log IMPORT da importação"""
+
+    CABECALHO = ['Nome', 'CPF', 'Matrícula', 'Telefone', 'E-mail', 'Cargo', 'INEP']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser(username='importador', password='x')
+        nucleo = EscolaNucleo.objects.create(nome='Núcleo Importação', cidade='Cidade Teste', estado='PA')
+        cls.escola = Escola.objects.create(
+            nome='Escola Importação', nucleo=nucleo, codigo_inep='15000001',
+            cidade='Cidade Teste', estado='PA'
+        )
+        Cargo.objects.create(nome='Professor')
+        Professor.objects.create(
+            nome='Já Cadastrado', cpf='999.999.999-99', matricula='EXISTE',
+            telefone='(91) 9999-0000', email='existe@escola.test'
+        )
+
+    def _linha(self, i, **campos):
+        linha = {
+            'Nome': f'Importado {i}', 'CPF': f'{i:011d}', 'Matrícula': f'IMP{i}',
+            'Telefone': '(91) 98888-0000', 'E-mail': f'importado{i}@escola.test',
+            'Cargo': 'Professor', 'INEP': '15000001',
+        }
+        linha.update(campos)
+        return [linha[coluna] for coluna in self.CABECALHO]
+
+    def _csv(self, linhas):
+        texto = io.StringIO()
+        escritor = csv.writer(texto, delimiter=';')
+        escritor.writerow(self.CABECALHO)
+        escritor.writerows(linhas)
+        return io.BytesIO(texto.getvalue().encode('utf-8-sig'))
+
+    def _xlsx(self, linhas):
+        from openpyxl import Workbook
+
+        planilha = Workbook()
+        planilha.active.append(self.CABECALHO)
+        for linha in linhas:
+            planilha.active.append(linha)
+        arquivo = io.BytesIO()
+        planilha.save(arquivo)
+        arquivo.seek(0)
+        return arquivo
+
+    def _erros_por_linha(self, resultado):
+        return {erro['linha']: ' '.join(erro['mensagens']) for erro in resultado.erros}
+
+    def test_csv_valido(self):
+        resultado = importar_professores(
+            self._csv([self._linha(i) for i in range(1, 4)]), 'professores.csv',
+            usuario=self.usuario
+        )
+        self.assertEqual((resultado.total, resultado.importados, resultado.erros), (3, 3, []))
+        professor = Professor.objects.get(cpf_digitos='00000000001')
+        self.assertEqual(professor.cpf, '000.000.000-01')
+        self.assertEqual(professor.escola_lotacao, self.escola)
+        self.assertEqual(professor.nucleo_efetivo_id, self.escola.nucleo_id)
+        self.assertTrue(ProfessorRelatorio.objects.filter(professor=professor).exists())
+
+        log = LogAuditoria.objects.get(acao='IMPORT')
+        self.assertEqual(log.usuario, self.usuario)
+        self.assertTrue(log.sucesso)
+        self.assertEqual(log.dados_novos, {
+            'arquivo': 'professores.csv', 'total': 3, 'importados': 3, 'erros': 0,
+        })
+
+    def test_xlsx_valido(self):
+        resultado = importar_professores(
+            self._xlsx([self._linha(i) for i in range(1, 3)]), 'professores.xlsx',
+            usuario=self.usuario
+        )
+        self.assertEqual((resultado.importados, resultado.erros), (2, []))
+        self.assertEqual(Professor.objects.filter(matricula__startswith='IMP').count(), 2)
+
+    def test_erros_por_linha(self):
+        linhas = [
+            self._linha(1),
+            self._linha(2, CPF='123'),
+            self._linha(3, **{'E-mail': 'naoemail'}),
+            self._linha(4, **{'Matrícula': 'M' * 30}),
+            self._linha(5, Nome='N' * 101),
+            self._linha(6, CPF='00000000001'),
+            self._linha(7, CPF='99999999999'),
+            self._linha(8, **{'Matrícula': 'EXISTE'}),
+            self._linha(9, **{'Matrícula': 'IMP1'}),
+            self._linha(10, INEP='00000000'),
+        ]
+        resultado = importar_professores(self._csv(linhas), 'professores.csv', usuario=self.usuario)
+
+        self.assertEqual((resultado.total, resultado.importados), (10, 1))
+        erros = self._erros_por_linha(resultado)
+        self.assertEqual(sorted(erros), list(range(3, 12)))
+        self.assertIn('CPF deve ter 11 dígitos', erros[3])
+        self.assertIn('email:', erros[4])
+        self.assertIn('matricula:', erros[5])
+        self.assertIn('nome:', erros[6])
+        self.assertIn('CPF repetido no arquivo', erros[7])
+        self.assertIn('CPF já cadastrado', erros[8])
+        self.assertIn('Matrícula já cadastrada', erros[9])
+        self.assertIn('Matrícula repetida no arquivo', erros[10])
+        self.assertIn('Escola não encontrada', erros[11])
+        # Nada truncado: só a linha válida foi gravada
+        self.assertFalse(Professor.objects.filter(matricula__startswith='MMM').exists())
+
+        log = LogAuditoria.objects.get(acao='IMPORT')
+        self.assertFalse(log.sucesso)
+        self.assertEqual(log.dados_novos['erros'], 9)
+        self.assertEqual(log.mensagem_erro, '9 linha(s) rejeitada(s)')
+
+    def test_xlsx_cpf_numerico(self):
+        # Célula numérica perde os zeros à esquerda (e pode vir como float)
+        linhas = [self._linha(1, CPF=1234567890), self._linha(2, CPF=1234567891.0)]
+        resultado = importar_professores(self._xlsx(linhas), 'professores.xlsx', usuario=self.usuario)
+        self.assertEqual((resultado.importados, resultado.erros), (2, []))
+        self.assertEqual(
+            set(Professor.objects.filter(matricula__startswith='IMP').values_list('cpf', flat=True)),
+            {'012.345.678-90', '012.345.678-91'}
+        )
+
+    def test_conflito_na_gravacao_recusa_so_a_linha(self):
+        # CPF gravado por outro cadastro entre a verificação e o INSERT
+        conflito = '00000000002'
+        bulk_create = Professor.objects.bulk_create
+
+        def bulk_create_concorrente(objs, *args, **kwargs):
+            if any(p.cpf_digitos == conflito for p in objs):
+                raise IntegrityError('UNIQUE constraint failed: os_app_professor.cpf_digitos')
+            return bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(Professor.objects, 'bulk_create', bulk_create_concorrente):
+            resultado = importar_professores(
+                self._csv([self._linha(i) for i in range(1, 5)]), 'professores.csv',
+                usuario=self.usuario
+            )
+        self.assertEqual(resultado.importados, 3)
+        self.assertEqual(list(self._erros_por_linha(resultado)), [3])
+        self.assertIn('cadastrado durante a importação', resultado.erros[0]['mensagens'][0])
+        self.assertEqual(
+            set(Professor.objects.filter(matricula__startswith='IMP').values_list('matricula', flat=True)),
+            {'IMP1', 'IMP3', 'IMP4'}
+        )
+        self.assertEqual(
+            ProfessorRelatorio.objects.filter(professor__matricula__startswith='IMP').count(), 3
+        )
+
+    @mock.patch('os_app.views.LIMITE_ERROS_RELATORIO', 2)
+    def test_relatorio_de_erros_limitado_na_sessao(self):
+        cliente = Client()
+        cliente.force_login(self.usuario)
+        arquivo = self._csv([self._linha(i, CPF='1') for i in range(1, 6)])
+        arquivo.name = 'professores.csv'
+        url = reverse('os_app:importar_professores')
+
+        self.assertEqual(cliente.post(url, {'arquivo': arquivo}).status_code, 200)
+        self.assertEqual(len(cliente.session['importacao_erros']), 2)
+        self.assertEqual(cliente.session['importacao_total_erros'], 5)
+        relatorio = cliente.get(url, {'relatorio': 1}).content.decode('utf-8-sig').splitlines()
+        # Cabeçalho, as 2 linhas guardadas e o aviso de corte
+        self.assertEqual(len(relatorio), 4)
+        self.assertIn('primeiras 2 de 5', relatorio[-1])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False)
+class BenchmarkViewsTest(TestCase):
+    """Regressão de desempenho (queries, tempo e memória) de todas as views"""
+
+    @classmethod
+    def setUpTestData(cls):
+        gerar_dados(**ESCALA, usuarios=0)
+        cls.usuarios = {tipo: criar_usuario_tipo(tipo) for tipo, _ in TIPO_USUARIO_CHOICES}
+
+    def _kwargs_rota(self, nome, usuario):
+        """Argumentos de URL para rotas com parâmetros"""
+        if nome in ('detalhe_professor', 'editar_professor', 'deletar_professor', 'obter_professor_ajax'):
+            return {'pk': Professor.objects.order_by('id').first().pk}
+        if nome in ('editar_escola_nucleo', 'deletar_escola_nucleo'):
+            return {'pk': EscolaNucleo.objects.order_by('id').first().pk}
+        if nome in ('editar_escola_dependente', 'deletar_escola_dependente'):
+            return {'pk': Escola.objects.order_by('id').first().pk}
+        if nome == 'opcoes_select_ajax':
+            return {'fonte': 'nucleos'}
+        if nome == 'obter_bairro_ajax':
+            return {'pk': Bairro.objects.order_by('id').first().pk}
+        if nome == 'log_detalhe':
+            return {'log_id': LogAuditoria.objects.order_by('id').first().pk}
+        if nome in ('detalhe_usuario', 'editar_usuario', 'alterar_senha', 'desativar_usuario'):
+            return {'user_id': usuario.pk}
+        return {}
+
+    def _rotas(self):
+        for padrao in os_app_urls.urlpatterns:
+            if isinstance(padrao, URLPattern) and padrao.name and padrao.name not in ROTAS_IGNORADAS:
+                yield padrao.name
+
+    def _medir(self, cliente, url):
+        # Coleta antes de medir: o pico não depende do ciclo do GC herdado
+        gc.collect()
+        tracemalloc.reset_peak()
+        memoria_inicial = tracemalloc.get_traced_memory()[0]
+        with CaptureQueriesContext(connection) as queries:
+            inicio = time.perf_counter()
+            response = cliente.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            tempo_ms = (time.perf_counter() - inicio) * 1000
+        pico_kb = (tracemalloc.get_traced_memory()[1] - memoria_inicial) / 1024
+        return {
+            'status': response.status_code,
+            'queries': len(queries),
+            'tempo_ms': round(tempo_ms, 1),
+            'memoria_kb': round(pico_kb, 1),
+        }
+
+    def _aquecer(self):
+        """Primeira passada sem medição (imports, caches de template e URL)"""
+        usuario = self.usuarios['ADMIN']
+        cliente = Client(raise_request_exception=False)
+        cliente.force_login(usuario)
+        for nome in self._rotas():
+            response = cliente.get(reverse(f'os_app:{nome}', kwargs=self._kwargs_rota(nome, usuario)))
+            if response.streaming:
+                b''.join(response.streaming_content)
+
+    def _executar(self):
+        resultados = {}
+        self._aquecer()
+        tracemalloc.start()
+        try:
+            for tipo, usuario in self.usuarios.items():
+                cliente = Client(raise_request_exception=False)
+                cliente.force_login(usuario)
+                for nome in self._rotas():
+                    url = reverse(f'os_app:{nome}', kwargs=self._kwargs_rota(nome, usuario))
+                    resultados[f'{tipo} {nome}'] = self._medir(cliente, url)
+        finally:
+            tracemalloc.stop()
+        return resultados
+
+    def test_regressao_desempenho_views(self):
+        resultados = self._executar()
+
+        if os.environ.get('SISPROF_BENCH_ATUALIZAR'):
+            ARQUIVO_BASELINE.write_text(
+                json.dumps({'escala': ESCALA, 'views': resultados},
+                           indent=2, sort_keys=True, ensure_ascii=False) + '\n',
+                encoding='utf-8'
+            )
+            return
+
+        if not ARQUIVO_BASELINE.exists():
+            self.skipTest('Linha de base ausente: rode com SISPROF_BENCH_ATUALIZAR=1')
+        baseline = json.loads(ARQUIVO_BASELINE.read_text(encoding='utf-8'))
+        if baseline['escala'] != ESCALA:
+            self.skipTest(f"Escala {ESCALA} difere da linha de base {baseline['escala']}")
+
+        for chave, atual in sorted(resultados.items()):
+            esperado = baseline['views'].get(chave)
+            with self.subTest(view=chave):
+                self.assertIsNotNone(esperado, 'Rota sem linha de base: rode com SISPROF_BENCH_ATUALIZAR=1')
+                self.assertEqual(atual['status'], esperado['status'])
+                self.assertLessEqual(
+                    atual['queries'], esperado['queries'],
+                    f"{chave}: {atual['queries']} queries (linha de base {esperado['queries']})"
+                )
+                if not COMPARAR_TEMPO:
+                    continue
+                limite_tempo = max(esperado['tempo_ms'] * TOLERANCIA_TEMPO, PISO_TEMPO_MS)
+                self.assertLessEqual(atual['tempo_ms'], limite_tempo, f'{chave}: tempo')
+                limite_memoria = max(esperado['memoria_kb'] * TOLERANCIA_MEMORIA, PISO_MEMORIA_KB)
+                self.assertLessEqual(atual['memoria_kb'], limite_memoria, f'{chave}: memória')
@@ -16,23 +16,28 @@ urlpatterns = [
     # Professores - CRUD Completo
     path('professores/', views.lista_professores, name='lista_professores'),
     path('professores/novo/', views.novo_professor, name='novo_professor'),
+    path('professores/importar/', views.importar_professores, name='importar_professores'),
+    path('professores/lote/', views.professores_lote, name='professores_lote'),
     path('professores/<int:pk>/', views.detalhe_professor, name='detalhe_professor'),
     path('professores/<int:pk>/editar/', views.editar_professor, name='editar_professor'),
     path('professores/<int:pk>/deletar/', views.deletar_professor, name='deletar_professor'),
     
     # AJAX - Carregar escolas por núcleo
     path('api/escolas/por-nucleo/', views.carregar_escolas_por_nucleo, name='carregar_escolas_por_nucleo'),
+    path('api/escolas/arvore/', views.arvore_escolas_ajax, name='arvore_escolas_ajax'),
     
     # AJAX - Cadastros
     path('api/nucleo/novo/', views.nova_escola_nucleo_ajax, name='nova_escola_nucleo_ajax'),
     path('api/escola/nova/', views.nova_escola_ajax, name='nova_escola_ajax'),
     path('api/cargo/novo/', views.novo_cargo_ajax, name='novo_cargo_ajax'),
     path('api/bairro/buscar/', views.buscar_bairros_ajax, name='buscar_bairros_ajax'),
+    path('api/bairro/<int:pk>/', views.obter_bairro_ajax, name='obter_bairro_ajax'),
     path('api/bairro/novo/', views.novo_bairro_ajax, name='novo_bairro_ajax'),
     path('api/serie/nova/', views.nova_serie_ajax, name='nova_serie_ajax'),
     path('api/serie/listar/', views.listar_series_ajax, name='listar_series_ajax'),
     path('api/motivo/novo/', views.novo_motivo_ajax, name='novo_motivo_ajax'),
     path('api/motivo/listar/', views.listar_motivos_ajax, name='listar_motivos_ajax'),
+    path('api/opcoes/<str:fonte>/', views.opcoes_select_ajax, name='opcoes_select_ajax'),
 
     # Escolas Núcleo
     path('escolas-nucleo/', views.lista_escolas_nucleo, name='lista_escolas_nucleo'),
@@ -48,10 +53,12 @@ urlpatterns = [
     
     # AJAX - Busca de professores para substituição
     path('api/professores/buscar/', views.buscar_professores_ajax, name='buscar_professores_ajax'),
+    path('api/professores/<int:pk>/', views.obter_professor_ajax, name='obter_professor_ajax'),
 
     path('relatorios/', views.relatorios_filtros, name='relatorios_filtros'),
     path('relatorios/resultado/', views.relatorios_resultado, name='relatorios_resultado'),
     path('relatorios/pdf/', views.relatorios_pdf, name='relatorios_pdf'),
+    path('relatorios/tabela-cruzada/', views.tabela_cruzada, name='tabela_cruzada'),
     
     # Logs de Auditoria
     path('logs/', views.logs_auditoria, name='logs_auditoria'),
@@ -59,6 +66,9 @@ urlpatterns = [
     path('logs/meu-historico/', views.logs_meu_historico, name='logs_meu_historico'),
     path('logs/exportar/', views.logs_exportar, name='logs_exportar'),
 
+    # Desempenho (perfilamento por view)
+    path('desempenho/', views.painel_desempenho, name='painel_desempenho'),
+
     # Gestão de Usuários
     path('usuarios/', views.lista_usuarios, name='lista_usuarios'),
     path('usuarios/novo/', views.novo_usuario, name='novo_usuario'),
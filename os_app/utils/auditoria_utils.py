@@ -0,0 +1,131 @@
+"""
+Utilitários para consulta e exportação de logs de auditoria
+Arquivo: os_app/utils/auditoria_utils.py
+"""
+
+import csv
+import zlib
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from ..models import LogAuditoria
+from .busca import buscar_logs
+
+
+CABECALHO_CSV_LOGS = [
+    'ID',
+    'Data/Hora',
+    'Usuário',
+    'Ação',
+    'Modelo',
+    'Objeto ID',
+    'Objeto',
+    'Descrição',
+    'IP',
+    'Sucesso'
+]
+
+# Registros lidos do banco por vez durante a exportação
+TAMANHO_LOTE_EXPORTACAO = 2000
+
+
+def filtrar_logs(logs, params):
+    """
+    Aplica os filtros da tela de logs (usuario, acao, modelo, periodo,
+    data_inicio, data_fim e busca) a um queryset de LogAuditoria.
+
+    Usado pela listagem e pela exportação, garantindo o mesmo resultado.
+    """
+    # Filtro por usuário
+    usuario_id = params.get('usuario')
+    if usuario_id:
+        logs = logs.filter(usuario_id=usuario_id)
+
+    # Filtro por ação
+    acao = params.get('acao')
+    if acao:
+        logs = logs.filter(acao=acao)
+
+    # Filtro por modelo
+    modelo = params.get('modelo')
+    if modelo:
+        logs = logs.filter(modelo=modelo)
+
+    # Filtro por período
+    periodo = params.get('periodo')
+    if periodo:
+        hoje = datetime.now().date()
+        if periodo == 'hoje':
+            logs = logs.filter(data_hora__date=hoje)
+        elif periodo == 'semana':
+            inicio_semana = hoje - timedelta(days=hoje.weekday())
+            logs = logs.filter(data_hora__date__gte=inicio_semana)
+        elif periodo == 'mes':
+            logs = logs.filter(
+                data_hora__year=hoje.year,
+                data_hora__month=hoje.month
+            )
+
+    # Filtro por data específica
+    data_inicio = params.get('data_inicio')
+    data_fim = params.get('data_fim')
+    if data_inicio:
+        logs = logs.filter(data_hora__date__gte=data_inicio)
+    if data_fim:
+        logs = logs.filter(data_hora__date__lte=data_fim)
+
+    # Busca por texto (índice GIN no PostgreSQL / FTS5 no SQLite)
+    busca = params.get('busca')
+    if busca:
+        logs = buscar_logs(logs, busca)
+
+    return logs
+
+
+class _Eco:
+    """Pseudo-arquivo: o csv.writer devolve a linha em vez de guardá-la"""
+    def write(self, valor):
+        return valor
+
+
+def linhas_csv_logs(logs):
+    """
+    Gera as linhas do CSV (já como texto) lendo o queryset em lotes,
+    sem carregar todos os logs em memória.
+    """
+    writer = csv.writer(_Eco())
+    acoes = dict(LogAuditoria.ACAO_CHOICES)
+
+    # Adiciona BOM para Excel reconhecer UTF-8
+    yield '\ufeff' + writer.writerow(CABECALHO_CSV_LOGS)
+
+    registros = logs.values_list(
+        'id', 'data_hora', 'usuario__username', 'acao', 'modelo',
+        'objeto_id', 'objeto_repr', 'descricao', 'ip_address', 'sucesso'
+    ).iterator(chunk_size=TAMANHO_LOTE_EXPORTACAO)
+
+    for (log_id, data_hora, username, acao, modelo, objeto_id,
+         objeto_repr, descricao, ip_address, sucesso) in registros:
+        yield writer.writerow([
+            log_id,
+            timezone.localtime(data_hora).strftime('%d/%m/%Y %H:%M:%S'),
+            username or 'Sistema',
+            acoes.get(acao, acao),
+            modelo or '',
+            objeto_id or '',
+            objeto_repr or '',
+            descricao,
+            ip_address or '',
+            'Sim' if sucesso else 'Não'
+        ])
+
+
+def comprimir_gzip(linhas, encoding='utf-8'):
+    """Comprime um gerador de texto em blocos gzip, também em streaming"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for linha in linhas:
+        bloco = compressor.compress(linha.encode(encoding))
+        if bloco:
+            yield bloco
+    yield compressor.flush()
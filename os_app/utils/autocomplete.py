@@ -0,0 +1,367 @@
+"""
+Índices de prefixo em memória para os autocompletes
+Arquivo: os_app/utils/autocomplete.py
+
+Cada índice é uma lista ordenada de (chave normalizada, id) consultada com
+bisect: as sugestões saem sem consultar o banco. O índice é carregado na
+primeira busca do processo (worker) e atualizado pelos signals de
+post_save/post_delete (após o commit).
+
+Entre workers, pelo cache do Django:
+    - cada alteração aplicada aqui ganha um número de um contador
+      compartilhado e vai para um log curto de (operação, dados), que os
+      outros workers aplicam ao próprio índice sem ir ao banco;
+    - invalidar() troca o carimbo do grupo em utils/versoes.py e todos
+      recarregam o índice inteiro, assim como quem encontrar um buraco no log
+      (entrada expirada ou mais de MAX_ALTERACOES_LOG atrasadas);
+    - o cache é consultado no máximo a cada AUTOCOMPLETE_INTERVALO_SINCRONIA
+      segundos por worker, não a cada tecla.
+Carimbo e número da última alteração formam a ETag das respostas, igual em
+todos os workers em dia. A recarga é montada fora do lock e trocada de uma
+vez; as consultas concorrentes seguem com o índice anterior. Depois de
+AUTOCOMPLETE_TTL segundos a recarga é completa de qualquer forma, cobrindo
+gravações que não passam por signals nem por invalidar() (SQL direto).
+"""
+
+import hashlib
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import versoes
+from .busca import normalizar, apenas_digitos
+
+
+# Quantidade padrão de sugestões
+LIMITE_SUGESTOES = 10
+
+# Log de alterações no cache: atraso máximo aplicado sem recarga e validade das entradas (s)
+MAX_ALTERACOES_LOG = 500
+VALIDADE_ALTERACOES_LOG = 3600
+
+_PREFIXO = 'sisprof:autocomplete:'
+
+
+def _sufixos_palavras(texto):
+    """'ana maria silva' -> ['ana maria silva', 'maria silva', 'silva']"""
+    palavras = normalizar(texto).split()
+    return [' '.join(palavras[i:]) for i in range(len(palavras))]
+
+
+class IndicePrefixos:
+    """
+    Índice de prefixos de um modelo.
+
+    grupo: grupo de utils/versoes.py cujo carimbo identifica os dados
+    campos: campos lidos do banco (o primeiro deve ser 'id')
+    registro(valores): dict devolvido como sugestão
+    chaves(valores): chaves normalizadas pelas quais o registro é encontrado
+    escopo(valores): (escola_id, nucleo_id) do registro para filtrar pelo
+        escopo do usuário (utils/escopo.py); None = visível para todos
+    """
+
+    def __init__(self, modelo, grupo, campos, registro, chaves, escopo=None):
+        self.modelo = modelo
+        self.grupo = grupo
+        self.campos = campos
+        self._registro = registro
+        self._chaves_de = chaves
+        self._escopo_de = escopo
+        self._lock = threading.RLock()
+        # Uma recarga por vez; enquanto ela roda, as consultas usam o índice anterior
+        self._lock_carga = threading.Lock()
+        self._chaves = None
+        self._registros = {}
+        self._chaves_por_id = {}
+        self._escopos = {}
+        self._carregado_em = 0.0
+        # Carimbo (utils/versoes.py) da última carga e número da última
+        # alteração do log aplicada; None = recarregar
+        self._carimbo = None
+        self._sequencia = 0
+        self._verificado_em = 0.0
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+
+    def _chave(self, sufixo):
+        return f'{_PREFIXO}{self.grupo}:{sufixo}'
+
+    def _expirado(self):
+        ttl = getattr(settings, 'AUTOCOMPLETE_TTL', 300)
+        return ttl and time.monotonic() - self._carregado_em > ttl
+
+    def _garantir(self):
+        """Aplica o log dos outros workers ou recarrega, sem segurar o lock das consultas"""
+        if self._chaves is None or self._carimbo is None or self._expirado():
+            self._recarregar()
+            return
+        agora = time.monotonic()
+        if agora - self._verificado_em < getattr(settings, 'AUTOCOMPLETE_INTERVALO_SINCRONIA', 1):
+            return
+        self._verificado_em = agora
+        if not self._sincronizar():
+            self._recarregar()
+
+    def _recarregar(self):
+        if self._chaves is None:
+            # Primeira carga: não há índice anterior para servir, espera
+            with self._lock_carga:
+                if self._chaves is None:
+                    self.carregar()
+        elif self._lock_carga.acquire(blocking=False):
+            try:
+                self.carregar()
+            finally:
+                self._lock_carga.release()
+
+    def _sincronizar(self):
+        """Aplica as alterações publicadas desde a última; False se for preciso recarregar"""
+        if versoes.versao(self.grupo)[0] != self._carimbo:
+            return False
+        aplicada = self._sequencia
+        atual = cache.get(self._chave('sequencia'), 0)
+        if atual == aplicada:
+            return True
+        if atual < aplicada or atual - aplicada > MAX_ALTERACOES_LOG:
+            return False
+        chaves = [self._chave(n) for n in range(aplicada + 1, atual + 1)]
+        alteracoes = cache.get_many(chaves)
+        if len(alteracoes) != len(chaves):
+            return False
+        with self._lock:
+            if self._sequencia == aplicada and self._chaves is not None:
+                for chave in chaves:
+                    operacao, dados = alteracoes[chave]
+                    if operacao == 'salvo':
+                        self._aplicar(dados)
+                    else:
+                        self._remover(dados)
+                self._sequencia = atual
+        return True
+
+    def carregar(self):
+        """(Re)constrói o índice inteiro com uma única consulta e o troca pelo anterior"""
+        # Lidos antes da consulta: alterações durante a carga são reaplicadas do log
+        carimbo = versoes.versao(self.grupo)[0]
+        sequencia = cache.get(self._chave('sequencia'), 0)
+        modelo = apps.get_model(self.modelo)
+        linhas = modelo.objects.order_by().values(*self.campos)
+        chaves, registros, chaves_por_id, escopos = [], {}, {}, {}
+        for valores in linhas.iterator(chunk_size=5000):
+            pk = valores['id']
+            registros[pk] = self._registro(valores)
+            if self._escopo_de:
+                escopos[pk] = self._escopo_de(valores)
+            chaves_pk = set(self._chaves_de(valores))
+            chaves_por_id[pk] = chaves_pk
+            chaves.extend((chave, pk) for chave in chaves_pk)
+        chaves.sort()
+        with self._lock:
+            self._chaves, self._registros, self._chaves_por_id = chaves, registros, chaves_por_id
+            self._escopos = escopos
+            self._carregado_em = self._verificado_em = time.monotonic()
+            self._carimbo, self._sequencia = carimbo, sequencia
+
+    def invalidar(self):
+        """Marca o índice deste e dos outros workers como defasado: a próxima busca recarrega"""
+        with self._lock:
+            self._carimbo = None
+        versoes.trocar_versao(self.grupo)
+
+    # ------------------------------------------------------------------
+    # Atualização incremental
+    # ------------------------------------------------------------------
+
+    def _publicar(self, operacao, dados):
+        """
+        Põe a alteração já aplicada aqui no log compartilhado. Se outras
+        entraram antes dela, o índice continua atrás e as reaplica (inclusive
+        esta) na próxima sincronização.
+        """
+        chave = self._chave('sequencia')
+        cache.add(chave, 0, None)
+        try:
+            numero = cache.incr(chave)
+        except ValueError:
+            # Contador expulso do cache: os outros workers não teriam como seguir o log
+            self.invalidar()
+            return
+        cache.set(self._chave(numero), (operacao, dados), VALIDADE_ALTERACOES_LOG)
+        if numero == self._sequencia + 1:
+            self._sequencia = numero
+
+    def _remover(self, pk):
+        for chave in self._chaves_por_id.pop(pk, ()):
+            i = bisect_left(self._chaves, (chave, pk))
+            if i < len(self._chaves) and self._chaves[i] == (chave, pk):
+                del self._chaves[i]
+        self._registros.pop(pk, None)
+        self._escopos.pop(pk, None)
+
+    def _aplicar(self, valores):
+        pk = valores['id']
+        self._remover(pk)
+        self._registros[pk] = self._registro(valores)
+        if self._escopo_de:
+            self._escopos[pk] = self._escopo_de(valores)
+        chaves_pk = set(self._chaves_de(valores))
+        self._chaves_por_id[pk] = chaves_pk
+        for chave in chaves_pk:
+            insort(self._chaves, (chave, pk))
+
+    def atualizar(self, valores):
+        with self._lock:
+            if self._chaves is not None:
+                self._aplicar(valores)
+            self._publicar('salvo', valores)
+
+    def remover(self, pk):
+        with self._lock:
+            if self._chaves is not None:
+                self._remover(pk)
+            self._publicar('removido', pk)
+
+    def objeto_salvo(self, instance):
+        """Para post_save: aplica a alteração depois do commit"""
+        if set(self.campos) & instance.get_deferred_fields():
+            transaction.on_commit(self.invalidar)
+            return
+        valores = {campo: getattr(instance, campo) for campo in self.campos}
+        transaction.on_commit(lambda: self.atualizar(valores))
+
+    def objeto_removido(self, instance):
+        """Para post_delete"""
+        pk = instance.pk
+        transaction.on_commit(lambda: self.remover(pk))
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def _no_escopo(self, pk, escopo):
+        """Mesmo critério do do_escopo() do modelo, sem consultar o banco"""
+        if escopo is None or escopo.irrestrito or not self._escopo_de:
+            return True
+        escola_id, nucleo_id = self._escopos.get(pk, (None, None))
+        if escopo.escola_id:
+            return escola_id == escopo.escola_id
+        return nucleo_id == escopo.nucleo_id
+
+    def buscar(self, termo, limite=LIMITE_SUGESTOES, escopo=None):
+        """Até `limite` registros do escopo com alguma chave começando por `termo`"""
+        prefixo = normalizar(termo)
+        if not prefixo:
+            return []
+        self._garantir()
+        with self._lock:
+            chaves = self._chaves
+            encontrados = []
+            i = bisect_left(chaves, (prefixo,))
+            while i < len(chaves) and len(encontrados) < limite:
+                chave, pk = chaves[i]
+                if not chave.startswith(prefixo):
+                    break
+                if pk not in encontrados and self._no_escopo(pk, escopo):
+                    encontrados.append(pk)
+                i += 1
+            return [self._registros[pk] for pk in encontrados]
+
+    def obter(self, pk, escopo=None):
+        self._garantir()
+        with self._lock:
+            if not self._no_escopo(pk, escopo):
+                return None
+            return self._registros.get(pk)
+
+    def etag(self, *partes):
+        """
+        ETag da resposta: carimbo e última alteração aplicada (os mesmos em
+        todos os workers em dia) e parâmetros. None (sem ETag) enquanto o
+        índice espera recarga.
+        """
+        self._garantir()
+        with self._lock:
+            carimbo, sequencia = self._carimbo, self._sequencia
+        if carimbo is None:
+            return None
+        resumo = hashlib.md5('\x1f'.join(map(str, partes)).encode()).hexdigest()[:16]
+        return f'{carimbo}.{sequencia}-{resumo}'
+
+    def versao_compartilhada(self):
+        """Carimbo e número da última alteração publicada, sem carregar o índice"""
+        return f"{versoes.versao(self.grupo)[0]}.{cache.get(self._chave('sequencia'), 0)}"
+
+
+# ============================================================================
+# PROFESSORES
+# ============================================================================
+
+def _registro_professor(valores):
+    return {
+        'id': valores['id'],
+        'nome': valores['nome'],
+        'matricula': valores['matricula'] or 'Sem matrícula',
+    }
+
+
+def _chaves_professor(valores):
+    chaves = _sufixos_palavras(valores['nome'])
+    if valores['matricula']:
+        chaves.append(normalizar(valores['matricula']))
+        digitos = apenas_digitos(valores['matricula'])
+        if digitos:
+            chaves.append(digitos)
+    return chaves
+
+
+def _escopo_professor(valores):
+    return valores['escola_lotacao_id'], valores['nucleo_efetivo_id']
+
+
+indice_professores = IndicePrefixos(
+    'os_app.Professor', 'professores',
+    ('id', 'nome', 'matricula', 'escola_lotacao_id', 'nucleo_efetivo_id'),
+    _registro_professor, _chaves_professor, _escopo_professor
+)
+
+
+# ============================================================================
+# BAIRROS
+# ============================================================================
+
+def _registro_bairro(valores):
+    nome, cidade, estado = valores['nome'], valores['cidade'], valores['estado']
+    if cidade and estado:
+        nome_completo = f'{nome} - {cidade}/{estado}'
+    elif cidade:
+        nome_completo = f'{nome} - {cidade}'
+    else:
+        nome_completo = nome
+    return {
+        'id': valores['id'],
+        'nome': nome,
+        'cidade': cidade or '',
+        'estado': estado or '',
+        'nome_completo': nome_completo,
+    }
+
+
+def _chaves_bairro(valores):
+    chaves = _sufixos_palavras(valores['nome'])
+    for campo in ('cidade', 'estado'):
+        if valores[campo]:
+            chaves.append(normalizar(valores[campo]))
+    return chaves
+
+
+indice_bairros = IndicePrefixos(
+    'os_app.Bairro', 'bairros', ('id', 'nome', 'cidade', 'estado'),
+    _registro_bairro, _chaves_bairro
+)
@@ -0,0 +1,54 @@
+"""
+Escritas com novas tentativas quando o SQLite está bloqueado
+Arquivo: os_app/utils/banco.py
+
+Com WAL, busy_timeout e BEGIN IMMEDIATE (settings.SQLITE_OPCOES_PRODUCAO) a
+espera pelo lock já acontece dentro do SQLite; este decorator cobre o que
+passar do busy_timeout sob pico de escrita: repete a transação inteira até
+SQLITE_RETENTATIVAS vezes, com espera exponencial e variação aleatória
+(workers não voltam todos ao mesmo tempo).
+
+Só repete fora de um atomic() externo (dentro dele a transação já está
+perdida e quem a abriu decide) e só para erros de lock.
+"""
+
+import logging
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, connection
+
+
+logger = logging.getLogger(__name__)
+
+# Espera antes da 1ª nova tentativa, dobrada a cada uma (segundos)
+ESPERA_INICIAL = 0.05
+ESPERA_MAXIMA = 1.0
+
+
+def banco_bloqueado(erro):
+    mensagem = str(erro).lower()
+    return 'database is locked' in mensagem or 'database table is locked' in mensagem
+
+
+def repetir_se_bloqueado(func):
+    """Decorator para funções que abrem (e fecham) sua própria transação de escrita"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        tentativas = 0
+        if connection.vendor == 'sqlite' and not connection.in_atomic_block:
+            tentativas = getattr(settings, 'SQLITE_RETENTATIVAS', 0)
+        espera = ESPERA_INICIAL
+        for tentativa in range(tentativas + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as erro:
+                if tentativa == tentativas or not banco_bloqueado(erro):
+                    raise
+                logger.warning('%s: banco bloqueado, nova tentativa %d/%d',
+                               func.__qualname__, tentativa + 1, tentativas)
+                time.sleep(espera * (1 + random.random()))
+                espera = min(espera * 2, ESPERA_MAXIMA)
+    return wrapper
@@ -0,0 +1,262 @@
+"""
+Busca textual indexada
+Arquivo: os_app/utils/busca.py
+
+Logs de auditoria (migração 0013):
+    PostgreSQL: SearchVector com índice GIN.
+    SQLite: tabela virtual FTS5 mantida por triggers.
+
+Professores (migração 0015), sobre a coluna busca_normalizada
+(minúsculas, sem acentos, CPF/matrícula também só com dígitos):
+    PostgreSQL: índice GIN pg_trgm (LIKE '%termo%' indexado).
+    SQLite: tabela FTS5 com tokenizer trigram mantida por triggers.
+
+Outros bancos: cai no icontains/contains tradicional.
+"""
+
+import re
+import unicodedata
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db import connections, router
+from django.db.models import Case, FloatField, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+
+# Configuração de idioma usada no SearchVector e no índice GIN
+CONFIG_BUSCA_PG = 'portuguese'
+
+# Tabela FTS5 (SQLite) espelhando descricao/objeto_repr de LogAuditoria
+TABELA_FTS_LOGS = 'os_app_logauditoria_fts'
+
+# Tabela FTS5 (SQLite) espelhando busca_normalizada de Professor
+TABELA_FTS_PROFESSORES = 'os_app_professor_fts'
+
+# Triggers que mantêm a FTS5 de professores. Ficam aqui (e não só na
+# migração) porque recriar a tabela os_app_professor no SQLite os apaga:
+# migrações que fazem isso chamam recriar_triggers_busca_professores
+SQLITE_TRIGGERS_FTS_PROFESSORES = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABELA_FTS_PROFESSORES}_ai AFTER INSERT ON os_app_professor BEGIN
+        INSERT INTO {TABELA_FTS_PROFESSORES}(rowid, busca_normalizada) VALUES (new.id, new.busca_normalizada);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABELA_FTS_PROFESSORES}_ad AFTER DELETE ON os_app_professor BEGIN
+        INSERT INTO {TABELA_FTS_PROFESSORES}({TABELA_FTS_PROFESSORES}, rowid, busca_normalizada)
+        VALUES ('delete', old.id, old.busca_normalizada);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABELA_FTS_PROFESSORES}_au AFTER UPDATE OF busca_normalizada ON os_app_professor BEGIN
+        INSERT INTO {TABELA_FTS_PROFESSORES}({TABELA_FTS_PROFESSORES}, rowid, busca_normalizada)
+        VALUES ('delete', old.id, old.busca_normalizada);
+        INSERT INTO {TABELA_FTS_PROFESSORES}(rowid, busca_normalizada) VALUES (new.id, new.busca_normalizada);
+    END
+    """,
+]
+
+# O tokenizer trigram não indexa termos com menos de 3 caracteres
+TAMANHO_MINIMO_TRIGRAMA = 3
+
+_RE_SO_DIGITOS_E_PONTUACAO = re.compile(r'^[\d.\-/]+$')
+
+
+def _vendor(queryset):
+    return connections[queryset.db].vendor
+
+
+def _termos(texto):
+    """Quebra o texto em palavras (sem pontuação/operadores)"""
+    return re.findall(r'\w+', texto or '')
+
+
+def _consulta_fts5(texto):
+    """
+    Monta expressão MATCH segura para o FTS5.
+    Cada palavra vira um prefixo entre aspas, combinadas com AND implícito.
+    """
+    return ' '.join(f'"{termo}"*' for termo in _termos(texto))
+
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e com espaços simples (para comparar nomes)"""
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+
+def apenas_digitos(texto):
+    return re.sub(r'\D', '', texto or '')
+
+
+def texto_busca_professor(nome, email, cpf, matricula):
+    """Conteúdo da coluna Professor.busca_normalizada"""
+    partes = [normalizar(nome), normalizar(email), apenas_digitos(cpf)]
+    if matricula:
+        partes.append(normalizar(matricula))
+        digitos = apenas_digitos(matricula)
+        if digitos and digitos != matricula:
+            partes.append(digitos)
+    return ' '.join(p for p in partes if p)
+
+
+def termos_busca_professor(texto):
+    """
+    Termos da busca já normalizados. CPF/matrícula digitados com pontuação
+    ("123.456.789-0") viram só dígitos, como na coluna.
+    """
+    termos = []
+    for termo in normalizar(texto).split():
+        if _RE_SO_DIGITOS_E_PONTUACAO.match(termo):
+            termo = apenas_digitos(termo)
+        if termo:
+            termos.append(termo)
+    return termos
+
+
+def vetor_busca_logs():
+    """SearchVector usado tanto na consulta quanto no índice GIN"""
+    from django.contrib.postgres.search import SearchVector
+    return SearchVector('descricao', 'objeto_repr', config=CONFIG_BUSCA_PG)
+
+
+def buscar_logs(logs, texto):
+    """
+    Aplica a busca textual a um queryset de LogAuditoria.
+
+    Mantém os filtros já aplicados ao queryset, anota `relevancia`
+    (maior = mais relevante) e ordena por relevância e data.
+    """
+    texto = (texto or '').strip()
+    if not _termos(texto):
+        return logs
+
+    # Username vem de outra tabela: resolve os IDs (tabela pequena)
+    # e combina com a busca textual, ambos cobertos por índice
+    usuarios = User.objects.filter(username__icontains=texto).values('id')
+    vendor = _vendor(logs)
+
+    if vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        consulta = SearchQuery(texto, config=CONFIG_BUSCA_PG, search_type='websearch')
+        logs = logs.annotate(vetor_busca=vetor_busca_logs()).filter(
+            Q(vetor_busca=consulta) | Q(usuario_id__in=usuarios)
+        ).annotate(
+            relevancia=SearchRank('vetor_busca', consulta)
+        )
+        return logs.order_by('-relevancia', '-data_hora')
+
+    if vendor == 'sqlite':
+        consulta = _consulta_fts5(texto)
+        ids_fts = RawSQL(
+            f'SELECT rowid FROM {TABELA_FTS_LOGS} WHERE {TABELA_FTS_LOGS} MATCH %s',
+            [consulta]
+        )
+        # bm25 é negativo: quanto menor, mais relevante
+        rank_fts = RawSQL(
+            f'SELECT -bm25({TABELA_FTS_LOGS}) FROM {TABELA_FTS_LOGS} '
+            f'WHERE {TABELA_FTS_LOGS} MATCH %s AND rowid = os_app_logauditoria.id',
+            [consulta],
+            output_field=FloatField()
+        )
+        logs = logs.filter(
+            Q(id__in=ids_fts) | Q(usuario_id__in=usuarios)
+        ).annotate(
+            relevancia=Coalesce(rank_fts, Value(0.0), output_field=FloatField())
+        )
+        return logs.order_by('-relevancia', '-data_hora')
+
+    # Fallback sem índice textual
+    return logs.filter(
+        Q(descricao__icontains=texto) |
+        Q(objeto_repr__icontains=texto) |
+        Q(usuario__username__icontains=texto)
+    )
+
+
+@contextmanager
+def indice_busca_logs_suspenso():
+    """
+    Desliga os triggers FTS5 durante cargas em massa de LogAuditoria e
+    reconstrói o índice de uma vez ao final (muito mais rápido que manter
+    linha a linha). Em outros bancos não faz nada.
+    """
+    from ..models import LogAuditoria
+
+    conexao = connections[router.db_for_write(LogAuditoria)]
+    if conexao.vendor != 'sqlite':
+        yield
+        return
+
+    with conexao.cursor() as cursor:
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+            [f'{TABELA_FTS_LOGS}_%']
+        )
+        triggers = cursor.fetchall()
+        for nome, _ in triggers:
+            cursor.execute(f'DROP TRIGGER {nome}')
+    try:
+        yield
+    finally:
+        with conexao.cursor() as cursor:
+            for _, sql in triggers:
+                cursor.execute(sql)
+            if triggers:
+                cursor.execute(f"INSERT INTO {TABELA_FTS_LOGS}({TABELA_FTS_LOGS}) VALUES ('rebuild')")
+
+
+def recriar_triggers_busca_professores(schema_editor):
+    """Reinstala os triggers da FTS5 de professores e reindexa (só SQLite)"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in SQLITE_TRIGGERS_FTS_PROFESSORES:
+        schema_editor.execute(sql)
+    schema_editor.execute(
+        f"INSERT INTO {TABELA_FTS_PROFESSORES}({TABELA_FTS_PROFESSORES}) VALUES ('rebuild')"
+    )
+
+
+def _consulta_trigrama(termos):
+    """Expressão MATCH para o tokenizer trigram (cada termo = substring)"""
+    return ' '.join('"{}"'.format(termo.replace('"', '""')) for termo in termos)
+
+
+def buscar_professores(professores, texto):
+    """
+    Aplica a busca (nome, e-mail, CPF, matrícula) a um queryset de Professor,
+    ignorando acentos e maiúsculas. Anota `exato` (1 para CPF ou matrícula
+    idênticos ao digitado) e ordena esses primeiro, depois por nome.
+    """
+    texto = (texto or '').strip()
+    termos = termos_busca_professor(texto)
+    if not termos:
+        return professores
+
+    cpf = apenas_digitos(texto)
+    exato = Q(matricula=texto)
+    if len(cpf) == 11:
+        exato |= Q(cpf_digitos=cpf)
+        if _RE_SO_DIGITOS_E_PONTUACAO.match(texto):
+            # CPF completo: busca direta pelos índices únicos
+            return professores.filter(exato).annotate(exato=Value(1)).order_by('nome')
+
+    vendor = _vendor(professores)
+    longos = [t for t in termos if len(t) >= TAMANHO_MINIMO_TRIGRAMA]
+    if vendor == 'sqlite' and longos:
+        professores = professores.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {TABELA_FTS_PROFESSORES} WHERE {TABELA_FTS_PROFESSORES} MATCH %s',
+            [_consulta_trigrama(longos)]
+        ))
+        termos = [t for t in termos if len(t) < TAMANHO_MINIMO_TRIGRAMA]
+    # PostgreSQL: LIKE '%termo%' coberto pelo índice GIN pg_trgm
+    for termo in termos:
+        professores = professores.filter(busca_normalizada__contains=termo)
+
+    return professores.annotate(
+        exato=Case(When(exato, then=Value(1)), default=Value(0), output_field=IntegerField())
+    ).order_by('-exato', 'nome')
@@ -0,0 +1,103 @@
+"""
+Carga concorrente com vários processos (como os workers do gunicorn)
+Arquivo: os_app/utils/carga.py
+
+Cada worker é um processo (fork) com sua própria conexão ao banco e um
+django.test.Client autenticado: as requisições passam por todo o stack de
+middlewares (sessão, auditoria, perfilamento), sem o custo do HTTP. Todos
+começam no mesmo instante e sorteiam operações pelos pesos até o fim do
+tempo; latências e erros (status >= 500) voltam por uma fila.
+
+O Client desliga o close_old_connections dos sinais request_started e
+request_finished; o worker o chama antes e depois de cada requisição, como
+o WSGIHandler, para CONN_MAX_AGE e o pool valerem como em produção.
+"""
+
+import math
+import multiprocessing
+import random
+import time
+
+from django.db import close_old_connections, connections
+from django.test import Client
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) pelo método do posto mais próximo"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[max(math.ceil(p / 100 * len(ordenados)) - 1, 0)]
+
+
+def _worker(indice, usuario, operacoes, inicio, fim, fila):
+    rnd = random.Random(indice)
+    nomes = [nome for nome, _, _ in operacoes]
+    funcoes = {nome: funcao for nome, _, funcao in operacoes}
+    pesos = [peso for _, peso, _ in operacoes]
+    latencias = {nome: [] for nome in nomes}
+    erros = dict.fromkeys(nomes, 0)
+    try:
+        cliente = Client(raise_request_exception=False)
+        cliente.force_login(usuario)
+        time.sleep(max(inicio - time.monotonic(), 0))
+        while time.monotonic() < fim:
+            nome = rnd.choices(nomes, pesos)[0]
+            comeco = time.perf_counter()
+            close_old_connections()
+            response = funcoes[nome](cliente, rnd)
+            close_old_connections()
+            duracao = (time.perf_counter() - comeco) * 1000
+            if response.status_code >= 500:
+                erros[nome] += 1
+            else:
+                latencias[nome].append(duracao)
+    finally:
+        connections.close_all()
+        fila.put((latencias, erros))
+
+
+def medir(usuario, operacoes, workers, segundos):
+    """
+    Executa `operacoes` [(nome, peso, funcao(cliente, rnd) -> response)]
+    em `workers` processos por `segundos`. Devolve por operação
+    {'requisicoes', 'erros', 'p50_ms', 'p99_ms'} e o total em 'geral'
+    (com 'req_s').
+    """
+    # Cada processo abre a própria conexão
+    connections.close_all()
+    contexto = multiprocessing.get_context('fork')
+    fila = contexto.Queue()
+    inicio = time.monotonic() + 0.5 + 0.05 * workers
+    fim = inicio + segundos
+    processos = [
+        contexto.Process(target=_worker, args=(i, usuario, operacoes, inicio, fim, fila))
+        for i in range(workers)
+    ]
+    for processo in processos:
+        processo.start()
+    parciais = [fila.get() for _ in processos]
+    for processo in processos:
+        processo.join()
+
+    resultado = {}
+    todas, total_erros = [], 0
+    for nome, _, _ in operacoes:
+        valores = [v for latencias, _ in parciais for v in latencias[nome]]
+        erros = sum(erros[nome] for _, erros in parciais)
+        todas.extend(valores)
+        total_erros += erros
+        resultado[nome] = {
+            'requisicoes': len(valores) + erros,
+            'erros': erros,
+            'p50_ms': round(percentil(valores, 50), 1),
+            'p99_ms': round(percentil(valores, 99), 1),
+        }
+    resultado['geral'] = {
+        'requisicoes': len(todas) + total_erros,
+        'erros': total_erros,
+        'p50_ms': round(percentil(todas, 50), 1),
+        'p99_ms': round(percentil(todas, 99), 1),
+        'req_s': round((len(todas) + total_erros) / segundos, 1),
+    }
+    return resultado
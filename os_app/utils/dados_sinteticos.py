@@ -0,0 +1,318 @@
+"""
+Geração de dados sintéticos para testes de carga
+Arquivo: os_app/utils/dados_sinteticos.py
+
+Tudo é inserido em lotes, um lote por transação (bulk_create; os logs,
+por volume, via INSERT preparado com executemany), e é determinístico a
+partir da semente (mesma semente = mesmos dados).
+"""
+
+import random
+import re
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .busca import indice_busca_logs_suspenso
+from ..models import (
+    Professor, ProfessorRelatorio, EscolaNucleo, Escola, Cargo, Bairro, Serie, Motivo,
+    PerfilUsuario, LogAuditoria,
+    AREA_ATUACAO_CHOICES, SITUACAO_FUNCIONAL_CHOICES, MODALIDADE_CHOICES,
+    TURNO_CHOICES, TIPO_USUARIO_CHOICES
+)
+
+
+TAMANHO_LOTE_PADRAO = 50000
+
+CIDADE = 'Belém'
+ESTADO = 'PA'
+
+NOMES = [
+    'Ana', 'Antônio', 'Beatriz', 'Carlos', 'Cláudia', 'Daniel', 'Débora', 'Eduardo',
+    'Fernanda', 'Francisco', 'Gabriela', 'João', 'José', 'Júlia', 'Luís', 'Luíza',
+    'Marcos', 'Maria', 'Mário', 'Patrícia', 'Paulo', 'Raimundo', 'Rita', 'Sebastião',
+    'Sônia', 'Tânia', 'Vítor', 'Wellington',
+]
+
+SOBRENOMES = [
+    'Almeida', 'Araújo', 'Barbosa', 'Cardoso', 'Carvalho', 'Conceição', 'Costa',
+    'Ferreira', 'Gomes', 'Lima', 'Monteiro', 'Nascimento', 'Oliveira', 'Pereira',
+    'Ribeiro', 'Rodrigues', 'Santos', 'Silva', 'Sousa', 'Teixeira', 'Vieira',
+]
+
+BAIRROS = [
+    'Batista Campos', 'Cidade Velha', 'Condor', 'Cremação', 'Guamá', 'Jurunas',
+    'Marco', 'Nazaré', 'Pedreira', 'Reduto', 'Sacramenta', 'Telégrafo', 'Terra Firme',
+    'Umarizal', 'Val-de-Cans', 'Benguí', 'Cabanagem', 'Icoaraci', 'Mosqueiro', 'Tapanã',
+]
+
+CARGOS = ['Professor(a)', 'Professor(a) Substituto(a)', 'Coordenador(a) Pedagógico(a)',
+          'Diretor(a)', 'Vice-Diretor(a)', 'Secretário(a) Escolar']
+
+SERIES = ['Pré I', 'Pré II', '1º Ano', '2º Ano', '3º Ano', '4º Ano', '5º Ano',
+          '6º Ano', '7º Ano', '8º Ano', '9º Ano', 'EJA - 1ª Etapa', 'EJA - 2ª Etapa']
+
+MOTIVOS = ['Licença Médica', 'Licença Maternidade', 'Readaptação', 'Cedido(a)',
+           'Afastamento para Estudos', 'Função Administrativa']
+
+# Pesos das distribuições (na ordem das choices, sem a opção vazia)
+PESOS_AREA = [12, 12, 5, 5, 6, 2, 2, 2, 6, 4, 4, 2, 2, 1, 1, 1, 1, 10, 18, 10, 3, 4, 3, 1, 1, 2]
+PESOS_SITUACAO = [10, 35, 5, 50]   # acréscimo, contratado, dobra, efetivo
+PESOS_MODALIDADE = [4, 12, 8, 35, 30, 1, 10]
+PESOS_TURNO = [10, 40, 40, 10]     # diurno, matutino, vespertino, noturno
+PESOS_TIPO_USUARIO = [5, 15, 30, 50]
+PESOS_ACAO = [20, 15, 10, 12, 2, 25, 8, 3, 1, 3, 1]
+
+# Fração de professores fora de sala
+FRACAO_FORA_SALA = 0.08
+
+
+def _valores(choices):
+    return [valor for valor, _ in choices if valor]
+
+
+def gerar_cpf(rnd):
+    """Gera CPF válido (com dígitos verificadores), já formatado"""
+    digitos = [rnd.randint(0, 9) for _ in range(9)]
+    for tamanho in (9, 10):
+        soma = sum(d * peso for d, peso in zip(digitos, range(tamanho + 1, 1, -1)))
+        resto = (soma * 10) % 11
+        digitos.append(0 if resto == 10 else resto)
+    cpf = ''.join(map(str, digitos))
+    return f'{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}'
+
+
+def _nome_completo(rnd):
+    return f'{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}'
+
+
+def _em_lotes(modelo, gerador, lote):
+    """
+    Consome o gerador inserindo `lote` objetos por vez com bulk_create,
+    um lote por transação. Devolve os objetos criados (com pk).
+    """
+    criados = []
+    gerador = iter(gerador)
+    while True:
+        bloco = list(islice(gerador, lote))
+        if not bloco:
+            return criados
+        with transaction.atomic():
+            criados.extend(modelo.objects.bulk_create(bloco))
+
+
+def _inserir_direto(modelo, campos, linhas, lote):
+    """
+    INSERT preparado uma única vez e executado com executemany, um lote por
+    transação. Para tabelas grandes (logs): o bulk_create compila o SQL
+    campo a campo para cada objeto, o que domina o tempo em milhões de linhas.
+
+    `linhas` são tuplas já no formato do banco, na ordem de `campos`.
+    Devolve a quantidade inserida.
+    """
+    alias = router.db_for_write(modelo)
+    conexao = connections[alias]
+    quote = conexao.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(modelo._meta.db_table),
+        ', '.join(quote(modelo._meta.get_field(campo).column) for campo in campos),
+        ', '.join(['%s'] * len(campos)),
+    )
+    if conexao.vendor == 'sqlite':
+        # Cache de páginas maior (padrão ~2 MB) só nesta conexão: os índices
+        # de LogAuditoria não cabem no padrão e cada lote relê páginas do disco
+        with conexao.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size = -262144')
+    total = 0
+    linhas = iter(linhas)
+    while True:
+        bloco = list(islice(linhas, lote))
+        if not bloco:
+            return total
+        with transaction.atomic(using=alias):
+            with conexao.cursor() as cursor:
+                cursor.executemany(sql, bloco)
+        total += len(bloco)
+
+
+def gerar_dados(nucleos=10, escolas=60, professores=2000, usuarios=20, logs=20000,
+                seed=42, lote=TAMANHO_LOTE_PADRAO, dias_logs=365, progresso=None):
+    """
+    Gera um município sintético completo.
+
+    Retorna um dict com a quantidade de registros criados por modelo.
+    `progresso`, se informado, é chamado com (modelo, quantidade).
+    """
+    rnd = random.Random(seed)
+    avisar = progresso or (lambda modelo, quantidade: None)
+    # Marca dos campos únicos (matrícula, nomes, usernames): repetir a
+    # mesma semente no mesmo banco exige apagar os dados antes (--limpar)
+    marca = f's{seed}'
+
+    # Tabelas auxiliares
+    nomes_bairros = BAIRROS + [f'Bairro {n + 1}' for n in range(max(nucleos - len(BAIRROS), 0))]
+    bairros = _existentes_ou_criar(Bairro, 'nome', nomes_bairros, cidade=CIDADE, estado=ESTADO)
+    cargos = _existentes_ou_criar(Cargo, 'nome', CARGOS)
+    series = _existentes_ou_criar(Serie, 'nome', SERIES)
+    motivos = _existentes_ou_criar(Motivo, 'descricao', MOTIVOS)
+    avisar('Bairro/Cargo/Serie/Motivo', len(bairros) + len(cargos) + len(series) + len(motivos))
+
+    # Núcleos e escolas
+    lista_nucleos = _em_lotes(EscolaNucleo, (
+        EscolaNucleo(
+            nome=f'EMEF Núcleo {i + 1} ({marca})',
+            cidade=CIDADE, estado=ESTADO,
+            bairro=rnd.choice(bairros),
+            zona=rnd.choices(['urbana', 'rural'], [75, 25])[0],
+        )
+        for i in range(nucleos)
+    ), lote)
+    avisar('EscolaNucleo', len(lista_nucleos))
+
+    lista_escolas = _em_lotes(Escola, (
+        Escola(
+            nome=f'Escola Anexa {i + 1} ({marca})',
+            nucleo=lista_nucleos[i % len(lista_nucleos)] if lista_nucleos else None,
+            cidade=CIDADE, estado=ESTADO,
+            bairro=rnd.choice(bairros),
+            zona=rnd.choices(['urbana', 'rural'], [70, 30])[0],
+        )
+        for i in range(escolas)
+    ), lote)
+    avisar('Escola', len(lista_escolas))
+
+    # Professores
+    areas = _valores(AREA_ATUACAO_CHOICES)
+    situacoes = _valores(SITUACAO_FUNCIONAL_CHOICES)
+    modalidades = _valores(MODALIDADE_CHOICES)
+    turnos = _valores(TURNO_CHOICES)
+    cpfs_usados = set(Professor.objects.values_list('cpf', flat=True).iterator())
+
+    def novo_cpf():
+        while True:
+            cpf = gerar_cpf(rnd)
+            if cpf not in cpfs_usados:
+                cpfs_usados.add(cpf)
+                return cpf
+
+    def gerar_professores():
+        for i in range(professores):
+            escola = rnd.choice(lista_escolas) if lista_escolas else None
+            em_sala = rnd.random() >= FRACAO_FORA_SALA
+            nome = _nome_completo(rnd)
+            professor = Professor(
+                nome=nome,
+                cpf=novo_cpf(),
+                matricula=f'{marca}-{i + 1:07d}',
+                telefone=f'(91) 9{rnd.randint(8000, 9999)}-{rnd.randint(0, 9999):04d}',
+                email=f'{nome.split()[0].lower()}.{i + 1}@{marca}.edu.test',
+                cargo=rnd.choice(cargos),
+                situacao_funcional=rnd.choices(situacoes, PESOS_SITUACAO)[0],
+                escola_lotacao=escola,
+                escola_nucleo=escola.nucleo if escola else None,
+                nucleo_efetivo=escola.nucleo if escola else None,
+                bairro=rnd.choice(bairros),
+                cidade=CIDADE,
+                estado=ESTADO,
+                area_atuacao=rnd.choices(areas, PESOS_AREA)[0],
+                modalidade=rnd.choices(modalidades, PESOS_MODALIDADE)[0],
+                turno=rnd.choices(turnos, PESOS_TURNO)[0],
+                serie=rnd.choice(series),
+                carga_horaria=rnd.choice([20, 20, 30, 40, 40, 40]),
+                em_sala=em_sala,
+                motivo_fora_sala=None if em_sala else rnd.choice(motivos),
+            )
+            # bulk_create não passa pelo save()
+            professor.cpf_digitos = re.sub(r'\D', '', professor.cpf)
+            professor.busca_normalizada = professor.texto_busca()
+            yield professor
+
+    lista_professores = _em_lotes(Professor, gerar_professores(), lote)
+    avisar('Professor', len(lista_professores))
+    ProfessorRelatorio.objects.sincronizar(p.pk for p in lista_professores)
+    avisar('ProfessorRelatorio', len(lista_professores))
+
+    # Usuários e perfis (bulk_create não dispara o signal de perfil)
+    senha = make_password('sisprof123')
+    tipos = [tipo for tipo, _ in TIPO_USUARIO_CHOICES]
+    lista_usuarios = _em_lotes(User, (
+        User(username=f'usuario_{marca}_{i + 1}', password=senha,
+             first_name=rnd.choice(NOMES), last_name=rnd.choice(SOBRENOMES))
+        for i in range(usuarios)
+    ), lote)
+    _em_lotes(PerfilUsuario, (
+        PerfilUsuario(
+            usuario=usuario,
+            tipo_usuario=rnd.choices(tipos, PESOS_TIPO_USUARIO)[0],
+            escola_vinculada=rnd.choice(lista_escolas) if lista_escolas else None,
+        )
+        for usuario in lista_usuarios
+    ), lote)
+    avisar('User/PerfilUsuario', len(lista_usuarios))
+
+    # Logs de auditoria espalhados pelo período
+    acoes = [acao for acao, _ in LogAuditoria.ACAO_CHOICES]
+    rotulos_acoes = dict(LogAuditoria.ACAO_CHOICES)
+    ids_usuarios = [u.id for u in lista_usuarios] or [None]
+    refs_professores = [(p.id, p.nome) for p in lista_professores] or [(None, None)]
+    agora = timezone.now()
+    segundos_periodo = dias_logs * 24 * 3600
+    adaptar_data = connections[router.db_for_write(LogAuditoria)].ops.adapt_datetimefield_value
+
+    # Em ordem cronológica, como em produção: o índice por data_hora
+    # recebe as linhas sempre no fim, sem reescrever páginas no meio
+    deslocamentos = sorted((rnd.randint(0, segundos_periodo) for _ in range(logs)), reverse=True)
+
+    def gerar_logs():
+        for acao, deslocamento in zip(rnd.choices(acoes, PESOS_ACAO, k=logs), deslocamentos):
+            professor_id, professor_nome = rnd.choice(refs_professores)
+            yield (
+                rnd.choice(ids_usuarios),
+                acao,
+                'Professor' if professor_id else 'Sistema',
+                professor_id,
+                professor_nome,
+                f'{rotulos_acoes[acao]}: {professor_nome}' if professor_id else rotulos_acoes[acao],
+                f'10.0.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}',
+                '',
+                adaptar_data(agora - timedelta(seconds=deslocamento)),
+                True,
+                '',
+            )
+
+    with indice_busca_logs_suspenso():
+        total_logs = _inserir_direto(LogAuditoria, [
+            'usuario', 'acao', 'modelo', 'objeto_id', 'objeto_repr', 'descricao',
+            'ip_address', 'user_agent', 'data_hora', 'sucesso', 'mensagem_erro',
+        ], gerar_logs(), lote)
+    avisar('LogAuditoria', total_logs)
+
+    return {
+        'nucleos': len(lista_nucleos),
+        'escolas': len(lista_escolas),
+        'professores': len(lista_professores),
+        'usuarios': len(lista_usuarios),
+        'logs': total_logs,
+    }
+
+
+def _existentes_ou_criar(modelo, campo, valores, **extras):
+    """Garante os registros auxiliares (campo único) e devolve todos eles"""
+    modelo.objects.bulk_create(
+        [modelo(**{campo: v}, **extras) for v in valores], ignore_conflicts=True
+    )
+    return list(modelo.objects.filter(**{f'{campo}__in': valores}, **extras).order_by('pk'))
+
+
+def limpar_dados():
+    """Remove professores, escolas, logs e usuários comuns (não superusuários)"""
+    with transaction.atomic():
+        LogAuditoria.objects.all().delete()
+        Professor.objects.all().delete()
+        Escola.objects.all().delete()
+        EscolaNucleo.objects.all().delete()
+        User.objects.filter(is_superuser=False).delete()
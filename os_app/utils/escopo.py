@@ -0,0 +1,61 @@
+"""
+Escopo de dados do usuário (escola_vinculada / nucleo_vinculado)
+Arquivo: os_app/utils/escopo.py
+
+Usuários com escola ou núcleo vinculado no perfil enxergam só os
+professores e escolas daquele recorte. O EscopoMiddleware põe o escopo em
+request.escopo e as views o aplicam com o método do_escopo() dos managers
+de Professor, Escola e EscolaNucleo, que vira um WHERE indexado:
+    - escola:  Professor.escola_lotacao_id / Escola.id / EscolaNucleo.id
+      (o núcleo da escola);
+    - núcleo:  Professor.nucleo_efetivo_id / Escola.nucleo_id / EscolaNucleo.id.
+
+Superusuário, ADMIN e perfis sem vínculo não têm restrição. O escopo vem
+junto com a máscara de permissões (mesma consulta, mesmo cache e mesma
+invalidação, ver utils/permissoes.py).
+"""
+
+from .permissoes import perfil_compilado
+
+
+# Campos do perfil lidos para montar o escopo
+CAMPOS_PERFIL = ('tipo_usuario', 'nucleo_vinculado', 'escola_vinculada__nucleo')
+
+
+class Escopo:
+    """Recorte de dados: escola_id (e o núcleo dela) ou apenas nucleo_id"""
+
+    __slots__ = ('escola_id', 'nucleo_id')
+
+    def __init__(self, escola_id=None, nucleo_id=None):
+        self.escola_id = escola_id
+        self.nucleo_id = nucleo_id
+
+    @property
+    def irrestrito(self):
+        return self.escola_id is None and self.nucleo_id is None
+
+    def __repr__(self):
+        return f'Escopo(escola_id={self.escola_id}, nucleo_id={self.nucleo_id})'
+
+
+IRRESTRITO = Escopo()
+
+
+def valores_do_perfil(perfil):
+    """(escola_id, nucleo_id) do perfil; (None, None) para ADMIN"""
+    if perfil.tipo_usuario == 'ADMIN':
+        return None, None
+    if perfil.escola_vinculada_id:
+        return perfil.escola_vinculada_id, perfil.escola_vinculada.nucleo_id
+    return None, perfil.nucleo_vinculado_id
+
+
+def escopo_do_usuario(usuario):
+    """Escopo do usuário (IRRESTRITO para anônimo, superusuário, ADMIN e sem vínculo)"""
+    if not usuario.is_authenticated or usuario.is_superuser:
+        return IRRESTRITO
+    _, escola_id, nucleo_id = perfil_compilado(usuario)
+    if escola_id is None and nucleo_id is None:
+        return IRRESTRITO
+    return Escopo(escola_id, nucleo_id)
@@ -0,0 +1,453 @@
+"""
+Importação em massa de professores (CSV ou XLSX)
+Arquivo: os_app/utils/importacao_professores.py
+
+As linhas são lidas em fluxo (csv.reader / openpyxl read_only) e
+processadas em lotes: cargos, escolas, bairros e séries são resolvidos por
+dicionários carregados uma única vez, a unicidade de CPF e matrícula é
+verificada com uma consulta por lote e a gravação usa bulk_create, um lote
+por transação. Ao final é registrado um único log IMPORT com o resumo.
+"""
+
+import csv
+import io
+import re
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import DataError, IntegrityError, transaction
+
+from .autocomplete import indice_professores
+from .tabela_cruzada import retrato_professores
+from .busca import normalizar, texto_busca_professor
+from ..models import (
+    Professor, ProfessorRelatorio, Escola, Cargo, Bairro, Serie, LogAuditoria,
+    AREA_ATUACAO_CHOICES, SITUACAO_FUNCIONAL_CHOICES, MODALIDADE_CHOICES,
+    TURNO_CHOICES
+)
+
+
+TAMANHO_LOTE_IMPORTACAO = 500
+
+EXTENSOES_ACEITAS = ('.csv', '.xlsx')
+
+# Cabeçalho aceito (já normalizado) -> campo do modelo
+COLUNAS = {
+    'nome': 'nome',
+    'nome completo': 'nome',
+    'cpf': 'cpf',
+    'matricula': 'matricula',
+    'telefone': 'telefone',
+    'email': 'email',
+    'e-mail': 'email',
+    'cargo': 'cargo',
+    'situacao funcional': 'situacao_funcional',
+    'situacao': 'situacao_funcional',
+    'escola': 'escola',
+    'escola de lotacao': 'escola',
+    'inep': 'escola_inep',
+    'codigo inep': 'escola_inep',
+    'bairro': 'bairro',
+    'cidade': 'cidade',
+    'uf': 'estado',
+    'estado': 'estado',
+    'area de atuacao': 'area_atuacao',
+    'area': 'area_atuacao',
+    'modalidade': 'modalidade',
+    'turno': 'turno',
+    'serie': 'serie',
+    'carga horaria': 'carga_horaria',
+}
+
+COLUNAS_OBRIGATORIAS = ('nome', 'cpf', 'telefone', 'email')
+
+# Campos de texto validados pelos validadores do próprio modelo
+# (max_length, EmailValidator) em vez de truncados
+CAMPOS_TEXTO = ('nome', 'matricula', 'telefone', 'email', 'cidade', 'estado')
+
+CABECALHO_RELATORIO = ['Linha', 'CPF', 'Nome', 'Erros']
+
+# Linhas com erro guardadas na sessão para o download do relatório
+LIMITE_ERROS_RELATORIO = 1000
+
+# Marca nomes que existem em mais de um registro (ex.: escolas homônimas)
+_AMBIGUO = object()
+
+
+def formatar_cpf(digitos):
+    return f'{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}'
+
+
+# ============================================================================
+# LEITURA DO ARQUIVO
+# ============================================================================
+
+def _ler_csv(arquivo):
+    texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+    amostra = texto.read(4096)
+    texto.seek(0)
+    # Planilhas salvas pelo Excel em pt-BR usam ';'
+    delimitador = ';' if amostra.count(';') > amostra.count(',') else ','
+    leitor = csv.reader(texto, delimiter=delimitador)
+    cabecalho = next(leitor, [])
+    for numero, valores in enumerate(leitor, start=2):
+        yield numero, cabecalho, valores
+    texto.detach()
+
+
+def _ler_xlsx(arquivo):
+    from openpyxl import load_workbook
+
+    planilha = load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        linhas = planilha.active.iter_rows(values_only=True)
+        cabecalho = next(linhas, ())
+        for numero, valores in enumerate(linhas, start=2):
+            yield numero, cabecalho, valores
+    finally:
+        planilha.close()
+
+
+def _texto_celula(campo, valor):
+    """Valor da célula como texto; números inteiros sem '.0' e CPF numérico com os zeros à esquerda"""
+    if valor is None:
+        return ''
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        if valor == int(valor):
+            valor = int(valor)
+            if campo == 'cpf':
+                return str(valor).zfill(11)
+    return str(valor).strip()
+
+
+def ler_linhas(arquivo, nome_arquivo):
+    """
+    Gera (número da linha, {campo: valor}) a partir de um arquivo binário
+    CSV ou XLSX. Colunas desconhecidas são ignoradas; linhas vazias, puladas.
+    """
+    nome_arquivo = nome_arquivo.lower()
+    if nome_arquivo.endswith('.xlsx'):
+        origem = _ler_xlsx(arquivo)
+    elif nome_arquivo.endswith('.csv'):
+        origem = _ler_csv(arquivo)
+    else:
+        raise ValueError('Formato não suportado. Envie um arquivo .csv ou .xlsx.')
+
+    campos = None
+    for numero, cabecalho, valores in origem:
+        if campos is None:
+            campos = [COLUNAS.get(normalizar(c)) for c in cabecalho]
+            faltando = [c for c in COLUNAS_OBRIGATORIAS if c not in campos]
+            if faltando:
+                raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(faltando)}")
+        linha = {
+            campo: _texto_celula(campo, valor)
+            for campo, valor in zip(campos, valores) if campo
+        }
+        if any(linha.values()):
+            yield numero, linha
+
+
+# ============================================================================
+# VALIDAÇÃO E GRAVAÇÃO
+# ============================================================================
+
+class ResultadoImportacao:
+    """Totais e relatório de erros por linha"""
+
+    def __init__(self):
+        self.total = 0
+        self.importados = 0
+        self.erros = []
+
+    def adicionar_erro(self, numero, linha, mensagens):
+        self.erros.append({
+            'linha': numero,
+            'cpf': linha.get('cpf', ''),
+            'nome': linha.get('nome', ''),
+            'mensagens': mensagens,
+        })
+
+
+def linhas_relatorio(erros, total=None):
+    """
+    Relatório de erros como linhas de CSV (cabeçalho incluso). Se `total`
+    for maior que a lista recebida, avisa que o relatório foi cortado.
+    """
+    yield CABECALHO_RELATORIO
+    for erro in erros:
+        yield [erro['linha'], erro['cpf'], erro['nome'], '; '.join(erro['mensagens'])]
+    if total and total > len(erros):
+        yield ['', '', '', f'Relatório limitado às primeiras {len(erros)} de {total} linhas com erro']
+
+
+class _Referencias:
+    """Tabelas auxiliares carregadas uma única vez por importação"""
+
+    def __init__(self, escopo=None):
+        self.escopo = escopo
+        self.cargos = {normalizar(nome): pk for pk, nome in Cargo.objects.values_list('id', 'nome')}
+        self.series = {normalizar(nome): pk for pk, nome in Serie.objects.values_list('id', 'nome')}
+
+        self.escolas = {}
+        self.escolas_inep = {}
+        for pk, nome, inep, nucleo_id in Escola.objects.values_list('id', 'nome', 'codigo_inep', 'nucleo_id'):
+            chave = normalizar(nome)
+            self.escolas[chave] = _AMBIGUO if chave in self.escolas else (pk, nucleo_id)
+            if inep:
+                self.escolas_inep[inep.strip()] = (pk, nucleo_id)
+
+        self.bairros = {}
+        for pk, nome, cidade in Bairro.objects.values_list('id', 'nome', 'cidade'):
+            self.bairros[(normalizar(nome), normalizar(cidade))] = pk
+            chave = normalizar(nome)
+            self.bairros[chave] = _AMBIGUO if chave in self.bairros else pk
+
+        self.choices = {
+            'situacao_funcional': self._mapa_choices(SITUACAO_FUNCIONAL_CHOICES),
+            'area_atuacao': self._mapa_choices(AREA_ATUACAO_CHOICES),
+            'modalidade': self._mapa_choices(MODALIDADE_CHOICES),
+            'turno': self._mapa_choices(TURNO_CHOICES),
+        }
+
+    @staticmethod
+    def _mapa_choices(choices):
+        """Aceita tanto o valor gravado quanto o rótulo exibido"""
+        mapa = {}
+        for valor, rotulo in choices:
+            if valor:
+                mapa[normalizar(valor)] = valor
+                mapa[normalizar(rotulo)] = valor
+        return mapa
+
+    def escola(self, linha):
+        if linha.get('escola_inep'):
+            return self.escolas_inep.get(linha['escola_inep'])
+        if linha.get('escola'):
+            return self.escolas.get(normalizar(linha['escola']))
+        return None
+
+    def no_escopo(self, escola):
+        """(escola_id, nucleo_id) dentro do escopo do usuário (mesmo critério de Escola.do_escopo)"""
+        if self.escopo is None or self.escopo.irrestrito:
+            return True
+        if self.escopo.escola_id:
+            return escola[0] == self.escopo.escola_id
+        return escola[1] == self.escopo.nucleo_id
+
+    def bairro(self, linha):
+        nome = normalizar(linha['bairro'])
+        if linha.get('cidade'):
+            pk = self.bairros.get((nome, normalizar(linha['cidade'])))
+            if pk:
+                return pk
+        return self.bairros.get(nome)
+
+
+def _validar(linha, refs):
+    """Converte a linha em Professor (sem gravar). Devolve (professor, erros)."""
+    erros = []
+
+    for campo in COLUNAS_OBRIGATORIAS:
+        if not linha.get(campo):
+            erros.append(f'{campo} é obrigatório')
+
+    cpf = re.sub(r'\D', '', linha.get('cpf', ''))
+    if linha.get('cpf') and len(cpf) != 11:
+        erros.append('CPF deve ter 11 dígitos')
+
+    dados = {
+        'nome': linha.get('nome', ''),
+        'cpf': formatar_cpf(cpf) if len(cpf) == 11 else cpf,
+        'cpf_digitos': cpf,
+        'matricula': linha.get('matricula') or None,
+        'telefone': linha.get('telefone', ''),
+        'email': linha.get('email', ''),
+        'cidade': linha.get('cidade', ''),
+        'estado': linha.get('estado', '').upper(),
+    }
+
+    for campo in CAMPOS_TEXTO:
+        if dados[campo]:
+            try:
+                Professor._meta.get_field(campo).run_validators(dados[campo])
+            except ValidationError as e:
+                erros.append(f"{campo}: {' '.join(e.messages)}")
+
+    if linha.get('cargo'):
+        dados['cargo_id'] = refs.cargos.get(normalizar(linha['cargo']))
+        if dados['cargo_id'] is None:
+            erros.append(f"Cargo não encontrado: {linha['cargo']}")
+
+    if linha.get('serie'):
+        dados['serie_id'] = refs.series.get(normalizar(linha['serie']))
+        if dados['serie_id'] is None:
+            erros.append(f"Série não encontrada: {linha['serie']}")
+
+    if linha.get('escola') or linha.get('escola_inep'):
+        escola = refs.escola(linha)
+        if escola is _AMBIGUO:
+            erros.append(f"Escola com nome repetido, informe o código INEP: {linha['escola']}")
+        elif escola is None:
+            erros.append(f"Escola não encontrada: {linha.get('escola_inep') or linha['escola']}")
+        elif not refs.no_escopo(escola):
+            erros.append(f"Escola fora do seu escopo: {linha.get('escola_inep') or linha['escola']}")
+        else:
+            dados['escola_lotacao_id'], dados['escola_nucleo_id'] = escola
+            # bulk_create não passa pelo save()
+            dados['nucleo_efetivo_id'] = dados['escola_nucleo_id']
+    elif refs.escopo is not None and not refs.escopo.irrestrito:
+        # Sem escola o professor ficaria fora do escopo de quem importou
+        erros.append('escola é obrigatória para usuários vinculados a escola ou núcleo')
+
+    if linha.get('bairro'):
+        bairro = refs.bairro(linha)
+        if bairro is _AMBIGUO:
+            erros.append(f"Bairro existe em mais de uma cidade, informe a cidade: {linha['bairro']}")
+        elif bairro is None:
+            erros.append(f"Bairro não encontrado: {linha['bairro']}")
+        else:
+            dados['bairro_id'] = bairro
+
+    for campo, mapa in refs.choices.items():
+        if linha.get(campo):
+            dados[campo] = mapa.get(normalizar(linha[campo]))
+            if dados[campo] is None:
+                erros.append(f'Valor inválido para {campo}: {linha[campo]}')
+
+    if linha.get('carga_horaria'):
+        try:
+            dados['carga_horaria'] = int(float(linha['carga_horaria'].replace(',', '.')))
+        except ValueError:
+            erros.append(f"Carga horária inválida: {linha['carga_horaria']}")
+
+    if erros:
+        return None, erros
+    dados['busca_normalizada'] = texto_busca_professor(
+        dados['nome'], dados['email'], dados['cpf'], dados['matricula']
+    )
+    return Professor(**dados), []
+
+
+def _processar_lote(lote, refs, cpfs_arquivo, matriculas_arquivo, resultado):
+    validos = []
+    for numero, linha in lote:
+        professor, erros = _validar(linha, refs)
+        if erros:
+            resultado.adicionar_erro(numero, linha, erros)
+        else:
+            validos.append((numero, linha, professor))
+
+    # Uma consulta por lote para CPF (índice único de cpf_digitos) e outra para matrícula
+    cpfs = {p.cpf_digitos for _, _, p in validos}
+    matriculas = {p.matricula for _, _, p in validos if p.matricula}
+    cpfs_existentes = set(
+        Professor.objects.filter(cpf_digitos__in=cpfs).values_list('cpf_digitos', flat=True)
+    )
+    matriculas_existentes = set(
+        Professor.objects.filter(matricula__in=matriculas).values_list('matricula', flat=True)
+    ) if matriculas else set()
+
+    novos = []
+    for numero, linha, professor in validos:
+        erros = []
+        if professor.cpf_digitos in cpfs_existentes:
+            erros.append('CPF já cadastrado')
+        elif professor.cpf_digitos in cpfs_arquivo:
+            erros.append('CPF repetido no arquivo')
+        if professor.matricula:
+            if professor.matricula in matriculas_existentes:
+                erros.append('Matrícula já cadastrada')
+            elif professor.matricula in matriculas_arquivo:
+                erros.append('Matrícula repetida no arquivo')
+        if erros:
+            resultado.adicionar_erro(numero, linha, erros)
+            continue
+        cpfs_arquivo.add(professor.cpf_digitos)
+        if professor.matricula:
+            matriculas_arquivo.add(professor.matricula)
+        novos.append((numero, linha, professor))
+
+    if not novos:
+        return
+    try:
+        with transaction.atomic():
+            criados = Professor.objects.bulk_create([p for _, _, p in novos])
+            # bulk_create não dispara post_save
+            ProfessorRelatorio.objects.sincronizar([p.pk for p in criados])
+    except (IntegrityError, DataError):
+        # Cadastro concorrente entre a verificação e a gravação (ou valor
+        # recusado pelo banco que escapou da validação): grava linha a linha
+        # para recusar só as que falham
+        _gravar_por_linha(novos, resultado)
+        return
+    resultado.importados += len(novos)
+
+
+def _gravar_por_linha(novos, resultado):
+    """Um savepoint por professor; as linhas recusadas pelo banco vão para o relatório"""
+    criados = []
+    with transaction.atomic():
+        for numero, linha, professor in novos:
+            professor.pk = None
+            try:
+                with transaction.atomic():
+                    Professor.objects.bulk_create([professor])
+            except IntegrityError:
+                resultado.adicionar_erro(numero, linha, ['CPF ou matrícula cadastrado durante a importação'])
+            except DataError as e:
+                resultado.adicionar_erro(numero, linha, [f'Valor recusado pelo banco: {e}'])
+            else:
+                criados.append(professor.pk)
+        ProfessorRelatorio.objects.sincronizar(criados)
+    resultado.importados += len(criados)
+
+
+def importar_professores(arquivo, nome_arquivo, usuario=None, request=None,
+                         lote=TAMANHO_LOTE_IMPORTACAO):
+    """
+    Importa professores de um arquivo CSV/XLSX (objeto binário).
+
+    Levanta ValueError para arquivo inválido (formato ou cabeçalho);
+    erros de linha vão para o ResultadoImportacao devolvido. Com `request`,
+    só aceita escolas do escopo do usuário (request.escopo).
+    """
+    refs = _Referencias(getattr(request, 'escopo', None))
+    resultado = ResultadoImportacao()
+    cpfs_arquivo = set()
+    matriculas_arquivo = set()
+
+    linhas = ler_linhas(arquivo, nome_arquivo)
+    while True:
+        bloco = list(islice(linhas, lote))
+        if not bloco:
+            break
+        resultado.total += len(bloco)
+        _processar_lote(bloco, refs, cpfs_arquivo, matriculas_arquivo, resultado)
+    resultado.erros.sort(key=lambda erro: erro['linha'])
+    if resultado.importados:
+        # bulk_create não dispara post_save: o autocomplete e o retrato das
+        # tabelas cruzadas recarregam na próxima consulta
+        indice_professores.invalidar()
+        retrato_professores.invalidar()
+
+    LogAuditoria.registrar(
+        usuario=usuario,
+        acao='IMPORT',
+        modelo='Professor',
+        objeto_repr=nome_arquivo[:200],
+        descricao=(
+            f'Importou {resultado.importados} de {resultado.total} professor(es) '
+            f'do arquivo {nome_arquivo} ({len(resultado.erros)} linha(s) com erro)'
+        ),
+        dados_novos={
+            'arquivo': nome_arquivo,
+            'total': resultado.total,
+            'importados': resultado.importados,
+            'erros': len(resultado.erros),
+        },
+        request=request,
+        sucesso=not resultado.erros,
+        mensagem_erro=f'{len(resultado.erros)} linha(s) rejeitada(s)' if resultado.erros else '',
+    )
+    return resultado
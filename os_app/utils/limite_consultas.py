@@ -0,0 +1,121 @@
+"""
+Tempo máximo por consulta SQL nas views de filtros livres
+Arquivo: os_app/utils/limite_consultas.py
+
+Uma combinação infeliz de filtros (vários icontains em relatórios ou nos
+logs) pode prender o banco por minutos. Dentro de limitar_consultas() cada
+comando SQL tem um tempo máximo:
+    - PostgreSQL: SET statement_timeout na sessão (desfeito no final, antes
+      de a conexão voltar ao pool);
+    - SQLite: progress handler que interrompe o comando em andamento.
+
+O comando interrompido é registrado (SQL, parâmetros e tempo) no logger
+deste módulo e vira ConsultaInterrompida, que o decorator
+@limite_de_consulta transforma numa página pedindo filtros mais restritos.
+"""
+
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import OperationalError, connections
+
+
+logger = logging.getLogger(__name__)
+
+# SQLite: instruções da VM entre duas verificações do relógio
+INSTRUCOES_POR_VERIFICACAO = 10000
+
+# SQLSTATE do PostgreSQL para "canceling statement due to statement timeout"
+_PG_QUERY_CANCELED = '57014'
+
+
+class ConsultaInterrompida(Exception):
+    """Comando SQL interrompido por passar do tempo máximo"""
+
+    def __init__(self, sql, duracao):
+        super().__init__(f'Consulta interrompida após {duracao:.1f}s')
+        self.sql = sql
+        self.duracao = duracao
+
+
+def _tempo_esgotado(erro):
+    causa = erro.__cause__
+    codigo = getattr(causa, 'sqlstate', None) or getattr(causa, 'pgcode', None)
+    if codigo:
+        return codigo == _PG_QUERY_CANCELED
+    return 'interrupted' in str(erro).lower()
+
+
+class _Guarda:
+    """
+    execute_wrapper de uma conexão: aplica o limite na primeira consulta e
+    guarda o último comando. O relógio do comando continua valendo enquanto
+    suas linhas são lidas (no SQLite a leitura também executa a consulta).
+    """
+
+    def __init__(self, conexao, segundos):
+        self.conexao = conexao
+        self.segundos = segundos
+        self.preparada = False
+        self.inicio = None
+        self.sql = self.params = None
+
+    def _preparar(self):
+        bruta = self.conexao.connection
+        if self.conexao.vendor == 'postgresql':
+            with bruta.cursor() as cursor:
+                cursor.execute(f'SET statement_timeout = {int(self.segundos * 1000)}')
+        elif self.conexao.vendor == 'sqlite':
+            bruta.set_progress_handler(self._excedeu, INSTRUCOES_POR_VERIFICACAO)
+        self.preparada = True
+
+    def _excedeu(self):
+        # Diferente de zero interrompe o comando do SQLite
+        return self.inicio is not None and time.monotonic() - self.inicio > self.segundos
+
+    def __call__(self, execute, sql, params, many, context):
+        if not self.preparada:
+            self._preparar()
+        self.sql, self.params = sql, params
+        self.inicio = time.monotonic()
+        return execute(sql, params, many, context)
+
+    def desfazer(self):
+        if not self.preparada or self.conexao.connection is None:
+            return
+        try:
+            if self.conexao.vendor == 'postgresql':
+                with self.conexao.connection.cursor() as cursor:
+                    cursor.execute('RESET statement_timeout')
+            elif self.conexao.vendor == 'sqlite':
+                self.conexao.connection.set_progress_handler(None, 0)
+        except Exception:
+            # Conexão inutilizada: o Django a descarta no fim da requisição
+            logger.exception('Não foi possível desfazer o limite de consulta em %s', self.conexao.alias)
+
+
+@contextmanager
+def limitar_consultas(segundos):
+    """Limita a `segundos` cada comando SQL executado no bloco (todas as conexões)"""
+    guardas = [_Guarda(conexao, segundos) for conexao in connections.all()]
+    try:
+        with ExitStack() as pilha:
+            for guarda in guardas:
+                pilha.enter_context(guarda.conexao.execute_wrapper(guarda))
+            yield
+    except OperationalError as erro:
+        if not _tempo_esgotado(erro):
+            raise
+        guarda = max((g for g in guardas if g.inicio), key=lambda g: g.inicio, default=None)
+        if guarda is None:
+            raise
+        duracao = time.monotonic() - guarda.inicio
+        logger.warning(
+            'Consulta interrompida após %.2fs (limite %gs, banco %s): %s -- parâmetros: %r',
+            duracao, segundos, guarda.conexao.alias, guarda.sql, guarda.params,
+        )
+        raise ConsultaInterrompida(guarda.sql, duracao) from erro
+    finally:
+        for guarda in guardas:
+            guarda.desfazer()
@@ -0,0 +1,87 @@
+"""
+Operações em lote sobre professores
+Arquivo: os_app/utils/operacoes_lote.py
+
+Cada operação é um único UPDATE ... WHERE id IN (...) dentro de uma
+transação (mais a sincronização das linhas de ProfessorRelatorio),
+seguido de um único registro de auditoria com os ids afetados.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Professor, ProfessorRelatorio, LogAuditoria
+from .autocomplete import indice_professores
+from .banco import repetir_se_bloqueado
+from .tabela_cruzada import retrato_professores
+
+
+@repetir_se_bloqueado
+def _atualizar(ids, valores, descricao, usuario=None, request=None):
+    """
+    Aplica `valores` aos professores de `ids` (no escopo do usuário da
+    requisição) e registra um log UPDATE.
+    Devolve a quantidade de professores alterados.
+    """
+    escopo = getattr(request, 'escopo', None)
+    with transaction.atomic():
+        afetados = sorted(
+            Professor.objects.do_escopo(escopo).filter(id__in=ids).values_list('id', flat=True)
+        )
+        if not afetados:
+            return 0
+        # update() não dispara o auto_now
+        Professor.objects.filter(id__in=afetados).update(
+            data_atualizacao=timezone.now(), **valores
+        )
+        # update() não dispara signals: a tabela dos relatórios é refeita aqui
+        # e o retrato das tabelas cruzadas recarrega na próxima consulta
+        ProfessorRelatorio.objects.sincronizar(afetados)
+        retrato_professores.invalidar_apos_commit()
+        # O autocomplete guarda a lotação para filtrar pelo escopo
+        if set(valores) & set(indice_professores.campos):
+            transaction.on_commit(indice_professores.invalidar)
+
+        LogAuditoria.registrar(
+            usuario=usuario,
+            acao='UPDATE',
+            modelo='Professor',
+            objeto_repr=f'{len(afetados)} professor(es)',
+            descricao=f'{descricao} ({len(afetados)} professor(es))',
+            dados_novos={'ids': afetados, **valores},
+            request=request
+        )
+    return len(afetados)
+
+
+def transferir_lotacao(ids, escola, usuario=None, request=None):
+    """Move os professores para `escola`, mantendo escola_nucleo e nucleo_efetivo coerentes"""
+    return _atualizar(
+        ids,
+        {'escola_lotacao_id': escola.pk, 'escola_nucleo_id': escola.nucleo_id,
+         'nucleo_efetivo_id': escola.nucleo_id},
+        f'Transferiu lotação em lote para {escola.nome}',
+        usuario, request
+    )
+
+
+def alterar_turno(ids, turno, usuario=None, request=None):
+    return _atualizar(ids, {'turno': turno}, f'Alterou turno em lote para {turno}', usuario, request)
+
+
+def alterar_situacao_funcional(ids, situacao, usuario=None, request=None):
+    return _atualizar(
+        ids, {'situacao_funcional': situacao},
+        f'Alterou situação funcional em lote para {situacao}', usuario, request
+    )
+
+
+def definir_em_sala(ids, em_sala, motivo=None, usuario=None, request=None):
+    """Marca em sala (limpa o motivo) ou fora de sala com o motivo informado"""
+    if em_sala:
+        valores = {'em_sala': True, 'motivo_fora_sala_id': None}
+        descricao = 'Marcou em sala em lote'
+    else:
+        valores = {'em_sala': False, 'motivo_fora_sala_id': motivo.pk if motivo else None}
+        descricao = f"Marcou fora de sala em lote{f' ({motivo.descricao})' if motivo else ''}"
+    return _atualizar(ids, valores, descricao, usuario, request)
@@ -0,0 +1,226 @@
+"""
+Coleta de métricas de desempenho por view
+Arquivo: os_app/utils/perfilamento.py
+
+Acumula, por url_name e por processo (worker), número de queries, tempo de SQL,
+tempo de renderização de templates, latência total e consultas repetidas
+(indício de N+1). Os agregados ficam em memória e um retrato deles é
+gravado periodicamente pelo logger deste módulo (arquivo JSON Lines com
+rotação por tamanho, ver LOGGING no settings).
+
+O tempo de template vem do backend DjangoTemplatesMedidos, que o settings
+só usa com PERFILAMENTO_ATIVO.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+
+logger = logging.getLogger(__name__)
+
+
+# Limites (ms) dos baldes do histograma de latência
+BALDES_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+# Quantas consultas repetidas guardar por view
+MAX_REPETIDAS = 10
+
+# Métricas da requisição em andamento (uma por thread/tarefa)
+requisicao_atual = ContextVar('perfilamento_requisicao', default=None)
+
+_RE_LISTA_IN = re.compile(r'IN \((?:%s, )*%s\)')
+_RE_NUMEROS = re.compile(r'\b\d+\b')
+
+
+def impressao_digital(sql):
+    """
+    Normaliza o SQL para identificar consultas "iguais" com parâmetros
+    diferentes (listas IN de tamanhos distintos e literais numéricos).
+    """
+    sql = _RE_LISTA_IN.sub('IN (...)', sql)
+    return _RE_NUMEROS.sub('N', sql)
+
+
+class MetricasRequisicao:
+    """Métricas de uma única requisição"""
+
+    __slots__ = ('queries', 'tempo_sql', 'tempo_template', 'digitais')
+
+    def __init__(self):
+        self.queries = 0
+        self.tempo_sql = 0.0
+        self.tempo_template = 0.0
+        self.digitais = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        """Usado como connection.execute_wrapper"""
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tempo_sql += time.perf_counter() - inicio
+            self.queries += 1
+            self.digitais[impressao_digital(sql)] += 1
+
+
+class Histograma:
+    """Histograma de baldes fixos (ms)"""
+
+    def __init__(self):
+        self.contagens = [0] * (len(BALDES_MS) + 1)
+
+    def adicionar(self, valor_ms):
+        self.contagens[bisect_left(BALDES_MS, valor_ms)] += 1
+
+    def percentil(self, p):
+        """
+        Limite superior do balde que contém o percentil p (0-100).
+        None quando cai acima do último balde.
+        """
+        total = sum(self.contagens)
+        if not total:
+            return 0
+        alvo = total * p / 100
+        acumulado = 0
+        for indice, contagem in enumerate(self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return BALDES_MS[indice] if indice < len(BALDES_MS) else None
+        return None
+
+
+class EstatisticasView:
+    """Agregado de todas as requisições de uma view"""
+
+    def __init__(self):
+        self.requisicoes = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.tempo_sql = 0.0
+        self.tempo_template = 0.0
+        self.tempo_total = 0.0
+        self.latencia = Histograma()
+        self.repetidas = Counter()
+
+    def adicionar(self, metricas, tempo_total):
+        self.requisicoes += 1
+        self.queries += metricas.queries
+        self.max_queries = max(self.max_queries, metricas.queries)
+        self.tempo_sql += metricas.tempo_sql
+        self.tempo_template += metricas.tempo_template
+        self.tempo_total += tempo_total
+        self.latencia.adicionar(tempo_total * 1000)
+
+        for digital, vezes in metricas.digitais.items():
+            if vezes > 1:
+                self.repetidas[digital] += vezes
+        if len(self.repetidas) > MAX_REPETIDAS * 5:
+            self.repetidas = Counter(dict(self.repetidas.most_common(MAX_REPETIDAS)))
+
+    def resumo(self, url_name):
+        n = self.requisicoes or 1
+        return {
+            'url_name': url_name,
+            'requisicoes': self.requisicoes,
+            'queries_media': round(self.queries / n, 1),
+            'queries_max': self.max_queries,
+            'sql_ms_medio': round(self.tempo_sql * 1000 / n, 1),
+            'template_ms_medio': round(self.tempo_template * 1000 / n, 1),
+            'total_ms_medio': round(self.tempo_total * 1000 / n, 1),
+            'p50_ms': self.latencia.percentil(50),
+            'p95_ms': self.latencia.percentil(95),
+            'p99_ms': self.latencia.percentil(99),
+            'histograma': list(self.latencia.contagens),
+            'repetidas': self.repetidas.most_common(MAX_REPETIDAS),
+        }
+
+
+class ColetorDesempenho:
+    """Agregador em memória (um por processo), protegido por lock"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._ultimo_flush = time.monotonic()
+        self.inicio = time.time()
+
+    def registrar(self, url_name, metricas, tempo_total):
+        with self._lock:
+            estatisticas = self._views.get(url_name)
+            if estatisticas is None:
+                estatisticas = self._views[url_name] = EstatisticasView()
+            estatisticas.adicionar(metricas, tempo_total)
+        self._talvez_gravar()
+
+    def resumo(self):
+        with self._lock:
+            linhas = [e.resumo(nome) for nome, e in self._views.items()]
+        return sorted(linhas, key=lambda l: l['total_ms_medio'], reverse=True)
+
+    def limpar(self):
+        with self._lock:
+            self._views = {}
+            self.inicio = time.time()
+
+    def _talvez_gravar(self):
+        intervalo = getattr(settings, 'PERFILAMENTO_INTERVALO_FLUSH', 60)
+        agora = time.monotonic()
+        if agora - self._ultimo_flush < intervalo:
+            return
+        self._ultimo_flush = agora
+        self.gravar()
+
+    def gravar(self):
+        """Grava um retrato dos agregados (uma linha JSON) pelo logger do módulo"""
+        registro = {
+            'timestamp': time.time(),
+            'pid': os.getpid(),
+            'desde': self.inicio,
+            'views': self.resumo(),
+        }
+        logger.info(json.dumps(registro, ensure_ascii=False))
+
+
+coletor = ColetorDesempenho()
+
+
+# ============================================================================
+# TEMPO DE TEMPLATE
+# ============================================================================
+
+class TemplateMedido(Template):
+    """Template do backend Django que soma o tempo de render() na requisição medida"""
+
+    def render(self, context=None, request=None):
+        metricas = requisicao_atual.get()
+        if metricas is None:
+            return super().render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metricas.tempo_template += time.perf_counter() - inicio
+
+
+class DjangoTemplatesMedidos(DjangoTemplates):
+    """Backend DjangoTemplates que devolve TemplateMedido (TEMPLATES no settings)"""
+
+    def from_string(self, template_code):
+        return TemplateMedido(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TemplateMedido(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
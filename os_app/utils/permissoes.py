@@ -0,0 +1,108 @@
+"""
+Permissões compiladas em máscara de bits
+Arquivo: os_app/utils/permissoes.py
+
+Os campos pode_* do PerfilUsuario viram um inteiro (um bit por permissão).
+A máscara de cada usuário é calculada com uma consulta (que também traz o
+escopo de utils/escopo.py), guardada no cache do Django e memorizada no
+request:
+    - enquanto estiver no cache, verificar permissões não consulta o banco;
+    - salvar/excluir o perfil apaga a máscara (e o escopo) após o commit, e
+      a próxima requisição a recalcula.
+
+Apagar a máscara só alcança os outros workers se o cache for compartilhado
+(Redis, Memcached, DatabaseCache; ver CACHES em settings.py). No LocMemCache
+padrão cada worker tem a sua cópia, e o único limite é PERMISSOES_TTL: o
+tempo que outro worker pode usar uma máscara antiga.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+# Ordem fixa: o índice é o bit (não reordenar, apenas acrescentar no fim)
+PERMISSOES = (
+    'criar_professor',
+    'editar_professor',
+    'excluir_professor',
+    'criar_escola_nucleo',
+    'editar_escola_nucleo',
+    'excluir_escola_nucleo',
+    'criar_escola_dependente',
+    'editar_escola_dependente',
+    'excluir_escola_dependente',
+    'gerar_relatorios',
+    'exportar_dados',
+)
+
+BITS = {nome: 1 << i for i, nome in enumerate(PERMISSOES)}
+TODAS = (1 << len(PERMISSOES)) - 1
+
+_PREFIXO = 'sisprof:permissoes:'
+
+
+def mascara_do_perfil(perfil):
+    """Máscara a partir dos campos pode_* do perfil"""
+    mascara = 0
+    for nome, bit in BITS.items():
+        if getattr(perfil, 'pode_' + nome):
+            mascara |= bit
+    return mascara
+
+
+def perfil_alterado(usuario_id):
+    """Para os signals do perfil: descarta máscara e escopo do usuário após o commit"""
+    transaction.on_commit(lambda: cache.delete(f'{_PREFIXO}{usuario_id}'))
+
+
+def _calcular(usuario):
+    """(máscara, escola_id, nucleo_id) do perfil com uma consulta"""
+    from ..models import PerfilUsuario
+    from .escopo import CAMPOS_PERFIL, valores_do_perfil
+
+    perfil = (
+        PerfilUsuario.objects.filter(usuario_id=usuario.pk)
+        .select_related('escola_vinculada')
+        .only(*('pode_' + nome for nome in PERMISSOES), *CAMPOS_PERFIL)
+        .order_by()
+        .first()
+    )
+    if perfil is None:
+        return 0, None, None
+    return (mascara_do_perfil(perfil), *valores_do_perfil(perfil))
+
+
+def perfil_compilado(usuario):
+    """
+    (máscara, escola_id, nucleo_id) de um usuário autenticado, não
+    superusuário, lidos do cache (utils/escopo.py usa os dois últimos)
+    """
+    chave = f'{_PREFIXO}{usuario.pk}'
+    valores = cache.get(chave)
+    if valores is None:
+        valores = _calcular(usuario)
+        cache.set(chave, valores, getattr(settings, 'PERMISSOES_TTL', 60))
+    return valores
+
+
+def mascara(request):
+    """Máscara de permissões do usuário da requisição (memorizada no request)"""
+    if hasattr(request, '_mascara_permissoes'):
+        return request._mascara_permissoes
+
+    usuario = request.user
+    if not usuario.is_authenticated:
+        valor = 0
+    elif usuario.is_superuser:
+        valor = TODAS
+    else:
+        valor = perfil_compilado(usuario)[0]
+
+    request._mascara_permissoes = valor
+    return valor
+
+
+def tem_permissao(request, permissao):
+    """True se o usuário da requisição tiver a permissão (nome sem 'pode_')"""
+    return bool(mascara(request) & BITS[permissao])
@@ -0,0 +1,218 @@
+"""
+Filtros dos relatórios de professores
+Arquivo: os_app/utils/relatorios.py
+
+filtrar_professores() aplica os filtros da tela de relatórios (inclusive os
+intervalos de ID, série e turno) a um queryset de ProfessorRelatorio (o
+filtro de matéria usa a coluna materias, que só existe nessa tabela). Usado
+pelas views relatorios_resultado e relatorios_pdf e pelo comando
+sugerir_indices, que repete pelo EXPLAIN as combinações de filtros
+registradas na auditoria.
+"""
+
+from ..models import (
+    EscolaNucleo, Escola, Cargo, Serie, Bairro,
+    AREA_ATUACAO_CHOICES, SITUACAO_FUNCIONAL_CHOICES, MODALIDADE_CHOICES, TURNO_CHOICES,
+    MATERIAS_CHOICES,
+)
+
+
+# Parâmetros GET que são filtros (o resto é seleção de campos e paginação)
+PARAMETROS_FILTRO = (
+    'professor_id', 'professor_id_inicio', 'professor_id_fim', 'ref_global',
+    'nucleo', 'escola', 'area', 'materia', 'situacao', 'em_sala', 'cidade',
+    'cargo', 'serie', 'serie_id_inicio', 'serie_id_fim', 'modalidade',
+    'turno', 'turno_inicio', 'turno_fim', 'bairro',
+)
+
+
+def filtros_usados(params):
+    """Filtros preenchidos em `params` (para registrar na auditoria)"""
+    return {nome: params.get(nome) for nome in PARAMETROS_FILTRO if params.get(nome)}
+
+
+def filtrar_professores(professores, params):
+    """
+    Aplica os filtros de `params` (request.GET ou dict) a `professores`
+    (queryset de ProfessorRelatorio).
+    Devolve (queryset, descrições dos filtros aplicados).
+    """
+    # Captura os filtros - INCLUINDO INTERVALOS
+    professor_id = params.get('professor_id')
+    professor_id_inicio = params.get('professor_id_inicio')
+    professor_id_fim = params.get('professor_id_fim')
+    ref_global = params.get('ref_global')
+    nucleo_id = params.get('nucleo')
+    escola_id = params.get('escola')
+    area = params.get('area')
+    materia = params.get('materia')
+    situacao = params.get('situacao')
+    em_sala = params.get('em_sala')
+    cidade = params.get('cidade')
+    cargo_id = params.get('cargo')
+    serie_id = params.get('serie')
+    serie_id_inicio = params.get('serie_id_inicio')
+    serie_id_fim = params.get('serie_id_fim')
+    modalidade = params.get('modalidade')
+    turno = params.get('turno')
+    turno_inicio = params.get('turno_inicio')
+    turno_fim = params.get('turno_fim')
+    bairro_id = params.get('bairro')
+    
+    # Aplica filtros
+    filtros_aplicados = []
+    
+    # FILTRO DE ID - INTERVALO OU ÚNICO
+    if professor_id_inicio and professor_id_fim:
+        professores = professores.filter(pk__gte=professor_id_inicio, pk__lte=professor_id_fim)
+        filtros_aplicados.append(f"ID: de {professor_id_inicio} até {professor_id_fim}")
+    elif professor_id_inicio:
+        professores = professores.filter(pk__gte=professor_id_inicio)
+        filtros_aplicados.append(f"ID: a partir de {professor_id_inicio}")
+    elif professor_id_fim:
+        professores = professores.filter(pk__lte=professor_id_fim)
+        filtros_aplicados.append(f"ID: até {professor_id_fim}")
+    elif professor_id:
+        professores = professores.filter(pk=professor_id)
+        filtros_aplicados.append(f"ID: {professor_id}")
+    
+    if ref_global:
+        professores = professores.filter(ref_global__icontains=ref_global)
+        filtros_aplicados.append(f"Ref. Global: {ref_global}")
+    
+    if nucleo_id:
+        professores = professores.filter(nucleo_efetivo_id=nucleo_id)
+        try:
+            nucleo = EscolaNucleo.objects.get(id=nucleo_id)
+            filtros_aplicados.append(f"Núcleo: {nucleo.nome}")
+        except (EscolaNucleo.DoesNotExist, ValueError, TypeError):
+            pass
+    
+    if escola_id:
+        professores = professores.filter(escola_lotacao_id=escola_id)
+        try:
+            escola = Escola.objects.get(id=escola_id)
+            filtros_aplicados.append(f"Escola: {escola.nome}")
+        except (Escola.DoesNotExist, ValueError, TypeError):
+            pass
+    
+    if area:
+        professores = professores.filter(area_atuacao=area)
+        area_nome = dict(AREA_ATUACAO_CHOICES).get(area, area)
+        filtros_aplicados.append(f"Área: {area_nome}")
+    
+    if situacao:
+        professores = professores.filter(situacao_funcional=situacao)
+        sit_nome = dict(SITUACAO_FUNCIONAL_CHOICES).get(situacao, situacao)
+        filtros_aplicados.append(f"Situação: {sit_nome}")
+    
+    if em_sala:
+        if em_sala == 'sim':
+            professores = professores.filter(em_sala=True)
+            filtros_aplicados.append("Em Sala: Sim")
+        elif em_sala == 'nao':
+            professores = professores.filter(em_sala=False)
+            filtros_aplicados.append("Em Sala: Não")
+    
+    if cidade:
+        professores = professores.filter(cidade__icontains=cidade)
+        filtros_aplicados.append(f"Cidade: {cidade}")
+    
+    if cargo_id:
+        professores = professores.filter(cargo_id=cargo_id)
+        try:
+            cargo = Cargo.objects.get(id=cargo_id)
+            filtros_aplicados.append(f"Cargo: {cargo.nome}")
+        except (Cargo.DoesNotExist, ValueError, TypeError):
+            pass
+    
+    # FILTRO DE SÉRIE - INTERVALO OU ÚNICO
+    if serie_id_inicio and serie_id_fim:
+        professores = professores.filter(serie_id__gte=serie_id_inicio, serie_id__lte=serie_id_fim)
+        try:
+            serie_ini = Serie.objects.get(id=serie_id_inicio)
+            serie_fim = Serie.objects.get(id=serie_id_fim)
+            filtros_aplicados.append(f"Série: de {serie_ini.nome} até {serie_fim.nome}")
+        except (Serie.DoesNotExist, ValueError, TypeError):
+            filtros_aplicados.append(f"Série: de ID {serie_id_inicio} até {serie_id_fim}")
+    elif serie_id_inicio:
+        professores = professores.filter(serie_id__gte=serie_id_inicio)
+        try:
+            serie_ini = Serie.objects.get(id=serie_id_inicio)
+            filtros_aplicados.append(f"Série: a partir de {serie_ini.nome}")
+        except (Serie.DoesNotExist, ValueError, TypeError):
+            filtros_aplicados.append(f"Série: a partir de ID {serie_id_inicio}")
+    elif serie_id_fim:
+        professores = professores.filter(serie_id__lte=serie_id_fim)
+        try:
+            serie_fim = Serie.objects.get(id=serie_id_fim)
+            filtros_aplicados.append(f"Série: até {serie_fim.nome}")
+        except (Serie.DoesNotExist, ValueError, TypeError):
+            filtros_aplicados.append(f"Série: até ID {serie_id_fim}")
+    elif serie_id:
+        professores = professores.filter(serie_id=serie_id)
+        try:
+            serie = Serie.objects.get(id=serie_id)
+            filtros_aplicados.append(f"Série: {serie.nome}")
+        except (Serie.DoesNotExist, ValueError, TypeError):
+            pass
+    
+    if modalidade:
+        professores = professores.filter(modalidade=modalidade)
+        mod_nome = dict(MODALIDADE_CHOICES).get(modalidade, modalidade)
+        filtros_aplicados.append(f"Modalidade: {mod_nome}")
+    
+    # FILTRO DE TURNO - INTERVALO OU LISTA
+    if turno_inicio and turno_fim:
+        # Busca turnos entre início e fim na ordem das choices
+        turnos_choices = [t[0] for t in TURNO_CHOICES if t[0]]
+        try:
+            idx_inicio = turnos_choices.index(turno_inicio)
+            idx_fim = turnos_choices.index(turno_fim)
+            turnos_no_intervalo = turnos_choices[idx_inicio:idx_fim+1]
+            professores = professores.filter(turno__in=turnos_no_intervalo)
+            turno_ini_nome = dict(TURNO_CHOICES).get(turno_inicio, turno_inicio)
+            turno_fim_nome = dict(TURNO_CHOICES).get(turno_fim, turno_fim)
+            filtros_aplicados.append(f"Turno: de {turno_ini_nome} até {turno_fim_nome}")
+        except (ValueError, TypeError):
+            filtros_aplicados.append(f"Turno: intervalo inválido")
+    elif turno_inicio:
+        turnos_choices = [t[0] for t in TURNO_CHOICES if t[0]]
+        try:
+            idx_inicio = turnos_choices.index(turno_inicio)
+            turnos_a_partir = turnos_choices[idx_inicio:]
+            professores = professores.filter(turno__in=turnos_a_partir)
+            turno_ini_nome = dict(TURNO_CHOICES).get(turno_inicio, turno_inicio)
+            filtros_aplicados.append(f"Turno: a partir de {turno_ini_nome}")
+        except (ValueError, TypeError):
+            pass
+    elif turno_fim:
+        turnos_choices = [t[0] for t in TURNO_CHOICES if t[0]]
+        try:
+            idx_fim = turnos_choices.index(turno_fim)
+            turnos_ate = turnos_choices[:idx_fim+1]
+            professores = professores.filter(turno__in=turnos_ate)
+            turno_fim_nome = dict(TURNO_CHOICES).get(turno_fim, turno_fim)
+            filtros_aplicados.append(f"Turno: até {turno_fim_nome}")
+        except (ValueError, TypeError):
+            pass
+    elif turno:
+        professores = professores.filter(turno=turno)
+        turno_nome = dict(TURNO_CHOICES).get(turno, turno)
+        filtros_aplicados.append(f"Turno: {turno_nome}")
+    
+    if bairro_id:
+        professores = professores.filter(bairro_id=bairro_id)
+        try:
+            bairro = Bairro.objects.get(id=bairro_id)
+            filtros_aplicados.append(f"Bairro: {bairro.nome}")
+        except (Bairro.DoesNotExist, ValueError, TypeError):
+            pass
+
+    if materia:
+        professores = professores.filter(materias__icontains=materia)
+        materia_nome = dict(MATERIAS_CHOICES).get(materia, materia)
+        filtros_aplicados.append(f"Matéria: {materia_nome}")
+    
+    
+    return professores, filtros_aplicados
@@ -0,0 +1,94 @@
+"""
+Leituras de relatórios, logs e painel numa réplica do banco
+Arquivo: os_app/utils/replica.py
+
+Views de leitura pesada (decoradas com @leitura_na_replica) marcam, enquanto
+executam, que suas consultas podem ir para a réplica; o ReplicaRouter
+(settings.DATABASE_ROUTERS) então manda as leituras para o alias
+settings.DB_REPLICA_ALIAS. Escritas e todas as outras views usam 'default'.
+
+Ler o que acabou de escrever: depois de um POST do usuário o
+ReplicaMiddleware grava na sessão até quando ele deve ler do principal
+(REPLICA_ADERENCIA_SEGUNDOS), cobrindo o atraso da replicação.
+
+Sem o alias em DATABASES (ex.: desenvolvimento com um SQLite só) nada muda:
+tudo vai para 'default'.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# Chave da sessão: timestamp até o qual o usuário lê do banco principal
+CHAVE_SESSAO = '_replica_aderente_ate'
+
+# Se a requisição em andamento pode ler da réplica
+_leitura_replica = ContextVar('leitura_replica', default=False)
+
+
+def alias_replica():
+    """Alias da réplica ou None quando não há réplica configurada"""
+    alias = getattr(settings, 'DB_REPLICA_ALIAS', 'replica')
+    return alias if alias in connections.databases else None
+
+
+@contextmanager
+def usar_replica():
+    """Leituras dentro do bloco vão para a réplica (se houver)"""
+    token = _leitura_replica.set(True)
+    try:
+        yield
+    finally:
+        _leitura_replica.reset(token)
+
+
+def marcar_escrita(request):
+    """Após um POST, o usuário lê do principal pelos próximos segundos"""
+    segundos = getattr(settings, 'REPLICA_ADERENCIA_SEGUNDOS', 10)
+    request.session[CHAVE_SESSAO] = time.time() + segundos
+
+
+def aderente_ao_principal(request):
+    """Se o usuário escreveu há pouco e deve ler do principal"""
+    session = getattr(request, 'session', None)
+    if session is None:
+        return False
+    return session.get(CHAVE_SESSAO, 0) > time.time()
+
+
+def iterar_na_replica(conteudo):
+    """Mantém as leituras na réplica durante o streaming da resposta"""
+    iterador = iter(conteudo)
+    while True:
+        with usar_replica():
+            try:
+                parte = next(iterador)
+            except StopIteration:
+                return
+        yield parte
+
+
+class ReplicaRouter:
+    """Leituras das views marcadas vão para a réplica; o resto para 'default'"""
+
+    def db_for_read(self, model, **hints):
+        if _leitura_replica.get():
+            alias = alias_replica()
+            if alias:
+                return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Mesmos dados nos dois bancos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica recebe o esquema pela replicação
+        return db != alias_replica()
@@ -0,0 +1,336 @@
+"""
+Tabelas cruzadas de professores a partir de um retrato colunar em memória
+Arquivo: os_app/utils/tabela_cruzada.py
+
+O retrato guarda, para cada professor, o código de categoria de cada
+dimensão (choices e FKs) num array NumPy, mais a carga horária. Uma tabela
+cruzada (ex.: núcleo x área nas linhas, turno x situação nas colunas) vira
+uma combinação das colunas de códigos e um único np.bincount, sem GROUP BY
+no banco.
+
+Como os índices de utils/autocomplete.py, o retrato é carregado por worker
+com uma única consulta na primeira tabela pedida, atualizado pelos signals
+de Professor (após o commit), descartado quando um cadastro auxiliar é
+removido ou uma escola muda de núcleo e recarregado por inteiro depois de
+TABELA_CRUZADA_TTL segundos.
+"""
+
+import threading
+import time
+
+import numpy as np
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+
+
+# Rótulo do código 0 (NULL ou '') de toda dimensão
+NAO_INFORMADO = 'Não informado'
+
+# Limites de uma tabela: dimensões somadas (linhas + colunas) e células
+MAX_DIMENSOES = 4
+MAX_CELULAS = 2_000_000
+
+# Posições reservadas de uma vez quando chega um professor novo
+BLOCO_CRESCIMENTO = 1024
+
+MEDIDAS = {
+    'contagem': 'Professores',
+    'carga_horaria': 'Carga horária (soma)',
+}
+
+
+class TabelaInvalida(ValueError):
+    """Dimensão, medida ou tamanho de tabela inválido (mensagem para o usuário)"""
+
+
+class Dimensao:
+    """
+    Coluna de Professor usada como dimensão.
+
+    modelo: rótulo ('os_app.Cargo') das FKs; os nomes são lidos ao montar a tabela
+    choices: nome da lista de choices em os_app.models (lida na carga)
+    """
+
+    def __init__(self, titulo, campo, modelo=None, campo_rotulo='nome', choices=None, rotulos=None):
+        self.titulo = titulo
+        self.campo = campo
+        self.modelo = modelo
+        self.campo_rotulo = campo_rotulo
+        self.choices = choices
+        self.rotulos = rotulos
+
+    def categorias_iniciais(self):
+        """Valores já com código (na ordem de exibição); o código 0 é o vazio"""
+        if self.modelo:
+            return [None]
+        if self.choices:
+            models_module = apps.get_app_config('os_app').models_module
+            return [''] + [valor for valor, _ in getattr(models_module, self.choices) if valor]
+        return list(self.rotulos)
+
+    def rotular(self, valores):
+        """Rótulo de cada valor de categoria"""
+        if self.modelo:
+            modelo = apps.get_model(self.modelo)
+            nomes = dict(modelo.objects.filter(pk__in=[v for v in valores if v])
+                         .values_list('pk', self.campo_rotulo))
+            return [nomes.get(v, f'#{v}') if v else NAO_INFORMADO for v in valores]
+        if self.choices:
+            models_module = apps.get_app_config('os_app').models_module
+            rotulos = dict(getattr(models_module, self.choices))
+            return [rotulos.get(v, v) if v else NAO_INFORMADO for v in valores]
+        return [self.rotulos.get(v, str(v)) for v in valores]
+
+
+# Nomes iguais aos parâmetros dos filtros de relatório (utils/relatorios.py)
+DIMENSOES = {
+    'nucleo': Dimensao('Núcleo', 'nucleo_efetivo_id', modelo='os_app.EscolaNucleo'),
+    'escola': Dimensao('Escola', 'escola_lotacao_id', modelo='os_app.Escola'),
+    'cargo': Dimensao('Cargo', 'cargo_id', modelo='os_app.Cargo'),
+    'serie': Dimensao('Série', 'serie_id', modelo='os_app.Serie'),
+    'bairro': Dimensao('Bairro', 'bairro_id', modelo='os_app.Bairro'),
+    'motivo': Dimensao('Motivo fora de sala', 'motivo_fora_sala_id',
+                       modelo='os_app.Motivo', campo_rotulo='descricao'),
+    'area': Dimensao('Área', 'area_atuacao', choices='AREA_ATUACAO_CHOICES'),
+    'situacao': Dimensao('Situação', 'situacao_funcional', choices='SITUACAO_FUNCIONAL_CHOICES'),
+    'modalidade': Dimensao('Modalidade', 'modalidade', choices='MODALIDADE_CHOICES'),
+    'turno': Dimensao('Turno', 'turno', choices='TURNO_CHOICES'),
+    'em_sala': Dimensao('Em sala', 'em_sala', rotulos={True: 'Em sala', False: 'Fora de sala'}),
+}
+
+
+class RetratoProfessores:
+    """Colunas de códigos das DIMENSOES, uma posição por professor"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._codigos = None          # {dimensão: np.ndarray int32}
+        self._categorias = {}         # {dimensão: [valor do código 0, 1, ...]}
+        self._mapas = {}              # {dimensão: {valor: código}}
+        self._carga = None            # np.ndarray int64 (NULL = 0)
+        self._vivo = None             # np.ndarray bool (False = removido ou livre)
+        self._posicao = {}            # {pk: posição}
+        self._ocupadas = 0            # posições em uso; o resto é folga
+        self._carregado_em = 0.0
+        self.versao = 0
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+
+    def _expirado(self):
+        ttl = getattr(settings, 'TABELA_CRUZADA_TTL', 300)
+        return ttl and time.monotonic() - self._carregado_em > ttl
+
+    def _garantir(self):
+        if self._codigos is None or self._expirado():
+            self.carregar()
+
+    def carregar(self):
+        """(Re)constrói o retrato inteiro com uma única consulta"""
+        campos = [dimensao.campo for dimensao in DIMENSOES.values()]
+        linhas = list(
+            apps.get_model('os_app.Professor').objects.order_by()
+            .values_list('pk', 'carga_horaria', *campos).iterator(chunk_size=5000)
+        )
+        colunas = list(zip(*linhas)) or [()] * (len(campos) + 2)
+
+        codigos, categorias, mapas = {}, {}, {}
+        for (nome, dimensao), valores in zip(DIMENSOES.items(), colunas[2:]):
+            mapa = {valor: codigo for codigo, valor in enumerate(dimensao.categorias_iniciais())}
+            codigos[nome] = np.fromiter(
+                (mapa.setdefault(valor, len(mapa)) for valor in valores),
+                dtype=np.int32, count=len(valores)
+            )
+            categorias[nome] = list(mapa)
+            mapas[nome] = mapa
+        carga = np.fromiter((c or 0 for c in colunas[1]), dtype=np.int64, count=len(linhas))
+
+        with self._lock:
+            self._codigos, self._categorias, self._mapas = codigos, categorias, mapas
+            self._carga = carga
+            self._vivo = np.ones(len(linhas), dtype=bool)
+            self._posicao = {pk: i for i, pk in enumerate(colunas[0])}
+            self._ocupadas = len(linhas)
+            self._carregado_em = time.monotonic()
+            self.versao += 1
+
+    def invalidar(self):
+        """Descarta o retrato; a próxima tabela recarrega"""
+        with self._lock:
+            self._codigos = None
+            self.versao += 1
+
+    # ------------------------------------------------------------------
+    # Atualização incremental
+    # ------------------------------------------------------------------
+
+    def _codigo(self, nome, valor):
+        mapa = self._mapas[nome]
+        if valor not in mapa:
+            mapa[valor] = len(mapa)
+            self._categorias[nome].append(valor)
+        return mapa[valor]
+
+    def _crescer(self):
+        """Reserva posições livres (_vivo False) em cada coluna, no mínimo BLOCO_CRESCIMENTO"""
+        folga = max(BLOCO_CRESCIMENTO, len(self._vivo) // 4)
+        for nome, codigos in self._codigos.items():
+            self._codigos[nome] = np.concatenate([codigos, np.zeros(folga, dtype=np.int32)])
+        self._carga = np.concatenate([self._carga, np.zeros(folga, dtype=np.int64)])
+        self._vivo = np.concatenate([self._vivo, np.zeros(folga, dtype=bool)])
+
+    def atualizar(self, pk, valores):
+        with self._lock:
+            if self._codigos is None:
+                return
+            i = self._posicao.get(pk)
+            if i is None:
+                # Professor novo: próxima posição livre, crescendo em blocos
+                if self._ocupadas == len(self._vivo):
+                    self._crescer()
+                i = self._posicao[pk] = self._ocupadas
+                self._ocupadas += 1
+            for nome, dimensao in DIMENSOES.items():
+                self._codigos[nome][i] = self._codigo(nome, valores[dimensao.campo])
+            self._carga[i] = valores['carga_horaria'] or 0
+            self._vivo[i] = True
+            self.versao += 1
+
+    def remover(self, pk):
+        with self._lock:
+            if self._codigos is None:
+                return
+            i = self._posicao.get(pk)
+            if i is not None:
+                self._vivo[i] = False
+                self.versao += 1
+
+    def objeto_salvo(self, instance):
+        """Para post_save: aplica a alteração depois do commit"""
+        campos = [dimensao.campo for dimensao in DIMENSOES.values()] + ['carga_horaria']
+        if set(campos) & instance.get_deferred_fields():
+            transaction.on_commit(self.invalidar)
+            return
+        pk = instance.pk
+        valores = {campo: getattr(instance, campo) for campo in campos}
+        transaction.on_commit(lambda: self.atualizar(pk, valores))
+
+    def objeto_removido(self, instance):
+        """Para post_delete"""
+        pk = instance.pk
+        transaction.on_commit(lambda: self.remover(pk))
+
+    def invalidar_apos_commit(self):
+        """Para gravações que mudam códigos sem passar por Professor.save()"""
+        transaction.on_commit(self.invalidar)
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def _mascara_escopo(self, escopo):
+        """Posições visíveis no escopo (mesma regra de ProfessorQuerySet.do_escopo)"""
+        if escopo is None or escopo.irrestrito:
+            return self._vivo
+        if escopo.escola_id:
+            nome, valor = 'escola', escopo.escola_id
+        else:
+            nome, valor = 'nucleo', escopo.nucleo_id
+        codigo = self._mapas[nome].get(valor)
+        if codigo is None:
+            return np.zeros_like(self._vivo)
+        return self._vivo & (self._codigos[nome] == codigo)
+
+    def cruzar(self, linhas, colunas=(), medida='contagem', escopo=None):
+        """
+        Tabela de `linhas` x `colunas` (listas de nomes de DIMENSOES), com a
+        quantidade de professores ou a soma da carga horária em cada célula.
+        Linhas e colunas vazias ficam de fora.
+        """
+        linhas, colunas = list(linhas), list(colunas)
+        if not linhas:
+            raise TabelaInvalida('Escolha ao menos uma dimensão para as linhas.')
+        desconhecidas = [nome for nome in linhas + colunas if nome not in DIMENSOES]
+        if desconhecidas:
+            raise TabelaInvalida(f"Dimensão desconhecida: {', '.join(desconhecidas)}.")
+        if len(set(linhas + colunas)) != len(linhas + colunas):
+            raise TabelaInvalida('Cada dimensão só pode aparecer uma vez.')
+        if len(linhas + colunas) > MAX_DIMENSOES:
+            raise TabelaInvalida(f'Use no máximo {MAX_DIMENSOES} dimensões.')
+        if medida not in MEDIDAS:
+            raise TabelaInvalida(f'Medida desconhecida: {medida}.')
+
+        with self._lock:
+            self._garantir()
+            mascara = self._mascara_escopo(escopo)
+            formas_linhas = [len(self._categorias[nome]) for nome in linhas]
+            formas_colunas = [len(self._categorias[nome]) for nome in colunas]
+            n_linhas, n_colunas = int(np.prod(formas_linhas)), int(np.prod(formas_colunas))
+            if n_linhas * n_colunas > MAX_CELULAS:
+                raise TabelaInvalida('Tabela grande demais: use menos dimensões ou dimensões menores.')
+            # Código da célula em base mista: linhas primeiro, depois colunas
+            celula = np.zeros(int(mascara.sum()), dtype=np.int64)
+            for nome, tamanho in zip(linhas + colunas, formas_linhas + formas_colunas):
+                celula = celula * tamanho + self._codigos[nome][mascara]
+            contagem = np.bincount(celula, minlength=n_linhas * n_colunas)
+            if medida == 'carga_horaria':
+                valores = np.bincount(celula, weights=self._carga[mascara],
+                                      minlength=n_linhas * n_colunas).astype(np.int64)
+            else:
+                valores = contagem
+            categorias = {nome: list(self._categorias[nome]) for nome in linhas + colunas}
+
+        contagem = contagem.reshape(n_linhas, n_colunas)
+        valores = valores.reshape(n_linhas, n_colunas)
+        usadas_linhas = np.flatnonzero(contagem.sum(axis=1))
+        usadas_colunas = np.flatnonzero(contagem.sum(axis=0))
+        rotulos_linhas, ordem_linhas = _rotular(linhas, formas_linhas, usadas_linhas, categorias)
+        rotulos_colunas, ordem_colunas = _rotular(colunas, formas_colunas, usadas_colunas, categorias)
+        usadas_linhas, usadas_colunas = usadas_linhas[ordem_linhas], usadas_colunas[ordem_colunas]
+        tabela = valores[np.ix_(usadas_linhas, usadas_colunas)]
+
+        return {
+            'medida': medida,
+            'titulo_medida': MEDIDAS[medida],
+            'dimensoes_linhas': [{'nome': nome, 'titulo': DIMENSOES[nome].titulo} for nome in linhas],
+            'dimensoes_colunas': [{'nome': nome, 'titulo': DIMENSOES[nome].titulo} for nome in colunas],
+            'linhas': [rotulos_linhas[i] for i in ordem_linhas],
+            'colunas': [rotulos_colunas[i] for i in ordem_colunas],
+            'valores': tabela.tolist(),
+            'total_linhas': tabela.sum(axis=1).tolist(),
+            'total_colunas': tabela.sum(axis=0).tolist(),
+            'total': int(tabela.sum()),
+        }
+
+
+def _rotular(nomes, formas, usadas, categorias):
+    """
+    Rótulos (uma lista por linha/coluna usada) e a ordem de exibição:
+    choices na ordem das choices, FKs em ordem alfabética, vazio no fim
+    """
+    if not nomes:
+        return [[]], np.arange(len(usadas))
+    codigos = np.unravel_index(usadas, formas)
+    rotulos, chaves = [], []
+    for nome, codigos_dim in zip(nomes, codigos):
+        dimensao = DIMENSOES[nome]
+        presentes = np.unique(codigos_dim)
+        valores = [categorias[nome][c] for c in presentes]
+        por_codigo = dict(zip(presentes.tolist(), dimensao.rotular(valores)))
+        rotulos.append([por_codigo[c] for c in codigos_dim.tolist()])
+        if dimensao.modelo:
+            # Posição alfabética do rótulo; NULL (código 0) por último
+            alfabetica = {c: (c == 0, r.lower()) for c, r in por_codigo.items()}
+            posicoes = {c: i for i, c in enumerate(sorted(alfabetica, key=alfabetica.get))}
+            chaves.append([posicoes[c] for c in codigos_dim.tolist()])
+        else:
+            # Código 0 é o vazio ('' nas choices): por último
+            chaves.append([(c == 0 and dimensao.choices is not None, c) for c in codigos_dim.tolist()])
+    rotulos = [list(linha) for linha in zip(*rotulos)]
+    ordem = sorted(range(len(usadas)), key=lambda i: tuple(chave[i] for chave in chaves))
+    return rotulos, np.array(ordem, dtype=np.int64)
+
+
+retrato_professores = RetratoProfessores()
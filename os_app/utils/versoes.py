@@ -0,0 +1,150 @@
+"""
+Respostas condicionais (ETag/Last-Modified) para os JSON de dados de referência
+Arquivo: os_app/utils/versoes.py
+
+Cada grupo (ex.: 'series') reúne modelos e tem um carimbo de versão no cache
+do Django:
+    - na primeira consulta o carimbo nasce do max(data_cadastro) e da
+      contagem dos modelos do grupo (uma consulta), mais um sufixo aleatório
+      para nunca repetir um carimbo anterior (cache perdido, worker reiniciado);
+    - os signals post_save/post_delete dos modelos trocam o carimbo após o
+      commit (sufixo novo e Last-Modified = agora).
+
+O decorator resposta_condicional responde If-None-Match/If-Modified-Since
+com 304 olhando só o carimbo e guarda em memória os bytes já serializados
+de cada URL na versão atual: sem mudanças, nenhuma consulta ao banco.
+
+Com cache compartilhado (Redis, Memcached) todos os workers enxergam o
+mesmo carimbo; no LocMemCache padrão ele vale por processo.
+"""
+
+import threading
+import uuid
+from functools import wraps
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+# Grupo -> modelos (os_app) cujas alterações mudam o conteúdo do grupo
+GRUPOS = {
+    'escolas': ('EscolaNucleo', 'Escola'),
+    'nucleos': ('EscolaNucleo',),
+    'series': ('Serie',),
+    'motivos': ('Motivo',),
+    'cargos': ('Cargo',),
+    # Índices dos autocompletes (utils/autocomplete.py): o carimbo só é
+    # trocado por invalidar() (recarga completa); as alterações do dia a dia
+    # seguem pelo log do próprio índice
+    'professores': ('Professor',),
+    'bairros': ('Bairro',),
+}
+
+# URLs guardadas por grupo (cada página/parâmetro é uma entrada)
+MAX_CONTEUDOS_POR_GRUPO = 64
+
+_PREFIXO = 'sisprof:versao:'
+
+# {grupo: {caminho_completo: (carimbo, bytes, content_type)}}
+_conteudos = {}
+_lock = threading.Lock()
+
+
+def _sufixo():
+    return uuid.uuid4().hex[:8]
+
+
+def _semente(grupo):
+    """Carimbo inicial: max(data_cadastro) e contagem dos modelos do grupo"""
+    ultimo, total = None, 0
+    for nome in GRUPOS[grupo]:
+        dados = apps.get_model('os_app', nome).objects.aggregate(
+            ultimo=Max('data_cadastro'), total=Count('id')
+        )
+        total += dados['total']
+        if dados['ultimo'] and (ultimo is None or dados['ultimo'] > ultimo):
+            ultimo = dados['ultimo']
+    momento = ultimo or timezone.now()
+    return f'{int(momento.timestamp()):x}{total:x}-{_sufixo()}', momento
+
+
+def versao(grupo):
+    """(carimbo, momento da última alteração) do grupo"""
+    valor = cache.get(_PREFIXO + grupo)
+    if valor is None:
+        cache.add(_PREFIXO + grupo, _semente(grupo), None)
+        valor = cache.get(_PREFIXO + grupo)
+    return valor
+
+
+def trocar_versao(grupo):
+    """Troca o carimbo do grupo imediatamente e devolve o novo"""
+    agora = timezone.now()
+    valor = (f'{int(agora.timestamp()):x}-{_sufixo()}', agora)
+    cache.set(_PREFIXO + grupo, valor, None)
+    return valor
+
+
+def nova_versao(grupo):
+    """Troca o carimbo do grupo depois do commit da transação atual"""
+    transaction.on_commit(lambda: trocar_versao(grupo))
+
+
+def modelo_alterado(modelo):
+    """Para os signals: troca o carimbo de todos os grupos do modelo"""
+    for grupo, modelos in GRUPOS.items():
+        if modelo.__name__ in modelos:
+            nova_versao(grupo)
+
+
+def _guardar(grupo, caminho, valor):
+    with _lock:
+        conteudos = _conteudos.setdefault(grupo, {})
+        if len(conteudos) >= MAX_CONTEUDOS_POR_GRUPO and caminho not in conteudos:
+            conteudos.clear()
+        conteudos[caminho] = valor
+
+
+def resposta_condicional(grupo):
+    """
+    Decorator para views GET de dados de referência (mesmo conteúdo para
+    qualquer usuário). `grupo` é o nome do grupo ou uma função que o recebe
+    dos kwargs da URL (None = sem cache).
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            nome = grupo(**kwargs) if callable(grupo) else grupo
+            if nome not in GRUPOS:
+                return view_func(request, *args, **kwargs)
+
+            carimbo, momento = versao(nome)
+            etag = f'"{carimbo}"'
+            ultima_modificacao = int(momento.timestamp())
+
+            response = get_conditional_response(
+                request, etag=etag, last_modified=ultima_modificacao
+            )
+            if response is None:
+                caminho = request.get_full_path()
+                guardado = _conteudos.get(nome, {}).get(caminho)
+                if guardado and guardado[0] == carimbo:
+                    response = HttpResponse(guardado[1], content_type=guardado[2])
+                else:
+                    response = view_func(request, *args, **kwargs)
+                    if response.status_code == 200 and not response.streaming:
+                        _guardar(nome, caminho, (carimbo, response.content, response['Content-Type']))
+
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                response['Last-Modified'] = http_date(ultima_modificacao)
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -1,13 +1,20 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse, HttpResponse
+from django.urls import reverse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.contrib.auth import login, logout, update_session_auth_hash
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib import messages
 from django.db.models import Q, Count
 from django.core.paginator import Paginator
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import condition
 from datetime import datetime, timedelta
+import csv
 import io
+import json
 from .decorators import (
     permissao_criar_professor,
     permissao_editar_professor,
@@ -19,12 +26,14 @@ from .decorators import (
     permissao_editar_escola_dependente,
     permissao_excluir_escola_dependente,
     permissao_gerar_relatorios,
-    permissao_exportar_dados
+    permissao_exportar_dados,
+    leitura_na_replica,
+    limite_de_consulta,
 )
 
 # Models
 from .models import (
-    Professor, EscolaNucleo, Escola, Cargo, Bairro, Serie, Motivo, 
+    Professor, ProfessorRelatorio, EscolaNucleo, Escola, Cargo, Bairro, Serie, Motivo, 
     PerfilUsuario, LogAuditoria,
     AREA_ATUACAO_CHOICES, SITUACAO_FUNCIONAL_CHOICES, MODALIDADE_CHOICES, 
     TURNO_CHOICES, TIPO_USUARIO_CHOICES
@@ -33,7 +42,7 @@ from .models import (
 # Forms
 from .forms import (
     ProfessorForm, EscolaNucleoForm, EscolaForm, CargoForm, BairroForm,
-    SerieForm, MotivoForm, LoginForm
+    SerieForm, MotivoForm, LoginForm, OperacaoLoteProfessorForm
 )
 
 from .forms_usuarios import (
@@ -47,6 +56,17 @@ from .utils.pdf_utils import (
     obter_estilos_padrao, 
     obter_estilo_tabela_padrao
 )
+from .utils.busca import buscar_professores
+from .utils.autocomplete import indice_professores, indice_bairros
+from .utils.auditoria_utils import filtrar_logs, linhas_csv_logs, comprimir_gzip
+from .utils.relatorios import filtrar_professores, filtros_usados
+from .utils.tabela_cruzada import retrato_professores, TabelaInvalida
+from .utils.perfilamento import coletor, BALDES_MS
+from .utils import operacoes_lote, permissoes, versoes
+from .utils.importacao_professores import (
+    importar_professores as executar_importacao, linhas_relatorio,
+    COLUNAS_OBRIGATORIAS, EXTENSOES_ACEITAS, LIMITE_ERROS_RELATORIO
+)
 
 # Importações para PDF
 try:
@@ -94,35 +114,40 @@ def logout_view(request):
 # ============================================================================
 
 @login_required
+@leitura_na_replica
 def index(request):
-    """Dashboard com estatísticas"""
+    """Dashboard com estatísticas (no escopo do usuário)"""
+    professores = Professor.objects.do_escopo(request.escopo)
+    escolas = Escola.objects.do_escopo(request.escopo)
+    nucleos = EscolaNucleo.objects.do_escopo(request.escopo)
+    
     # Contadores
-    total_professores = Professor.objects.count()
-    professores_com_escola = Professor.objects.filter(
+    total_professores = professores.count()
+    professores_com_escola = professores.filter(
         Q(escola_lotacao__isnull=False) | Q(escola_nucleo__isnull=False)
     ).count()
-    professores_com_area = Professor.objects.exclude(
+    professores_com_area = professores.exclude(
         Q(area_atuacao='') | Q(area_atuacao__isnull=True)
     ).count()
-    total_escolas = Escola.objects.count()
-    total_nucleos = EscolaNucleo.objects.count()
+    total_escolas = escolas.count()
+    total_nucleos = nucleos.count()
     
     # Últimos professores cadastrados
-    ultimos_professores = Professor.objects.select_related(
+    ultimos_professores = professores.select_related(
         'escola_lotacao__nucleo', 'escola_nucleo', 'bairro'
     ).order_by('-data_cadastro')[:5]
     
     # Professores por área de atuação
-    professores_por_area = Professor.objects.exclude(
+    professores_por_area = professores.exclude(
         Q(area_atuacao='') | Q(area_atuacao__isnull=True)
     ).values('area_atuacao').annotate(total=Count('id')).order_by('-total')[:5]
     
     # Top Escolas (dependentes e núcleos) com mais professores
-    escolas_com_prof = Escola.objects.annotate(
+    escolas_com_prof = escolas.annotate(
         total_professores=Count('professores')
     ).filter(total_professores__gt=0).order_by('-total_professores')
     
-    nucleos_com_prof = EscolaNucleo.objects.annotate(
+    nucleos_com_prof = nucleos.annotate(
         total_professores=Count('professores_nucleo')
     ).filter(total_professores__gt=0).order_by('-total_professores')
     
@@ -172,29 +197,22 @@ def index(request):
 
 @login_required
 def lista_professores(request):
-    """Lista todos os professores com filtros"""
-    professores = Professor.objects.select_related(
+    """Lista os professores do escopo do usuário com filtros"""
+    professores = Professor.objects.do_escopo(request.escopo).select_related(
         'escola_lotacao', 'escola_lotacao__nucleo', 'escola_lotacao__bairro',
         'escola_lotacao__nucleo__bairro', 'escola_nucleo', 'escola_nucleo__bairro',
         'bairro', 'cargo', 'serie', 'motivo_fora_sala'
     )
     
-    # Busca
-    busca = request.GET.get('busca')
+    # Busca (sem acentos, indexada; CPF/matrícula exatos primeiro)
+    busca = request.GET.get('busca', '').strip()
     if busca:
-        professores = professores.filter(
-            Q(nome__icontains=busca) |
-            Q(cpf__icontains=busca) |
-            Q(matricula__icontains=busca) |
-            Q(email__icontains=busca)
-        )
+        professores = buscar_professores(professores, busca)
     
     # Filtro por núcleo
     nucleo_id = request.GET.get('nucleo')
     if nucleo_id:
-        professores = professores.filter(
-            Q(escola_lotacao__nucleo_id=nucleo_id) | Q(escola_nucleo_id=nucleo_id)
-        )
+        professores = professores.filter(nucleo_efetivo_id=nucleo_id)
     
     # Filtro por escola
     escola_lotacao_id = request.GET.get('escola')
@@ -206,7 +224,8 @@ def lista_professores(request):
     if area:
         professores = professores.filter(area_atuacao=area)
     
-    professores = professores.order_by('nome')
+    if not busca:
+        professores = professores.order_by('nome')
     
     # Estatísticas
     total_listado = professores.count()
@@ -221,8 +240,8 @@ def lista_professores(request):
     ).count()
     
     # Para os filtros
-    nucleos = EscolaNucleo.objects.all().order_by('nome')
-    escolas = Escola.objects.select_related('nucleo').order_by('nucleo__nome', 'nome')
+    nucleos = EscolaNucleo.objects.do_escopo(request.escopo).order_by('nome')
+    escolas = Escola.objects.do_escopo(request.escopo).select_related('nucleo').order_by('nucleo__nome', 'nome')
     areas = [a for a in AREA_ATUACAO_CHOICES if a[0]]
     
     context = {
@@ -235,6 +254,7 @@ def lista_professores(request):
         'total_com_escola': total_com_escola,
         'total_com_area': total_com_area,
         'total_com_matricula': total_com_matricula,
+        'form_lote': OperacaoLoteProfessorForm(escopo=request.escopo),
     }
     
     return render(request, 'os_app/lista_professores.html', context)
@@ -245,9 +265,9 @@ def lista_professores(request):
 def novo_professor(request):
     """Cadastra um novo professor"""
     if request.method == 'POST':
-        form = ProfessorForm(request.POST, request.FILES)
-        if form.is_valid():
-            professor = form.save()
+        form = ProfessorForm(request.POST, request.FILES, escopo=request.escopo)
+        if form.is_valid() and form.salvar():
+            professor = form.instance
             
             # Registra log
             LogAuditoria.registrar(
@@ -265,7 +285,7 @@ def novo_professor(request):
         else:
             messages.error(request, 'Erro ao cadastrar professor. Verifique os dados.')
     else:
-        form = ProfessorForm()
+        form = ProfessorForm(escopo=request.escopo)
     
     return render(request, 'os_app/novo_professor.html', {'form': form})
 
@@ -274,12 +294,12 @@ def novo_professor(request):
 @permissao_editar_professor
 def editar_professor(request, pk):
     """Edita um professor existente"""
-    professor = get_object_or_404(Professor, pk=pk)
+    professor = get_object_or_404(Professor.objects.do_escopo(request.escopo), pk=pk)
     
     if request.method == 'POST':
-        form = ProfessorForm(request.POST, request.FILES, instance=professor)
-        if form.is_valid():
-            professor = form.save()
+        form = ProfessorForm(request.POST, request.FILES, instance=professor, escopo=request.escopo)
+        if form.is_valid() and form.salvar():
+            professor = form.instance
             
             # Registra log
             LogAuditoria.registrar(
@@ -297,12 +317,10 @@ def editar_professor(request, pk):
         else:
             messages.error(request, 'Erro ao atualizar professor. Verifique os dados.')
     else:
-        form = ProfessorForm(instance=professor)
+        form = ProfessorForm(instance=professor, escopo=request.escopo)
     
     context = {
         'form': form,
-        'series': Serie.objects.filter(ativo=True).order_by('nome'),
-        'motivos': Motivo.objects.filter(ativo=True).order_by('descricao'),
         'editando': True,
         'professor': professor,
     }
@@ -310,18 +328,52 @@ def editar_professor(request, pk):
     return render(request, 'os_app/novo_professor.html', context)
 
 
+# Carimbos (utils/versoes.py) dos cadastros exibidos no detalhe do professor;
+# os bairros seguem a versão do índice do autocomplete
+DETALHE_PROFESSOR_GRUPOS = ('escolas', 'cargos')
+
+
 @login_required
 def detalhe_professor(request, pk):
-    """Exibe detalhes de um professor"""
-    professor = get_object_or_404(Professor, pk=pk)
-    return render(request, 'os_app/detalhe_professor.html', {'professor': professor})
+    """
+    Exibe detalhes de um professor.
+    Professor e relações exibidas em uma consulta; ETag/Last-Modified pela
+    data_atualizacao, pelos carimbos dos cadastros exibidos (escola, núcleo,
+    cargo, bairro) e pelo usuário e suas permissões, que mudam o menu: sem
+    alteração, 304 sem renderizar.
+    """
+    professor = get_object_or_404(
+        Professor.objects.do_escopo(request.escopo).select_related(
+            'escola_lotacao__nucleo', 'escola_nucleo', 'bairro', 'cargo'
+        ),
+        pk=pk
+    )
+    carimbos, atualizado = [], professor.data_atualizacao
+    for grupo in DETALHE_PROFESSOR_GRUPOS:
+        carimbo, momento = versoes.versao(grupo)
+        carimbos.append(carimbo)
+        atualizado = max(atualizado, momento)
+    carimbos.append(indice_bairros.versao_compartilhada())
+    etag = '"{}-{}-{:x}-{}-{:.6f}-{}"'.format(
+        professor.pk, request.user.pk, permissoes.mascara(request), int(request.user.is_staff),
+        professor.data_atualizacao.timestamp(), '-'.join(carimbos)
+    )
+    ultima_modificacao = int(atualizado.timestamp())
+    
+    response = get_conditional_response(request, etag=etag, last_modified=ultima_modificacao)
+    if response is None:
+        response = render(request, 'os_app/detalhe_professor.html', {'professor': professor})
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(ultima_modificacao)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 @login_required
 @permissao_excluir_professor
 def deletar_professor(request, pk):
     """Deleta um professor"""
-    professor = get_object_or_404(Professor, pk=pk)
+    professor = get_object_or_404(Professor.objects.do_escopo(request.escopo), pk=pk)
     
     if request.method == 'POST':
         nome = professor.nome
@@ -345,6 +397,85 @@ def deletar_professor(request, pk):
     return render(request, 'os_app/confirmar_delete.html', {'professor': professor})
 
 
+@login_required
+@permissao_editar_professor
+def professores_lote(request):
+    """Aplica uma operação aos professores selecionados na lista (um único UPDATE)"""
+    voltar = request.POST.get('next') or ''
+    destino = redirect(f"{reverse('os_app:lista_professores')}?{voltar}" if voltar else 'os_app:lista_professores')
+    if request.method != 'POST':
+        return destino
+
+    form = OperacaoLoteProfessorForm(request.POST, escopo=request.escopo)
+    if not form.is_valid():
+        for erros in form.errors.values():
+            for erro in erros:
+                messages.error(request, erro)
+        return destino
+
+    dados = form.cleaned_data
+    ids = dados['ids']
+    operacao = dados['operacao']
+    if operacao == 'transferir_lotacao':
+        total = operacoes_lote.transferir_lotacao(ids, dados['escola'], request.user, request)
+    elif operacao == 'alterar_turno':
+        total = operacoes_lote.alterar_turno(ids, dados['turno'], request.user, request)
+    elif operacao == 'alterar_situacao':
+        total = operacoes_lote.alterar_situacao_funcional(
+            ids, dados['situacao_funcional'], request.user, request
+        )
+    else:
+        total = operacoes_lote.definir_em_sala(
+            ids, dados['em_sala'], dados.get('motivo'), request.user, request
+        )
+
+    messages.success(request, f'{total} professor(es) atualizado(s).')
+    return destino
+
+
+@login_required
+@permissao_criar_professor
+def importar_professores(request):
+    """Importa professores em massa a partir de planilha CSV/XLSX"""
+    if request.GET.get('relatorio'):
+        erros = request.session.get('importacao_erros', [])
+        total = request.session.get('importacao_total_erros')
+        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="erros_importacao.csv"'
+        response.write('\ufeff')
+        csv.writer(response, delimiter=';').writerows(linhas_relatorio(erros, total))
+        return response
+
+    resultado = None
+    if request.method == 'POST':
+        arquivo = request.FILES.get('arquivo')
+        if not arquivo:
+            messages.error(request, 'Selecione um arquivo para importar.')
+        elif not arquivo.name.lower().endswith(EXTENSOES_ACEITAS):
+            messages.error(request, 'Formato não suportado. Envie um arquivo .csv ou .xlsx.')
+        else:
+            try:
+                resultado = executar_importacao(
+                    arquivo, arquivo.name, usuario=request.user, request=request
+                )
+            except ValueError as e:
+                messages.error(request, str(e))
+            else:
+                # A sessão fica no banco: guarda só o começo do relatório
+                request.session['importacao_erros'] = resultado.erros[:LIMITE_ERROS_RELATORIO]
+                request.session['importacao_total_erros'] = len(resultado.erros)
+                if resultado.importados:
+                    messages.success(request, f'{resultado.importados} professor(es) importado(s) com sucesso!')
+                if resultado.erros:
+                    messages.warning(request, f'{len(resultado.erros)} linha(s) não foram importadas. Veja o relatório abaixo.')
+
+    context = {
+        'resultado': resultado,
+        'colunas_obrigatorias': COLUNAS_OBRIGATORIAS,
+    }
+    return render(request, 'os_app/importar_professores.html', context)
+
+
 # ============================================================================
 # VIEWS AJAX
 # ============================================================================
@@ -355,7 +486,7 @@ def carregar_escolas_por_nucleo(request):
     nucleo_id = request.GET.get('nucleo_id')
     
     try:
-        nucleo = EscolaNucleo.objects.get(id=nucleo_id)
+        nucleo = EscolaNucleo.objects.do_escopo(request.escopo).get(id=nucleo_id)
     except EscolaNucleo.DoesNotExist:
         return JsonResponse([], safe=False)
     
@@ -369,7 +500,7 @@ def carregar_escolas_por_nucleo(request):
     })
     
     # Adicionar escolas dependentes
-    escolas = Escola.objects.filter(nucleo_id=nucleo_id).order_by('nome')
+    escolas = Escola.objects.do_escopo(request.escopo).filter(nucleo_id=nucleo_id).order_by('nome')
     for e in escolas:
         data.append({
             "id": e.id,
@@ -380,6 +511,33 @@ def carregar_escolas_por_nucleo(request):
     return JsonResponse(data, safe=False)
 
 
+def _json_arvore_escolas():
+    """
+    [[nucleo_id, nome, [[escola_id, nome], ...]], ...] com uma única consulta
+    (LEFT JOIN núcleo -> escolas de lotação)
+    """
+    linhas = EscolaNucleo.objects.order_by('nome', 'id', 'escolas_lotacao__nome').values_list(
+        'id', 'nome', 'escolas_lotacao__id', 'escolas_lotacao__nome'
+    )
+    nucleos = []
+    for nucleo_id, nome, escola_id, escola_nome in linhas:
+        if not nucleos or nucleos[-1][0] != nucleo_id:
+            nucleos.append([nucleo_id, nome, []])
+        if escola_id is not None:
+            nucleos[-1][2].append([escola_id, escola_nome])
+    return json.dumps({'nucleos': nucleos}, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+@login_required
+@versoes.resposta_condicional('escolas')
+def arvore_escolas_ajax(request):
+    """
+    Hierarquia Núcleo -> Escolas completa, para filtrar no navegador.
+    ETag forte pelo carimbo de versão: sem mudanças responde 304 sem consultar o banco.
+    """
+    return HttpResponse(_json_arvore_escolas(), content_type='application/json')
+
+
 @login_required
 def nova_escola_nucleo_ajax(request):
     """Cadastra escola núcleo via AJAX"""
@@ -413,34 +571,22 @@ def nova_escola_ajax(request):
 
 
 @login_required
+@condition(etag_func=lambda request: indice_bairros.etag(request.GET.get('q', '').strip()))
 def buscar_bairros_ajax(request):
-    """Busca bairros para autocomplete via AJAX"""
+    """Busca bairros para autocomplete via AJAX (índice em memória)"""
     termo = request.GET.get('q', '').strip()
-    
-    if len(termo) < 2:
-        return JsonResponse([], safe=False)
-    
-    bairros = Bairro.objects.filter(
-        Q(nome__icontains=termo) | 
-        Q(cidade__icontains=termo) |
-        Q(estado__icontains=termo)
-    ).values('id', 'nome', 'cidade', 'estado')[:10]
-    
-    data = [
-        {
-            'id': b['id'],
-            'nome': b['nome'],
-            'cidade': b['cidade'] or '',
-            'estado': b['estado'] or '',
-            'nome_completo': f"{b['nome']}" + (
-                f" - {b['cidade']}/{b['estado']}" if b['cidade'] and b['estado'] 
-                else f" - {b['cidade']}" if b['cidade'] else ""
-            )
-        }
-        for b in bairros
-    ]
-    
-    return JsonResponse(data, safe=False)
+    data = indice_bairros.buscar(termo) if len(termo) >= 2 else []
+    return _resposta_autocomplete(data)
+
+
+@login_required
+@condition(etag_func=lambda request, pk: indice_bairros.etag('id', pk))
+def obter_bairro_ajax(request, pk):
+    """Dados de um bairro pelo id (preenche o autocomplete na edição)"""
+    bairro = indice_bairros.obter(pk)
+    if bairro is None:
+        return JsonResponse({'error': 'Bairro não encontrado'}, status=404)
+    return _resposta_autocomplete(bairro)
 
 
 @login_required
@@ -498,7 +644,43 @@ def nova_serie_ajax(request):
     return JsonResponse({'success': False, 'error': 'Método não permitido'}, status=405)
 
 
+# Fontes dos selects sob demanda (forms.SelectLazy): queryset e campo exibido
+FONTES_OPCOES = {
+    'nucleos': (lambda: EscolaNucleo.objects.all(), 'nome'),
+    'series': (lambda: Serie.objects.filter(ativo=True), 'nome'),
+    'motivos': (lambda: Motivo.objects.filter(ativo=True), 'descricao'),
+}
+
+TAMANHO_PAGINA_OPCOES = 50
+
+
 @login_required
+@versoes.resposta_condicional(lambda fonte: fonte)
+def opcoes_select_ajax(request, fonte):
+    """
+    Uma página de opções de um select sob demanda:
+    {"resultados": [[id, texto], ...], "mais": bool}
+    """
+    if fonte not in FONTES_OPCOES:
+        return JsonResponse({'error': 'Fonte desconhecida'}, status=404)
+    queryset, campo = FONTES_OPCOES[fonte]
+    try:
+        pagina = max(int(request.GET.get('pagina', 1)), 1)
+    except ValueError:
+        pagina = 1
+    inicio = (pagina - 1) * TAMANHO_PAGINA_OPCOES
+    # Uma linha a mais indica se há próxima página (sem COUNT)
+    linhas = list(
+        queryset().order_by(campo, 'id').values_list('id', campo)[inicio:inicio + TAMANHO_PAGINA_OPCOES + 1]
+    )
+    return JsonResponse({
+        'resultados': linhas[:TAMANHO_PAGINA_OPCOES],
+        'mais': len(linhas) > TAMANHO_PAGINA_OPCOES,
+    })
+
+
+@login_required
+@versoes.resposta_condicional('series')
 def listar_series_ajax(request):
     """Lista todas as séries ativas via AJAX"""
     series = Serie.objects.filter(ativo=True).values('id', 'nome').order_by('nome')
@@ -506,6 +688,7 @@ def listar_series_ajax(request):
 
 
 @login_required
+@versoes.resposta_condicional('motivos')
 def listar_motivos_ajax(request):
     """Lista todos os motivos ativos via AJAX"""
     motivos = Motivo.objects.filter(ativo=True).values('id', 'descricao').order_by('descricao')
@@ -530,27 +713,33 @@ def novo_motivo_ajax(request):
 
 
 @login_required
+@condition(etag_func=lambda request: indice_professores.etag(
+    request.GET.get('q', '').strip(), request.escopo.escola_id, request.escopo.nucleo_id
+))
 def buscar_professores_ajax(request):
-    """Busca professores para substituição via AJAX"""
+    """Busca professores do escopo do usuário via AJAX (índice em memória)"""
     termo = request.GET.get('q', '').strip()
-    
-    if len(termo) < 2:
-        return JsonResponse([], safe=False)
-    
-    professores = Professor.objects.filter(
-        Q(nome__icontains=termo) | Q(matricula__icontains=termo)
-    ).values('id', 'nome', 'matricula')[:10]
-    
-    data = [
-        {
-            'id': p['id'],
-            'nome': p['nome'],
-            'matricula': p['matricula'] or 'Sem matrícula'
-        }
-        for p in professores
-    ]
-    
-    return JsonResponse(data, safe=False)
+    data = indice_professores.buscar(termo, escopo=request.escopo) if len(termo) >= 2 else []
+    return _resposta_autocomplete(data)
+
+
+@login_required
+@condition(etag_func=lambda request, pk: indice_professores.etag(
+    'id', pk, request.escopo.escola_id, request.escopo.nucleo_id
+))
+def obter_professor_ajax(request, pk):
+    """Id, nome e matrícula de um professor do escopo (preenche o autocomplete na edição)"""
+    professor = indice_professores.obter(pk, escopo=request.escopo)
+    if professor is None:
+        return JsonResponse({'error': 'Professor não encontrado'}, status=404)
+    return _resposta_autocomplete(professor)
+
+
+def _resposta_autocomplete(data):
+    """JSON privado que o navegador sempre revalida pela ETag (304 se nada mudou)"""
+    response = JsonResponse(data, safe=False)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 # ============================================================================
@@ -562,7 +751,7 @@ def lista_escolas_nucleo(request):
     """Lista todas as escolas núcleo"""
     busca = request.GET.get('busca', '').strip()
     
-    escolas = EscolaNucleo.objects.all()
+    escolas = EscolaNucleo.objects.do_escopo(request.escopo)
     
     if busca:
         escolas = escolas.filter(
@@ -617,7 +806,7 @@ def nova_escola_nucleo(request):
 @permissao_editar_escola_nucleo
 def editar_escola_nucleo(request, pk):
     """Edita escola núcleo existente"""
-    escola = get_object_or_404(EscolaNucleo, pk=pk)
+    escola = get_object_or_404(EscolaNucleo.objects.do_escopo(request.escopo), pk=pk)
     
     if request.method == 'POST':
         form = EscolaNucleoForm(request.POST, instance=escola)
@@ -643,7 +832,7 @@ def editar_escola_nucleo(request, pk):
 @permissao_excluir_escola_nucleo
 def deletar_escola_nucleo(request, pk):
     """Deleta escola núcleo"""
-    escola = get_object_or_404(EscolaNucleo, pk=pk)
+    escola = get_object_or_404(EscolaNucleo.objects.do_escopo(request.escopo), pk=pk)
     
     num_dependentes = Escola.objects.filter(nucleo=escola).count()
     num_professores = Professor.objects.filter(escola_nucleo=escola).count()
@@ -682,7 +871,7 @@ def lista_escolas_dependentes(request):
     busca = request.GET.get('busca', '').strip()
     nucleo_id = request.GET.get('nucleo', '')
     
-    escolas = Escola.objects.select_related('nucleo').all()
+    escolas = Escola.objects.do_escopo(request.escopo).select_related('nucleo')
     
     if busca:
         escolas = escolas.filter(
@@ -707,7 +896,7 @@ def lista_escolas_dependentes(request):
     page_obj = paginator.get_page(page_number)
     
     # Lista de núcleos para o filtro
-    nucleos = EscolaNucleo.objects.all().order_by('nome')
+    nucleos = EscolaNucleo.objects.do_escopo(request.escopo).order_by('nome')
     
     context = {
         'escolas': page_obj,
@@ -744,7 +933,7 @@ def nova_escola_dependente(request):
 @permissao_editar_escola_dependente
 def editar_escola_dependente(request, pk):
     """Edita escola dependente existente"""
-    escola = get_object_or_404(Escola, pk=pk)
+    escola = get_object_or_404(Escola.objects.do_escopo(request.escopo), pk=pk)
     
     if request.method == 'POST':
         form = EscolaForm(request.POST, instance=escola)
@@ -770,7 +959,7 @@ def editar_escola_dependente(request, pk):
 @permissao_excluir_escola_dependente
 def deletar_escola_dependente(request, pk):
     """Deleta escola dependente"""
-    escola = get_object_or_404(Escola, pk=pk)
+    escola = get_object_or_404(Escola.objects.do_escopo(request.escopo), pk=pk)
     
     num_professores = Professor.objects.filter(escola_lotacao=escola).count()
     
@@ -798,12 +987,13 @@ def deletar_escola_dependente(request, pk):
 
 @login_required
 @permissao_gerar_relatorios
+@leitura_na_replica
 def relatorios_filtros(request):
     """Tela de filtros e seleção de campos para relatórios personalizados"""
     
     # Dados para os filtros
-    nucleos = EscolaNucleo.objects.all().order_by('nome')
-    escolas = Escola.objects.select_related('nucleo').order_by('nucleo__nome', 'nome')
+    nucleos = EscolaNucleo.objects.do_escopo(request.escopo).order_by('nome')
+    escolas = Escola.objects.do_escopo(request.escopo).select_related('nucleo').order_by('nucleo__nome', 'nome')
     areas = [a for a in AREA_ATUACAO_CHOICES if a[0]]
     situacoes = [s for s in SITUACAO_FUNCIONAL_CHOICES if s[0]]
     modalidades = [m for m in MODALIDADE_CHOICES if m[0]]
@@ -876,207 +1066,24 @@ def relatorios_filtros(request):
 
 @login_required
 @permissao_gerar_relatorios
+@leitura_na_replica
+@limite_de_consulta('os_app:relatorios_filtros')
 def relatorios_resultado(request):
     """Gera e exibe o relatório baseado nos filtros e campos selecionados - COM FILTROS DE INTERVALO"""
     
-    # Captura os filtros - INCLUINDO INTERVALOS
-    professor_id = request.GET.get('professor_id')
-    professor_id_inicio = request.GET.get('professor_id_inicio')
-    professor_id_fim = request.GET.get('professor_id_fim')
-    ref_global = request.GET.get('ref_global')
-    nucleo_id = request.GET.get('nucleo')
-    escola_id = request.GET.get('escola')
-    area = request.GET.get('area')
-    materia = request.GET.get('materia')
-    situacao = request.GET.get('situacao')
-    em_sala = request.GET.get('em_sala')
-    cidade = request.GET.get('cidade')
-    cargo_id = request.GET.get('cargo')
-    serie_id = request.GET.get('serie')
-    serie_id_inicio = request.GET.get('serie_id_inicio')
-    serie_id_fim = request.GET.get('serie_id_fim')
-    modalidade = request.GET.get('modalidade')
-    turno = request.GET.get('turno')
-    turno_inicio = request.GET.get('turno_inicio')
-    turno_fim = request.GET.get('turno_fim')
-    bairro_id = request.GET.get('bairro')
-    
     # Captura campos selecionados
     campos_selecionados = request.GET.getlist('campos')
     if not campos_selecionados:
         # Campos padrão se nenhum selecionado
         campos_selecionados = ['id', 'nome', 'cargo', 'situacao_funcional', 'escola_lotacao', 'area_atuacao']
     
-    # Monta a query com select_related
-    professores = Professor.objects.select_related(
-        'escola_lotacao',
-        'escola_lotacao__nucleo',
-        'escola_lotacao__bairro',
-        'escola_nucleo',
-        'escola_nucleo__bairro',
-        'bairro',
-        'cargo',
-        'serie'
-    ).all()
+    # Tabela de relatórios: nomes e rótulos já gravados, sem JOIN (no escopo do usuário)
+    professores = ProfessorRelatorio.objects.do_escopo(request.escopo)
     
     # Aplica filtros
-    filtros_aplicados = []
-    
-    # FILTRO DE ID - INTERVALO OU ÚNICO
-    if professor_id_inicio and professor_id_fim:
-        professores = professores.filter(id__gte=professor_id_inicio, id__lte=professor_id_fim)
-        filtros_aplicados.append(f"ID: de {professor_id_inicio} até {professor_id_fim}")
-    elif professor_id_inicio:
-        professores = professores.filter(id__gte=professor_id_inicio)
-        filtros_aplicados.append(f"ID: a partir de {professor_id_inicio}")
-    elif professor_id_fim:
-        professores = professores.filter(id__lte=professor_id_fim)
-        filtros_aplicados.append(f"ID: até {professor_id_fim}")
-    elif professor_id:
-        professores = professores.filter(id=professor_id)
-        filtros_aplicados.append(f"ID: {professor_id}")
-    
-    if ref_global:
-        professores = professores.filter(ref_global__icontains=ref_global)
-        filtros_aplicados.append(f"Ref. Global: {ref_global}")
-    
-    if nucleo_id:
-        professores = professores.filter(
-            Q(escola_lotacao__nucleo_id=nucleo_id) | 
-            Q(escola_nucleo_id=nucleo_id)
-        )
-        try:
-            nucleo = EscolaNucleo.objects.get(id=nucleo_id)
-            filtros_aplicados.append(f"Núcleo: {nucleo.nome}")
-        except:
-            pass
-    
-    if escola_id:
-        professores = professores.filter(escola_lotacao_id=escola_id)
-        try:
-            escola = Escola.objects.get(id=escola_id)
-            filtros_aplicados.append(f"Escola: {escola.nome}")
-        except:
-            pass
-    
-    if area:
-        professores = professores.filter(area_atuacao=area)
-        area_nome = dict(AREA_ATUACAO_CHOICES).get(area, area)
-        filtros_aplicados.append(f"Área: {area_nome}")
-    
-    if situacao:
-        professores = professores.filter(situacao_funcional=situacao)
-        sit_nome = dict(SITUACAO_FUNCIONAL_CHOICES).get(situacao, situacao)
-        filtros_aplicados.append(f"Situação: {sit_nome}")
-    
-    if em_sala:
-        if em_sala == 'sim':
-            professores = professores.filter(em_sala=True)
-            filtros_aplicados.append("Em Sala: Sim")
-        elif em_sala == 'nao':
-            professores = professores.filter(em_sala=False)
-            filtros_aplicados.append("Em Sala: Não")
-    
-    if cidade:
-        professores = professores.filter(cidade__icontains=cidade)
-        filtros_aplicados.append(f"Cidade: {cidade}")
-    
-    if cargo_id:
-        professores = professores.filter(cargo_id=cargo_id)
-        try:
-            cargo = Cargo.objects.get(id=cargo_id)
-            filtros_aplicados.append(f"Cargo: {cargo.nome}")
-        except:
-            pass
-    
-    # FILTRO DE SÉRIE - INTERVALO OU ÚNICO
-    if serie_id_inicio and serie_id_fim:
-        professores = professores.filter(serie_id__gte=serie_id_inicio, serie_id__lte=serie_id_fim)
-        try:
-            serie_ini = Serie.objects.get(id=serie_id_inicio)
-            serie_fim = Serie.objects.get(id=serie_id_fim)
-            filtros_aplicados.append(f"Série: de {serie_ini.nome} até {serie_fim.nome}")
-        except:
-            filtros_aplicados.append(f"Série: de ID {serie_id_inicio} até {serie_id_fim}")
-    elif serie_id_inicio:
-        professores = professores.filter(serie_id__gte=serie_id_inicio)
-        try:
-            serie_ini = Serie.objects.get(id=serie_id_inicio)
-            filtros_aplicados.append(f"Série: a partir de {serie_ini.nome}")
-        except:
-            filtros_aplicados.append(f"Série: a partir de ID {serie_id_inicio}")
-    elif serie_id_fim:
-        professores = professores.filter(serie_id__lte=serie_id_fim)
-        try:
-            serie_fim = Serie.objects.get(id=serie_id_fim)
-            filtros_aplicados.append(f"Série: até {serie_fim.nome}")
-        except:
-            filtros_aplicados.append(f"Série: até ID {serie_id_fim}")
-    elif serie_id:
-        professores = professores.filter(serie_id=serie_id)
-        try:
-            serie = Serie.objects.get(id=serie_id)
-            filtros_aplicados.append(f"Série: {serie.nome}")
-        except:
-            pass
-    
-    if modalidade:
-        professores = professores.filter(modalidade=modalidade)
-        mod_nome = dict(MODALIDADE_CHOICES).get(modalidade, modalidade)
-        filtros_aplicados.append(f"Modalidade: {mod_nome}")
-    
-    # FILTRO DE TURNO - INTERVALO OU LISTA
-    if turno_inicio and turno_fim:
-        # Busca turnos entre início e fim na ordem das choices
-        turnos_choices = [t[0] for t in TURNO_CHOICES if t[0]]
-        try:
-            idx_inicio = turnos_choices.index(turno_inicio)
-            idx_fim = turnos_choices.index(turno_fim)
-            turnos_no_intervalo = turnos_choices[idx_inicio:idx_fim+1]
-            professores = professores.filter(turno__in=turnos_no_intervalo)
-            turno_ini_nome = dict(TURNO_CHOICES).get(turno_inicio, turno_inicio)
-            turno_fim_nome = dict(TURNO_CHOICES).get(turno_fim, turno_fim)
-            filtros_aplicados.append(f"Turno: de {turno_ini_nome} até {turno_fim_nome}")
-        except:
-            filtros_aplicados.append(f"Turno: intervalo inválido")
-    elif turno_inicio:
-        turnos_choices = [t[0] for t in TURNO_CHOICES if t[0]]
-        try:
-            idx_inicio = turnos_choices.index(turno_inicio)
-            turnos_a_partir = turnos_choices[idx_inicio:]
-            professores = professores.filter(turno__in=turnos_a_partir)
-            turno_ini_nome = dict(TURNO_CHOICES).get(turno_inicio, turno_inicio)
-            filtros_aplicados.append(f"Turno: a partir de {turno_ini_nome}")
-        except:
-            pass
-    elif turno_fim:
-        turnos_choices = [t[0] for t in TURNO_CHOICES if t[0]]
-        try:
-            idx_fim = turnos_choices.index(turno_fim)
-            turnos_ate = turnos_choices[:idx_fim+1]
-            professores = professores.filter(turno__in=turnos_ate)
-            turno_fim_nome = dict(TURNO_CHOICES).get(turno_fim, turno_fim)
-            filtros_aplicados.append(f"Turno: até {turno_fim_nome}")
-        except:
-            pass
-    elif turno:
-        professores = professores.filter(turno=turno)
-        turno_nome = dict(TURNO_CHOICES).get(turno, turno)
-        filtros_aplicados.append(f"Turno: {turno_nome}")
-    
-    if bairro_id:
-        professores = professores.filter(bairro_id=bairro_id)
-        try:
-            bairro = Bairro.objects.get(id=bairro_id)
-            filtros_aplicados.append(f"Bairro: {bairro.nome}")
-        except:
-            pass
-
-    if materia:
-        from .models import MATERIAS_CHOICES
-        professores = professores.filter(materias__icontains=materia)
-        materia_nome = dict(MATERIAS_CHOICES).get(materia, materia)
-        filtros_aplicados.append(f"Matéria: {materia_nome}")
+    professores, filtros_aplicados = filtrar_professores(professores, request.GET)
+    # Vai para a auditoria (AuditoriaMiddleware): base do comando sugerir_indices
+    request.filtros_relatorio = filtros_usados(request.GET)
     
     # Ordena
     professores = professores.order_by('nome')
@@ -1084,7 +1091,7 @@ def relatorios_resultado(request):
     # Estatísticas
     total = professores.count()
     com_escola = professores.filter(
-        Q(escola_lotacao__isnull=False) | Q(escola_nucleo__isnull=False)
+        Q(escola_lotacao_id__isnull=False) | Q(escola_nucleo_id__isnull=False)
     ).count()
     sem_escola = total - com_escola
     
@@ -1137,6 +1144,7 @@ def relatorios_resultado(request):
 
 @login_required
 @permissao_exportar_dados
+@leitura_na_replica
 def relatorios_pdf(request):
     """Gera PDF do relatório com cabeçalho padronizado"""
     
@@ -1189,57 +1197,11 @@ def relatorios_pdf(request):
         'data_cadastro': 'Dt. Cadastro',
     }
     
-    # Monta query com filtros
-    professores = Professor.objects.select_related(
-        'escola_lotacao', 'escola_lotacao__nucleo', 'escola_lotacao__bairro',
-        'escola_nucleo', 'escola_nucleo__bairro',
-        'bairro', 'cargo', 'serie'
-    ).all()
+    # Monta query com filtros (no escopo do usuário), sem JOIN pela tabela de relatórios
+    professores = ProfessorRelatorio.objects.do_escopo(request.escopo)
     
-    # Aplica filtros (MANTENHA SEU CÓDIGO DE FILTROS EXISTENTE)
-    professor_id = request.GET.get('professor_id')
-    ref_global = request.GET.get('ref_global')
-    nucleo_id = request.GET.get('nucleo')
-    escola_id = request.GET.get('escola')
-    area = request.GET.get('area')
-    situacao = request.GET.get('situacao')
-    em_sala = request.GET.get('em_sala')
-    cidade = request.GET.get('cidade')
-    cargo_id = request.GET.get('cargo')
-    serie_id = request.GET.get('serie')
-    modalidade = request.GET.get('modalidade')
-    turno = request.GET.get('turno')
-    bairro_id = request.GET.get('bairro')
-    
-    if professor_id:
-        professores = professores.filter(id=professor_id)
-    if ref_global:
-        professores = professores.filter(ref_global__icontains=ref_global)
-    if nucleo_id:
-        professores = professores.filter(Q(escola_lotacao__nucleo_id=nucleo_id) | Q(escola_nucleo_id=nucleo_id))
-    if escola_id:
-        professores = professores.filter(escola_lotacao_id=escola_id)
-    if area:
-        professores = professores.filter(area_atuacao=area)
-    if situacao:
-        professores = professores.filter(situacao_funcional=situacao)
-    if em_sala:
-        if em_sala == 'sim':
-            professores = professores.filter(em_sala=True)
-        elif em_sala == 'nao':
-            professores = professores.filter(em_sala=False)
-    if cidade:
-        professores = professores.filter(cidade__icontains=cidade)
-    if cargo_id:
-        professores = professores.filter(cargo_id=cargo_id)
-    if serie_id:
-        professores = professores.filter(serie_id=serie_id)
-    if modalidade:
-        professores = professores.filter(modalidade=modalidade)
-    if turno:
-        professores = professores.filter(turno=turno)
-    if bairro_id:
-        professores = professores.filter(bairro_id=bairro_id)
+    # Aplica filtros (os mesmos do relatório em tela)
+    professores, _ = filtrar_professores(professores, request.GET)
     
     professores = professores.order_by('nome')
     
@@ -1327,84 +1289,61 @@ def relatorios_pdf(request):
 
 
 def get_campo_valor_pdf(professor, campo):
-    """Retorna o valor formatado de um campo do professor para PDF"""
+    """Retorna o valor formatado de um campo (linha de ProfessorRelatorio) para PDF"""
     
     if campo == 'id':
-        return str(professor.id)
+        return str(professor.pk)
     elif campo == 'nome':
         return professor.nome
     elif campo == 'cpf':
-        if hasattr(professor, 'cpf_formatado') and callable(professor.cpf_formatado):
-            return professor.cpf_formatado()
         return professor.cpf if professor.cpf else '-'
     elif campo == 'email':
         return professor.email if professor.email else '-'
     elif campo == 'telefone':
         return professor.telefone if professor.telefone else '-'
     elif campo == 'celular':
-        return professor.celular if professor.celular else '-'
+        return getattr(professor, 'celular', None) or '-'
     elif campo == 'cargo':
-        return professor.cargo.nome if professor.cargo else '-'
+        return professor.cargo_nome or '-'
     elif campo == 'situacao_funcional':
-        return professor.get_situacao_funcional_display() if professor.situacao_funcional else '-'
+        return professor.situacao_funcional_rotulo or '-'
     elif campo == 'matricula':
         return professor.matricula if professor.matricula else '-'
     elif campo == 'ref_global':
         return professor.ref_global if professor.ref_global else '-'
     elif campo == 'area_atuacao':
-        return professor.get_area_atuacao_display() if professor.area_atuacao else '-'
+        return professor.area_atuacao_rotulo or '-'
     elif campo == 'materias':
-        if professor.materias:
-            materias_list = professor.get_materias_display()
-            if materias_list:
-                materias_str = ', '.join(materias_list)
-                if len(materias_str) > 50:
-                    return materias_str[:47] + '...'
-                return materias_str
+        materias_str = professor.materias_rotulos
+        if materias_str:
+            if len(materias_str) > 50:
+                return materias_str[:47] + '...'
+            return materias_str
         return '-'
-    
     elif campo == 'modalidade':
-        return professor.get_modalidade_display() if professor.modalidade else '-'
-    elif campo == 'modalidade':
-        return professor.get_modalidade_display() if professor.modalidade else '-'
+        return professor.modalidade_rotulo or '-'
     elif campo == 'turno':
-        return professor.get_turno_display() if professor.turno else '-'
+        return professor.turno_rotulo or '-'
     elif campo == 'serie':
-        return professor.serie.nome if professor.serie else '-'
+        return professor.serie_nome or '-'
     elif campo == 'em_sala':
         return 'Sim' if professor.em_sala else 'Não'
     elif campo == 'escola':
-        if professor.escola:
-            return professor.escola.nome
-        elif professor.escola_nucleo:
-            return professor.escola_nucleo.nome + ' (Núcleo)'
+        if professor.escola_nome:
+            return professor.escola_nome
+        elif professor.escola_nucleo_id:
+            return professor.nucleo_nome + ' (Núcleo)'
         return '-'
     elif campo == 'escola_nucleo':
-        if professor.escola_nucleo:
-            return professor.escola_nucleo.nome
-        elif professor.escola and professor.escola.nucleo:
-            return professor.escola.nucleo.nome
-        return '-'
+        return professor.nucleo_nome or '-'
     elif campo == 'endereco_escola':
-        if professor.escola:
-            end = professor.escola.endereco or ''
-            num = professor.escola.numero or ''
-            return f"{end}, {num}" if end and num else end or num or '-'
-        elif professor.escola_nucleo:
-            end = professor.escola_nucleo.endereco or ''
-            num = professor.escola_nucleo.numero or ''
-            return f"{end}, {num}" if end and num else end or num or '-'
-        return '-'
+        return professor.escola_endereco or '-'
     elif campo == 'zona_escola':
-        if professor.escola:
-            return professor.escola.get_zona_display()
-        elif professor.escola_nucleo:
-            return professor.escola_nucleo.get_zona_display()
-        return '-'
+        return professor.escola_zona_rotulo or '-'
     elif campo == 'endereco':
         return professor.endereco if professor.endereco else '-'
     elif campo == 'bairro':
-        return professor.bairro.nome if professor.bairro else '-'
+        return professor.bairro_nome or '-'
     elif campo == 'cidade':
         return professor.cidade if professor.cidade else '-'
     elif campo == 'estado':
@@ -1412,7 +1351,8 @@ def get_campo_valor_pdf(professor, campo):
     elif campo == 'cep':
         return professor.cep if professor.cep else '-'
     elif campo == 'data_nascimento':
-        return professor.data_nascimento.strftime("%d/%m/%Y") if professor.data_nascimento else '-'
+        data_nascimento = getattr(professor, 'data_nascimento', None)
+        return data_nascimento.strftime("%d/%m/%Y") if data_nascimento else '-'
     elif campo == 'sexo':
         return professor.get_sexo_display() if hasattr(professor, 'sexo') and professor.sexo else '-'
     elif campo == 'data_cadastro':
@@ -1421,6 +1361,34 @@ def get_campo_valor_pdf(professor, campo):
         # Tenta pegar o atributo genérico
         valor = getattr(professor, campo, '-')
         return str(valor) if valor else '-'
+
+
+
+def _dimensoes_pedidas(request, parametro):
+    """?linhas=nucleo,area ou ?linhas=nucleo&linhas=area"""
+    return [nome.strip() for valor in request.GET.getlist(parametro)
+            for nome in valor.split(',') if nome.strip()]
+
+
+@login_required
+@permissao_gerar_relatorios
+def tabela_cruzada(request):
+    """
+    Tabela cruzada de professores (no escopo do usuário) em JSON:
+    ?linhas=nucleo,area&colunas=turno,situacao&medida=contagem|carga_horaria
+    Sem `linhas`, professores por núcleo. Calculada no retrato em memória
+    do worker (utils/tabela_cruzada.py)
+    """
+    try:
+        tabela = retrato_professores.cruzar(
+            _dimensoes_pedidas(request, 'linhas') or ['nucleo'],
+            _dimensoes_pedidas(request, 'colunas'),
+            medida=request.GET.get('medida', 'contagem'),
+            escopo=request.escopo,
+        )
+    except TabelaInvalida as erro:
+        return JsonResponse({'error': str(erro)}, status=400)
+    return JsonResponse(tabela)
     
 
     # ============================================================================
@@ -1433,6 +1401,8 @@ from django.db.models import Count, Q
 from datetime import datetime, timedelta
 
 @login_required
+@leitura_na_replica
+@limite_de_consulta('os_app:logs_auditoria')
 def logs_auditoria(request):
     """Visualizar logs de auditoria"""
     # Apenas administradores podem ver logs
@@ -1440,55 +1410,11 @@ def logs_auditoria(request):
         messages.error(request, "Você não tem permissão para acessar esta página.")
         return redirect('os_app:index')
     
-    # Filtros
-    logs = LogAuditoria.objects.select_related('usuario').all()
-    
-    # Filtro por usuário
-    usuario_id = request.GET.get('usuario')
-    if usuario_id:
-        logs = logs.filter(usuario_id=usuario_id)
-    
-    # Filtro por ação
-    acao = request.GET.get('acao')
-    if acao:
-        logs = logs.filter(acao=acao)
-    
-    # Filtro por modelo
-    modelo = request.GET.get('modelo')
-    if modelo:
-        logs = logs.filter(modelo=modelo)
-    
-    # Filtro por período
-    periodo = request.GET.get('periodo')
-    if periodo:
-        hoje = datetime.now().date()
-        if periodo == 'hoje':
-            logs = logs.filter(data_hora__date=hoje)
-        elif periodo == 'semana':
-            inicio_semana = hoje - timedelta(days=hoje.weekday())
-            logs = logs.filter(data_hora__date__gte=inicio_semana)
-        elif periodo == 'mes':
-            logs = logs.filter(
-                data_hora__year=hoje.year,
-                data_hora__month=hoje.month
-            )
-    
-    # Filtro por data específica
-    data_inicio = request.GET.get('data_inicio')
-    data_fim = request.GET.get('data_fim')
-    if data_inicio:
-        logs = logs.filter(data_hora__date__gte=data_inicio)
-    if data_fim:
-        logs = logs.filter(data_hora__date__lte=data_fim)
-    
-    # Busca por texto
-    busca = request.GET.get('busca')
-    if busca:
-        logs = logs.filter(
-            Q(descricao__icontains=busca) |
-            Q(objeto_repr__icontains=busca) |
-            Q(usuario__username__icontains=busca)
-        )
+    # Filtros (mesma lógica da exportação)
+    logs = filtrar_logs(
+        LogAuditoria.objects.select_related('usuario').all(),
+        request.GET
+    )
     
     # Paginação
     from django.core.paginator import Paginator
@@ -1537,6 +1463,7 @@ def logs_auditoria(request):
 
 
 @login_required
+@leitura_na_replica
 def log_detalhe(request, log_id):
     """Detalhe de um log específico"""
     if not request.user.is_staff:
@@ -1553,6 +1480,7 @@ def log_detalhe(request, log_id):
 
 
 @login_required
+@leitura_na_replica
 def logs_meu_historico(request):
     """Histórico de ações do usuário logado"""
     # Logs do usuário atual
@@ -1582,68 +1510,57 @@ def logs_meu_historico(request):
 
 
 @login_required
+@leitura_na_replica
 def logs_exportar(request):
     """Exportar logs para CSV"""
     if not request.user.is_staff:
         messages.error(request, "Você não tem permissão para acessar esta página.")
         return redirect('os_app:index')
     
-    import csv
-    from django.http import HttpResponse
-    
-    # Aplica mesmos filtros da view principal
-    logs = LogAuditoria.objects.select_related('usuario').all()
-    
-    # Aplica filtros (copiar lógica da view logs_auditoria)
-    usuario_id = request.GET.get('usuario')
-    if usuario_id:
-        logs = logs.filter(usuario_id=usuario_id)
-    
-    acao = request.GET.get('acao')
-    if acao:
-        logs = logs.filter(acao=acao)
+    # Aplica os mesmos filtros da view principal
+    logs = filtrar_logs(LogAuditoria.objects.all(), request.GET)
     
-    # ... outros filtros ...
+    nome_arquivo = f'logs_auditoria_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    linhas = linhas_csv_logs(logs)
     
-    # Cria resposta CSV
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = f'attachment; filename="logs_auditoria_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
+    # Envia em streaming, lendo o banco em lotes (opcionalmente comprimido)
+    if request.GET.get('gzip'):
+        response = StreamingHttpResponse(comprimir_gzip(linhas), content_type='application/gzip')
+        nome_arquivo += '.gz'
+    else:
+        response = StreamingHttpResponse(linhas, content_type='text/csv; charset=utf-8')
     
-    # Adiciona BOM para Excel reconhecer UTF-8
-    response.write('\ufeff')
+    response['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
+    return response
+
+# ============================================================================
+# PAINEL DE DESEMPENHO
+# ============================================================================
+
+@login_required
+def painel_desempenho(request):
+    """Métricas de desempenho por view coletadas pelo PerfilamentoMiddleware"""
+    if not request.user.is_staff:
+        messages.error(request, "Você não tem permissão para acessar esta página.")
+        return redirect('os_app:index')
     
-    writer = csv.writer(response)
+    if request.method == 'POST' and request.POST.get('acao') == 'limpar':
+        coletor.limpar()
+        messages.success(request, 'Métricas de desempenho zeradas.')
+        return redirect('os_app:painel_desempenho')
     
-    # Cabeçalho
-    writer.writerow([
-        'ID',
-        'Data/Hora',
-        'Usuário',
-        'Ação',
-        'Modelo',
-        'Objeto ID',
-        'Objeto',
-        'Descrição',
-        'IP',
-        'Sucesso'
-    ])
+    views_metricas = coletor.resumo()
     
-    # Dados
-    for log in logs:
-        writer.writerow([
-            log.id,
-            log.data_hora.strftime('%d/%m/%Y %H:%M:%S'),
-            log.usuario.username if log.usuario else 'Sistema',
-            log.get_acao_display(),
-            log.modelo or '',
-            log.objeto_id or '',
-            log.objeto_repr or '',
-            log.descricao,
-            log.ip_address or '',
-            'Sim' if log.sucesso else 'Não'
-        ])
+    context = {
+        'views_metricas': views_metricas,
+        'baldes_ms': BALDES_MS,
+        'coletado_desde': datetime.fromtimestamp(coletor.inicio),
+        'total_requisicoes': sum(v['requisicoes'] for v in views_metricas),
+        'perfilamento_ativo': getattr(settings, 'PERFILAMENTO_ATIVO', True),
+    }
     
-    return response
+    return render(request, 'os_app/painel_desempenho.html', context)
+
 
 @login_required
 def lista_usuarios(request):
@@ -36,6 +36,20 @@ LOGGING = {
             'class': 'logging.FileHandler',
             'filename': str(_log_dir / 'sisprof_error.log'),
         },
+        'consultas_interrompidas': {
+            'level': 'WARNING',
+            'class': 'logging.FileHandler',
+            'filename': str(_log_dir / 'consultas_interrompidas.log'),
+        },
+        # Retratos do perfilamento (uma linha JSON por gravação), com rotação por tamanho
+        'perfilamento': {
+            'level': 'INFO',
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': str(_log_dir / 'perfilamento.jsonl'),
+            'maxBytes': 5 * 1024 * 1024,
+            'backupCount': 2,
+            'encoding': 'utf-8',
+        },
     },
     'loggers': {
         'django': {
@@ -43,6 +57,16 @@ LOGGING = {
             'level': 'ERROR',
             'propagate': True,
         },
+        # SQL, parâmetros e tempo das consultas cortadas pelo limite por view
+        'os_app.utils.limite_consultas': {
+            'handlers': ['consultas_interrompidas'],
+            'level': 'WARNING',
+        },
+        'os_app.utils.perfilamento': {
+            'handlers': ['perfilamento'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -74,20 +98,44 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    'os_app.middleware.PerfilamentoMiddleware',
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    'os_app.middleware.EscopoMiddleware',
+    'os_app.middleware.ReplicaMiddleware',
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     'os_app.middleware.AuditoriaMiddleware',
 ]
 
+# Perfilamento por view (painel em /desempenho/, apenas staff)
+PERFILAMENTO_ATIVO = config('PERFILAMENTO_ATIVO', default=True, cast=bool)
+PERFILAMENTO_INTERVALO_FLUSH = config('PERFILAMENTO_INTERVALO_FLUSH', default=60, cast=int)  # segundos
+
+# Índices em memória dos autocompletes: recarga completa a cada N segundos por worker
+AUTOCOMPLETE_TTL = config('AUTOCOMPLETE_TTL', default=300, cast=int)
+# Intervalo mínimo (s) entre consultas ao cache para aplicar as alterações feitas por outros workers
+AUTOCOMPLETE_INTERVALO_SINCRONIA = config('AUTOCOMPLETE_INTERVALO_SINCRONIA', default=1, cast=float)
+
+# Retrato colunar das tabelas cruzadas (utils/tabela_cruzada.py): recarga completa a cada N segundos por worker
+TABELA_CRUZADA_TTL = config('TABELA_CRUZADA_TTL', default=300, cast=int)
+
+# Tempo máximo (s) de cada consulta SQL em relatórios e logs de auditoria; 0 desativa
+LIMITE_CONSULTA_SEGUNDOS = config('LIMITE_CONSULTA_SEGUNDOS', default=10, cast=float)
+
+# Máscara de permissões no cache: validade por usuário em segundos. Só limita
+# a defasagem entre workers quando o cache não é compartilhado (ver CACHES)
+PERMISSOES_TTL = config('PERMISSOES_TTL', default=60, cast=int)
+
 ROOT_URLCONF = "sisprof_project.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # Com o perfilamento ativo, o backend mede o tempo de renderização por view
+        "BACKEND": ("os_app.utils.perfilamento.DjangoTemplatesMedidos" if PERFILAMENTO_ATIVO
+                    else "django.template.backends.django.DjangoTemplates"),
         'DIRS': [BASE_DIR / "templates"],  # Pastas globais, se usar
         "APP_DIRS": True,
         "OPTIONS": {
@@ -106,25 +154,110 @@ WSGI_APPLICATION = "sisprof_project.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 # Se DB_USER não estiver no .env, usa SQLite para desenvolvimento local.
+
+# SQLite em modo de produção (ligar com SQLITE_PRODUCAO=True no .env do
+# servidor; desligado, vale o padrão do Django, em desenvolvimento e testes):
+# WAL (leituras não bloqueiam a escrita), fsync só nos checkpoints, espera pelo
+# lock em vez de erro imediato, mmap e cache de páginas maiores, e BEGIN
+# IMMEDIATE nas transações: o lock de escrita é pedido no início, onde o
+# busy_timeout vale, e não no meio da transação.
+SQLITE_PRODUCAO = config('SQLITE_PRODUCAO', default=False, cast=bool)
+SQLITE_BUSY_TIMEOUT_MS = config('SQLITE_BUSY_TIMEOUT_MS', default=5000, cast=int)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': SQLITE_BUSY_TIMEOUT_MS,
+    'mmap_size': config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int),
+    'cache_size': config('SQLITE_CACHE_SIZE', default=-64000, cast=int),  # negativo = KiB
+}
+SQLITE_OPCOES_PRODUCAO = {
+    'init_command': ';'.join(f'PRAGMA {nome}={valor}' for nome, valor in SQLITE_PRAGMAS.items()),
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+}
+# Novas tentativas, com espera exponencial, das escritas que ainda encontrarem
+# o banco bloqueado (os_app/utils/banco.py)
+SQLITE_RETENTATIVAS = config('SQLITE_RETENTATIVAS', default=3, cast=int)
+
 _db_user = config('DB_USER', default=None)
 if _db_user is None or (isinstance(_db_user, str) and _db_user.strip() == ''):
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': dict(SQLITE_OPCOES_PRODUCAO) if SQLITE_PRODUCAO else {},
         }
     }
 else:
+    _db_engine = config('DB_ENGINE', default='django.db.backends.postgresql')
+    # PostgreSQL: pool de conexões do psycopg 3 em cada worker (DB_POOL=True)
+    # ou conexões persistentes (DB_CONN_MAX_AGE). No Django as duas são
+    # exclusivas: com o pool, "fechar" a conexão a devolve ao pool.
+    DB_POOL = config('DB_POOL', default=True, cast=bool) and 'postgresql' in _db_engine
     DATABASES = {
         'default': {
-            'ENGINE': config('DB_ENGINE', default='django.db.backends.postgresql'),
+            'ENGINE': _db_engine,
             'NAME': config('DB_NAME'),
             'USER': config('DB_USER'),
             'PASSWORD': config('DB_PASSWORD'),
             'HOST': config('DB_HOST', default='localhost'),
             'PORT': config('DB_PORT', default='5432'),
+            'CONN_MAX_AGE': 0 if DB_POOL else config('DB_CONN_MAX_AGE', default=60, cast=int),
+            'CONN_HEALTH_CHECKS': not DB_POOL,
+            'OPTIONS': {},
+        }
+    }
+    if DB_POOL:
+        from psycopg_pool import ConnectionPool  # psycopg[pool]
+
+        # Tamanhos por worker: DB_POOL_MAX x workers deve caber no max_connections
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': config('DB_POOL_MIN', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),  # espera por conexão livre (s)
+            'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=1800, cast=float),  # recicla após (s)
+            'max_idle': config('DB_POOL_MAX_IDLE', default=300, cast=float),  # fecha ociosas acima do mínimo (s)
+            'check': ConnectionPool.check_connection,  # testa a conexão antes de entregá-la
         }
+
+# Réplica de leitura (opcional) para relatórios, logs e painel (os_app/utils/replica.py).
+# PostgreSQL: DB_REPLICA_HOST/DB_REPLICA_PORT, mesmo banco e usuário do principal.
+# SQLite: SQLITE_REPLICA, caminho de uma cópia mantida por replicação externa.
+# Sem nenhum dos dois, tudo é lido do 'default'.
+DB_REPLICA_ALIAS = 'replica'
+# Segundos, após um POST do usuário, em que ele continua lendo do principal
+REPLICA_ADERENCIA_SEGUNDOS = config('REPLICA_ADERENCIA_SEGUNDOS', default=10, cast=int)
+_replica_host = config('DB_REPLICA_HOST', default='')
+_replica_sqlite = config('SQLITE_REPLICA', default='')
+if 'sqlite3' in DATABASES['default']['ENGINE']:
+    _replica_ajustes = {'NAME': _replica_sqlite} if _replica_sqlite else None
+else:
+    _replica_ajustes = {
+        'HOST': _replica_host,
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+    } if _replica_host else None
+if _replica_ajustes:
+    DATABASES[DB_REPLICA_ALIAS] = {
+        **DATABASES['default'],
+        **_replica_ajustes,
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        # Nos testes a réplica é o próprio banco de teste do 'default'
+        'TEST': {'MIRROR': 'default'},
     }
+DATABASE_ROUTERS = ['os_app.utils.replica.ReplicaRouter']
+
+# Cache do Django: máscaras de permissões e escopo (os_app/utils/permissoes.py)
+# e carimbos de versão dos JSON e autocompletes (os_app/utils/versoes.py).
+# Com mais de um worker o cache PRECISA ser compartilhado (Redis, Memcached
+# ou DatabaseCache após `createcachetable`): no LocMemCache padrão cada worker
+# tem o seu, e uma permissão retirada continua valendo nos outros por até
+# PERMISSOES_TTL segundos.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
 
 
 # Password validation